@@ -31,6 +31,7 @@ import version as ver
 import traceback
 from packaging import version as semver_version
 import p2pp.gui as gui
+import p2pp.qtgui as qtgui
 
 v.version = ver.Version
 if len(sys.argv) == 1:
@@ -38,7 +39,7 @@ if len(sys.argv) == 1:
         platformD = platform.system()
 
         gui.setfilename('')
-        gui.form.label_5.setText("")
+        qtgui.form.label_5.setText("")
         MASTER_VERSION = checkversion.get_version(checkversion.MASTER)
 
         if MASTER_VERSION != "0.0":
@@ -50,12 +51,12 @@ if len(sys.argv) == 1:
                 color = "green"
 
             gui.create_logitem(v.version, color)
-        gui.app.sync()
+        qtgui.app.sync()
         gui.create_emptyline()
         gui.create_logitem("Line to be used in PrusaSlicer (or other PrusaSlicer based slicers) [Print Settings][Output Options][Post Processing Script]",
                            "blue")
         gui.create_emptyline()
-        gui.app.sync()
+        qtgui.app.sync()
 
         if platformD == 'Darwin':
             gui.create_logitem("<b>open -W -a P2PP.app --args<b>", "red")
@@ -70,12 +71,12 @@ if len(sys.argv) == 1:
             pathname = pathname.replace(" ", "! ")
             gui.create_logitem("<b>{}\\p2pp.exe</b>".format(os.path.dirname(sys.argv[0]).replace(" ", "! ")), "red")
 
-        gui.app.sync()
+        qtgui.app.sync()
         gui.create_emptyline()
         gui.create_logitem("This requires ADVANCED/EXPERT settings to be visible", "blue")
         gui.create_emptyline()
         gui.create_emptyline()
-        gui.app.sync()
+        qtgui.app.sync()
         gui.create_logitem("Don't forget to complete the remaining Prusaslicer Configuration", "blue")
         gui.create_logitem("===========================================================================================",
                            "blue")
@@ -83,7 +84,7 @@ if len(sys.argv) == 1:
                            "blue")
         gui.create_logitem("===========================================================================================",
                            "blue")
-        gui.app.sync()
+        qtgui.app.sync()
         gui.progress_string(101)
         gui.close_button_enable()
         sys.exit()
@@ -107,13 +108,23 @@ if len(sys.argv) == 1:
 
 else:
 
-    filename = sys.argv[1]
-    if len(sys.argv) > 2:
-        outputfile = sys.argv[2]
+    # --no-cache processes the file even when it was processed before with the same settings
+    # --profile saves a cProfile profile of the processing next to the output
+    arguments = [arg for arg in sys.argv[1:] if arg not in ["--no-cache", "--profile"]]
+    use_cache = "--no-cache" not in sys.argv[1:]
+    v.profile = "--profile" in sys.argv[1:]
+
+    filename = arguments[0]
+    if len(arguments) > 1:
+        outputfile = arguments[1]
     else:
         outputfile = None
     try:
-        mcf.p2pp_process_file(filename, outputfile)
+        if use_cache:
+            import p2pp.cache as cache
+            cache.p2pp_process_file(filename, outputfile)
+        else:
+            mcf.p2pp_process_file(filename, outputfile)
     except Exception as e:
         gui.create_emptyline()
         gui.log_warning("We're sorry but an unexpected error occurred while processing your file")
@@ -0,0 +1,227 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# synthetic PrusaSlicer multi-material G-code for the benchmarks
+#
+#     python -m benchmarks.gcodegen out.gcode [--mode normal] [--layers 200] [--colors 4] [--toolchanges 1] [--size 40]
+#
+# every layer prints an object (perimeter + infill), followed by the wipe tower: a CP TOOLCHANGE block per
+# toolchange or a CP EMPTY GRID on the layers without toolchange.  The file ends with the statistics and the
+# prusaslicer_config block (start gcode with the ;P2PP lines of the mode, wiping_volumes_matrix, ...).
+# The output only depends on the arguments (fixed random seed).
+
+import argparse
+import math
+import random
+import sys
+
+# 1x1 png
+THUMBNAIL = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+
+COLORS = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#FFFFFF", "#000000"]
+
+# ;P2PP lines added to the start gcode for every mode
+MODES = {
+    "normal": [],
+    "towerdelta": [";P2PP PURGETOWERDELTA=2"],
+    "fullpurge": [";P2PP FULLPURGEREDUCTION"],
+    "sidewipe": [";P2PP SIDEWIPELOC=X-5", ";P2PP SIDEWIPEMINY=20", ";P2PP SIDEWIPEMAXY=180"],
+    "bigbrain3d": [";P2PP BIGBRAIN3D_ENABLE", ";P2PP BIGBRAIN3D_PRIME_BLOBS=1"],
+    "blobster": [";P2PP BLOBSTER_ENABLE"],
+    "accessory": [";P2PP ACCESSORYMODE_MAF"],
+    "palette3": [";P2PP PALETTE3"],
+}
+
+# the wipe tower is placed off the bed for the modes that do not print a tower
+OFF_BED_MODES = ["sidewipe", "bigbrain3d", "blobster"]
+
+TOWER_WIDTH = 30.0
+TOWER_DEPTH = 20.0
+
+
+def tower_position(mode):
+    if mode in OFF_BED_MODES:
+        return -40.0, 140.0
+    return 170.0, 140.0
+
+
+def write_header(w):
+    w("; generated by PrusaSlicer 2.6.1+linux-x64-GTK3 on 2023-09-01 at 10:00:00 UTC\n\n;\n\n")
+    w("; external perimeters extrusion width = 0.45mm\n; perimeters extrusion width = 0.45mm\n\n")
+    w("; thumbnail begin 1x1 {}\n".format(len(THUMBNAIL)))
+    for i in range(0, len(THUMBNAIL), 78):
+        w("; " + THUMBNAIL[i:i + 78] + "\n")
+    w("; thumbnail end\n\n")
+    w("M73 P0 R10\nM201 X1000 Y1000 Z200 E5000 ; sets maximum accelerations, mm/sec^2\nM107\n")
+    w(";TYPE:Custom\nG28 W ; home all without mesh bed level\nM104 S215\nM140 S60\nM190 S60\nM109 S215\n"
+      "G21 ; set units to millimeters\nG90 ; use absolute coordinates\nM83 ; use relative distances for extrusion\n")
+    w("T0\nG1 Z0.2 F720\nG1 Y-3 F1000\nG1 X60 E9 F1000\nG1 X100 E12.5 F1000\nG92 E0.0\n")
+
+
+def write_brim(w, rnd, tx, ty):
+    w("G1 X{:.3f} Y{:.3f} F9000\n".format(tx, ty))
+    w(";TYPE:Wipe tower\n;WIDTH:0.5\n; CP WIPE TOWER FIRST LAYER BRIM START\n")
+    x, y = tx - 2, ty - 2
+    w("G1 X{:.3f} Y{:.3f} F9000\n".format(x, y))
+    for r in range(3):
+        for px, py in [(tx + TOWER_WIDTH + 2 + r, y), (tx + TOWER_WIDTH + 2 + r, ty + TOWER_DEPTH + 2 + r),
+                       (x, ty + TOWER_DEPTH + 2 + r), (x, y)]:
+            w("G1 X{:.3f} Y{:.3f} E{:.5f}\n".format(px, py, rnd.uniform(0.5, 1.5)))
+        x -= 0.5
+        y -= 0.5
+    w("; CP WIPE TOWER FIRST LAYER BRIM END\n")
+
+
+def write_object(w, rnd, size):
+    w(";TYPE:Perimeter\n;WIDTH:0.45\nG1 X100.000 Y100.000 F9000\nG1 E.8 F2100\nG1 F1800\n")
+    for k in range(size):
+        a = 2 * math.pi * k / size
+        w("G1 X{:.3f} Y{:.3f} E{}\n".format(100 + 20 * math.cos(a) + rnd.uniform(-0.01, 0.01), 100 + 20 * math.sin(a),
+                                            "{:.5f}".format(rnd.uniform(0.01, 0.09)).lstrip("0")))
+    w(";TYPE:Solid infill\n;WIDTH:0.5\n")
+    for k in range(size):
+        w("G1 X{:.3f} Y{:.3f} E{:.5f}\n".format(90 + k % 20, 90 + k // 2 % 20, rnd.uniform(0.01, 0.5)))
+    w("M106 S127\nG1 E-.8 F2100\n")
+
+
+def write_toolchange(w, rnd, tx, ty, number, new_tool):
+    w("G1 X{:.3f} Y{:.3f} F9000\n".format(tx + 1, ty + 1))
+    w(";TYPE:Wipe tower\n;WIDTH:0.5\n; CP TOOLCHANGE START\n; toolchange #{}\n; material : PLA -> PLA\n"
+      ";--------------------\nM220 B\nM220 S100\n".format(number))
+    w("; CP TOOLCHANGE UNLOAD\n")
+    w("G1 X{:.3f} Y{:.3f} E.5 F2000\nG1 X{:.3f} E-15 F5000\nG1 E-3 F2000\nG4 S0\n".format(tx + 10, ty + 1, tx + 5))
+    w("M220 R\nG1 F14400\nG4 S0\n")
+    w("T{}\n".format(new_tool))
+    w("M900 K0.04\nG4 S0\n")
+    w("; CP TOOLCHANGE LOAD\nG1 X{:.3f} Y{:.3f} E10 F3000\n".format(tx + 5, ty + 2))
+    w("; CP TOOLCHANGE WIPE\n")
+    y = ty + 2
+    for k in range(12):
+        w("G1 X{:.3f} Y{:.3f} E{:.4f} F{}\n".format(tx + (TOWER_WIDTH if k % 2 == 0 else 1), y, rnd.uniform(1, 2),
+                                                    2400 + 600 * (k % 3)))
+        y += 0.5
+        w("G1 Y{:.3f}\n".format(y))
+    w("G1 F7200\n; CP TOOLCHANGE END\n;------------------\n\n\n")
+    w("G1 E-.8 F2100\n")
+
+
+def write_empty_grid(w, rnd, tx, ty, layer):
+    w("G1 X{:.3f} Y{:.3f} F9000\n".format(tx + 1, ty + 1))
+    w(";TYPE:Wipe tower\n;WIDTH:0.5\n; CP EMPTY GRID START\n; layer {}\n".format(layer))
+    for k in range(6):
+        w("G1 X{:.3f} Y{:.3f} E{:.4f} F2400\n".format(tx + (TOWER_WIDTH if k % 2 == 0 else 1), ty + 1 + k * 3,
+                                                      rnd.uniform(0.5, 1)))
+    w("; CP EMPTY GRID END\n;------------------\n\n\n")
+
+
+def write_config(w, mode, colors, tx, ty):
+    profile = "0123456789abcdef"
+    if mode == "palette3":
+        profile = profile * 2
+    start = ["G28", ";P2PP PRINTERPROFILE=" + profile] + MODES[mode]
+    start += [";P2PP SPLICEOFFSET=30", ";P2PP MATERIAL_DEFAULT_0_0_0", ";P2PP MATERIAL_PLA_PLA_1_2_3",
+              ";P2PP LINEARPINGLENGTH=350"]
+
+    config = [("bed_shape", "0x0,250x0,250x210,0x210"),
+              ("extruder_colour", ";".join(COLORS[:colors])),
+              ("extrusion_width", "0.45"),
+              ("filament_colour", ";".join(["#FF8000"] * colors)),
+              ("filament_diameter", ",".join(["1.75"] * colors)),
+              ("filament_settings_id", ";".join(['"Generic PLA @{}"'.format(i) for i in range(colors)])),
+              ("filament_type", ";".join(["PLA"] * colors)),
+              ("first_layer_bed_temperature", ",".join(["60"] * colors)),
+              ("first_layer_height", "0.2"),
+              ("first_layer_temperature", ",".join(["215"] * colors)),
+              ("gcode_flavor", "marlin2"),
+              ("infill_speed", "80"),
+              ("layer_height", "0.2"),
+              ("max_print_height", "210"),
+              ("min_skirt_length", "0"),
+              ("nozzle_diameter", ",".join(["0.4"] * colors)),
+              ("retract_length", ",".join(["0.8"] * colors)),
+              ("retract_length_toolchange", ",".join(["4"] * colors)),
+              ("single_extruder_multi_material_priming", "0"),
+              ("skirts", "0"),
+              ("start_gcode", "\\n".join(start)),
+              ("support_material", "0"),
+              ("support_material_synchronize_layers", "0"),
+              ("use_firmware_retraction", "0"),
+              ("use_relative_e_distances", "1"),
+              ("variable_layer_height", "1"),
+              ("wipe_tower_no_sparse_layers", "0"),
+              ("wipe_tower_width", "{:g}".format(TOWER_WIDTH)),
+              ("wipe_tower_x", "{:g}".format(tx)),
+              ("wipe_tower_y", "{:g}".format(ty)),
+              ("wiping_volumes_matrix", ",".join(["0" if i % (colors + 1) == 0 else "140" for i in range(colors * colors)]))]
+
+    w("; prusaslicer_config = begin\n")
+    for key, value in config:
+        w("; {} = {}\n".format(key, value))
+    w("; prusaslicer_config = end\n")
+
+
+# one out of every sparse_every layers has no toolchange and gets an empty grid on the tower
+def generate(out, mode="normal", layers=200, colors=4, toolchanges=1, size=40, sparse_every=3, seed=1):
+    rnd = random.Random(seed)
+    w = out.write
+    tx, ty = tower_position(mode)
+
+    write_header(w)
+
+    tool = 0
+    number = 0
+    z = 0.2
+    for layer in range(layers):
+        z = round(0.2 + layer * 0.2, 3)
+        w(";LAYER_CHANGE\n;Z:{:g}\n;HEIGHT:0.2\n;BEFORE_LAYER_CHANGE\nG92 E0.0\n;{:g}\n\n\n".format(z, z))
+        w("G1 E-.8 F2100\nG1 Z{:.3f} F720\n".format(z + 0.2))
+        w(";AFTER_LAYER_CHANGE\n;LAYER {}\n;LAYERHEIGHT {:g}\n".format(layer, z))
+        w("G1 Z{:g}\nG1 E.8 F2100\n".format(z))
+        if layer == 0:
+            write_brim(w, rnd, tx, ty)
+
+        sparse = sparse_every and layer > 2 and layer % sparse_every == 2
+        count = 0 if sparse else toolchanges
+        for part in range(count + 1):
+            write_object(w, rnd, size)
+            if part < count:
+                tool = (tool + 1 + rnd.randrange(colors - 1)) % colors
+                number += 1
+                write_toolchange(w, rnd, tx, ty, number, tool)
+        if layer > 0 and count == 0:
+            write_empty_grid(w, rnd, tx, ty, layer)
+        w("G1 E-.8 F2100\n")
+
+    w("M107\n;TYPE:Custom\n; Filament-specific end gcode\nG1 Z{:.3f} F720\nM104 S0\nM140 S0\nM84\n".format(z + 10))
+    w("\n; filament used [mm] = 100.0, 200.0\n; filament used [g] = 1.0, 2.0\n\n")
+    w("; estimated printing time (normal mode) = 1h 2m 3s\n; estimated printing time (silent mode) = 1h 5m 3s\n\n")
+    write_config(w, mode, colors, tx, ty)
+
+
+def generate_file(filename, mode="normal", layers=200, colors=4, toolchanges=1, size=40):
+    with open(filename, "w") as f:
+        generate(f, mode, layers, colors, toolchanges, size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.gcodegen", description="P2PP - generate a synthetic multi-material gcode file")
+    parser.add_argument("output", help="gcode file to write")
+    parser.add_argument("--mode", choices=sorted(MODES), default="normal", help="P2PP mode (default: %(default)s)")
+    parser.add_argument("--layers", type=int, default=200, help="number of layers (default: %(default)s)")
+    parser.add_argument("--colors", type=int, default=4, choices=range(2, 9), metavar="2-8", help="number of colours (default: %(default)s)")
+    parser.add_argument("--toolchanges", type=int, default=1, help="toolchanges per layer (default: %(default)s)")
+    parser.add_argument("--size", type=int, default=40, help="moves per feature, sets the size of the object (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    generate_file(args.output, args.mode, args.layers, args.colors, args.toolchanges, args.size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# benchmark suite:  python -m benchmarks.run [--modes normal,sidewipe] [--layers 400] [--repeat 3] [--json report.json]
+#
+# generates a synthetic file per mode (see gcodegen.py) and processes it with p2pp.process (no result cache).
+# Every run is done in a separate process so the peak memory (RSS) is the one of that run.
+# Reports lines/sec of input, peak RSS and the time spent in every processing phase (see p2pp/stats.py).
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import gcodegen
+
+COLUMNS = ["config", "pass1", "checks", "pass2", "header", "write", "zip"]
+
+
+# SECTION Child, one run
+
+def run_once(input_file, output_file):
+    import p2pp
+    import p2pp.stats as stats
+    from p2pp.reporters import NullReporter
+
+    context = p2pp.ProcessingContext()
+    start = time.perf_counter()
+    result = p2pp.process(input_file, output_file, reporter=NullReporter(), context=context, environment={}, cache=False)
+    total = time.perf_counter() - start
+
+    report = stats.report(context)
+    return {"result": result,
+            "lines": report["input_lines"],
+            "seconds": total,
+            "lines_per_second": report["input_lines"] / total if total else 0.0,
+            "peak_rss_kb": report["peak_memory_kb"] or report["process_peak_memory_kb"] or 0,
+            "phases": report["phases"],
+            "stats": report}
+
+
+# SECTION Parent
+
+def run_child(input_file, output_file):
+    command = [sys.executable, "-m", "benchmarks.run", "--child", input_file, output_file]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(command, cwd=root)
+    return json.loads(output.decode("utf-8").splitlines()[-1])
+
+
+def run_mode(workdir, mode, layers, colors, toolchanges, repeat):
+    input_file = os.path.join(workdir, mode + ".gcode")
+    output_file = os.path.join(workdir, mode + ".out.gcode")
+    gcodegen.generate_file(input_file, mode, layers, colors, toolchanges)
+
+    best = None
+    for _ in range(repeat):
+        run = run_child(input_file, output_file)
+        if best is None or run["seconds"] < best["seconds"]:
+            best = run
+    best["mode"] = mode
+    return best
+
+
+def format_run(run):
+    line = "{:12} {:8d} {:8.2f} {:10.0f} {:8.1f}".format(run["mode"], run["lines"], run["seconds"],
+                                                        run["lines_per_second"], run["peak_rss_kb"] / 1024.0)
+    for column in COLUMNS:
+        line += " {:7.2f}".format(run["phases"].get(column, 0.0))
+    if run["result"] != 0:
+        line += "  HALTED"
+    return line
+
+
+def format_title():
+    title = "{:12} {:>8} {:>8} {:>10} {:>8}".format("mode", "lines", "seconds", "lines/s", "RSS MB")
+    for column in COLUMNS:
+        title += " {:>7}".format(column)
+    return title
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.run", description="P2PP - benchmark the processing modes")
+    parser.add_argument("--modes", default=",".join(sorted(gcodegen.MODES)),
+                        help="comma separated list of modes (default: all)")
+    parser.add_argument("--layers", type=int, default=400, help="layers of the generated files (default: %(default)s)")
+    parser.add_argument("--colors", type=int, default=4, help="number of colours (default: %(default)s)")
+    parser.add_argument("--toolchanges", type=int, default=1, help="toolchanges per layer (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per mode, the fastest run is reported (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="write the results as json to FILE")
+    parser.add_argument("--keep", metavar="DIRECTORY", help="keep the generated and processed files in DIRECTORY")
+    parser.add_argument("--child", nargs=2, metavar=("INPUT", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_once(*args.child)))
+        return 0
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in modes:
+        if mode not in gcodegen.MODES:
+            parser.error("unknown mode {}, choose from {}".format(mode, ", ".join(sorted(gcodegen.MODES))))
+
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        workdir = args.keep
+        cleanup = None
+    else:
+        cleanup = tempfile.TemporaryDirectory(prefix="p2pp-bench-")
+        workdir = cleanup.name
+
+    print(format_title())
+    results = []
+    try:
+        for mode in modes:
+            run = run_mode(workdir, mode, args.layers, args.colors, args.toolchanges, args.repeat)
+            results.append(run)
+            print(format_run(run))
+            sys.stdout.flush()
+    finally:
+        if cleanup is not None:
+            cleanup.cleanup()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"layers": args.layers,
+                       "colors": args.colors,
+                       "toolchanges": args.toolchanges,
+                       "python": sys.version.split()[0],
+                       "results": results}, f, indent=2)
+
+    return 0 if all(run["result"] == 0 for run in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
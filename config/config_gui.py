@@ -12,6 +12,7 @@ import image_rc
 import config.qdroptarget
 import config.qmulticombo
 import config.prusaconfig as conf
+import p2pp.p2ppparams as parameters
 import sys
 import os
 import copy
@@ -285,7 +286,7 @@ def remove_p2ppconfig(store):
                     ";P2PP SPLICEOFFSET",
                     ";P2PP EXTRAENDFILAMENT",
                     ";P2PP MATERIAL_DEFAULT",
-                    ";P2PP LINEARPINGLENGTHT",
+                    ";P2PP LINEARPINGLENGTH",
                     ";P2PP CONSOLEWAIT",
                     ";P2PP SAVEUNPROCESSED",
                     ";P2PP SIDEWIPE",
@@ -363,76 +364,76 @@ def on_config():
         # BASICCONFIG
 
         basiccode = [
-            ";P2PP PRINTERPROFILE={}".format(cfg["printerprofile"]),
-            ";P2PP SPLICEOFFSET={}".format(cfg["spliceoffset"]),
-            ";P2PP EXTRAENDFILAMENT={}".format(cfg["extrafilament"]),
+            parameters.parameter_line("PRINTERPROFILE", cfg["printerprofile"]),
+            parameters.parameter_line("SPLICEOFFSET", cfg["spliceoffset"]),
+            parameters.parameter_line("EXTRAENDFILAMENT", cfg["extrafilament"]),
             cfg["materials"]
 
         ]
 
         if cfg["linearpingenable"]:
-            basiccode.append(";P2PP LINEARPINGLENGTHT={}".format(cfg["linearping"]))
+            basiccode.append(parameters.parameter_line("LINEARPINGLENGTH", cfg["linearping"]))
 
         if cfg["consolewait"]:
-            basiccode.append(";P2PP CONSOLEWAIT")
+            basiccode.append(parameters.parameter_line("CONSOLEWAIT"))
 
         if cfg["saveunprocessed"]:
-            basiccode.append(";P2PP SAVEUNPROCESSED")
+            basiccode.append(parameters.parameter_line("SAVEUNPROCESSED"))
 
         if cfg["absoluteextrusion"]:
-            basiccode.append(";P2PP ABSOLUTEEXTRUDER")
+            basiccode.append(parameters.parameter_line("ABSOLUTEEXTRUDER"))
 
         # sidewipe code
 
         swcode = [
-            ";P2PP SIDEWIPELOC=X{}".format(cfg["sw_xloc"]),
-            ";P2PP SIDEWIPEMINY={}".format(cfg["sw_miny"]),
-            ";P2PP SIDEWIPEMAXY={}".format(cfg["sw_maxy"]),
-            ";P2PP WIPEFEEDRATE={}".format(cfg["sw_wiperate"])
+            parameters.parameter_line("SIDEWIPELOC", "X{}".format(cfg["sw_xloc"])),
+            parameters.parameter_line("SIDEWIPEMINY", cfg["sw_miny"]),
+            parameters.parameter_line("SIDEWIPEMAXY", cfg["sw_maxy"]),
+            parameters.parameter_line("WIPEFEEDRATE", cfg["sw_wiperate"])
         ]
 
         if cfg["sw_maxy"] == cfg["sw_miny"]:
             cfg["sw_wiperate"] = "200"
 
         if cfg["sw_autoadd"]:
-            swcode.append(";P2PP AUTOADDPURGE")
+            swcode.append(parameters.parameter_line("AUTOADDPURGE"))
 
         # big brain 3d code
 
         bbcode = [
-            ";P2PP BIGBRAIN3D_BLOBSIZE = {}".format(cfg["bb_blobsize"]),
-            ";P2PP BIGBRAIN3D_COOLINGTIME = {}".format(cfg["bb_cooling"]),
-            ";P2PP BIGBRAIN3D_PURGEPOSITION = {}".format(cfg["bb_xloc"]),
-            ";P2PP BIGBRAIN3D_MOTORPOWER_HIGH = {}".format(cfg["bb_motormax"]),
-            ";P2PP BIGBRAIN3D_MOTORPOWER_NORMAL = {}".format(cfg["bb_motormin"]),
-            ";P2PP BIGBRAIN3D_FAN_OFF_DELAY = {}".format(cfg["bb_fandelay"]),
-            ";P2PP BIGBRAIN3D_ENABLE",
-            ";P2PP BIGBRAIN3D_PRIME_BLOBS = {}".format(cfg["bb_priming"]),
-            ";P2PP BIGBRAIN3D_NUMBER_OF_WHACKS = {}".format(cfg["bb_whacks"])]
+            parameters.parameter_line("BIGBRAIN3D_BLOBSIZE", cfg["bb_blobsize"]),
+            parameters.parameter_line("BIGBRAIN3D_COOLINGTIME", cfg["bb_cooling"]),
+            parameters.parameter_line("BIGBRAIN3D_PURGEPOSITION", cfg["bb_xloc"]),
+            parameters.parameter_line("BIGBRAIN3D_MOTORPOWER_HIGH", cfg["bb_motormax"]),
+            parameters.parameter_line("BIGBRAIN3D_MOTORPOWER_NORMAL", cfg["bb_motormin"]),
+            parameters.parameter_line("BIGBRAIN3D_FAN_OFF_PAUSE", cfg["bb_fandelay"]),
+            parameters.parameter_line("BIGBRAIN3D_ENABLE"),
+            parameters.parameter_line("BIGBRAIN3D_PRIME_BLOBS", cfg["bb_priming"]),
+            parameters.parameter_line("BIGBRAIN3D_NUMBER_OF_WHACKS", cfg["bb_whacks"])]
 
         if cfg["bb_left"]:
-            bbcode.append(";P2PP BIGBRAIN3D_LEFT_SIDE")
+            bbcode.append(parameters.parameter_line("BIGBRAIN3D_LEFT_SIDE"))
 
         if cfg["bb_autoadd"]:
-            bbcode.append(";P2PP AUTOADDPURGE")
+            bbcode.append(parameters.parameter_line("AUTOADDPURGE"))
 
         # tower delta
         #############
 
         twcode = [
-            ";P2PP PURGETOWERDELTA={}".format(cfg["tower_maxdelta"])
+            parameters.parameter_line("PURGETOWERDELTA", cfg["tower_maxdelta"])
         ]
 
         # full purge
         #############
 
         fpcode = [
-            ";P2PP FULLPURGEREDUCTION",
-            ";P2PP WIPEFEEDRATE={}".format(cfg["fp_wiperate"])
+            parameters.parameter_line("FULLPURGEREDUCTION"),
+            parameters.parameter_line("WIPEFEEDRATE", cfg["fp_wiperate"])
         ]
 
         if cfg["fp_autoadd"]:
-            swcode.append(";P2PP AUTOADDPURGE")
+            swcode.append(parameters.parameter_line("AUTOADDPURGE"))
 
         for i in cfg["printers"]:
 
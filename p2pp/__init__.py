@@ -1 +1,53 @@
 name = "p2pp_pkg"
+
+
+# the processing context captures the default values of p2pp.variables, it has to be imported before any processing
+from p2pp.context import ProcessingContext
+
+
+# headless processing of a file, used by python -m p2pp and by other tools embedding P2PP
+# nothing Qt related is imported, logging and progress go to the given reporter (see reporters.py)
+# options holds P2PP parameters {keyword: value} that override the ;P2PP lines in the file
+# environment holds the SLIC3R_PP_* variables PrusaSlicer sets for post processing scripts, default os.environ
+# every call runs in a fresh ProcessingContext, pass a context to inspect the state after processing
+# with cache the output is taken from the result cache when the same file was processed before (see cache.py)
+# with profile the run is profiled and the statistics are saved next to the output (see profiler.py)
+# returns 0 when the file was processed, -1 when processing was halted
+def process(input_file, output_file=None, options=None, reporter=None, context=None, environment=None, cache=False, profile=False):
+    import p2pp.mcf as mcf
+    import p2pp.variables as v
+    import version
+
+    if context is None:
+        context = ProcessingContext()
+    if reporter is not None:
+        context.reporter = reporter
+    with context:
+        v.version = version.Version
+        if profile:
+            v.profile = True
+        if cache:
+            import p2pp.cache
+            return p2pp.cache.p2pp_process_file(input_file, output_file, options, environment)
+        return mcf.p2pp_process_file(input_file, output_file, options, environment)
+
+
+# plan only processing of a file: the splices and pings are placed, but no output is generated or written
+# returns the splices, pings, filament per input and printing time as a dict (see planonly.py), None when
+# processing was halted
+def plan(input_file, options=None, reporter=None, context=None, environment=None):
+    import p2pp.mcf as mcf
+    import p2pp.planonly as planonly
+    import p2pp.variables as v
+    import version
+
+    if context is None:
+        context = ProcessingContext()
+    if reporter is not None:
+        context.reporter = reporter
+    with context:
+        v.version = version.Version
+        v.plan_only = True
+        if mcf.p2pp_process_file(input_file, None, options, environment) != 0:
+            return None
+        return planonly.report()
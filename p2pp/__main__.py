@@ -0,0 +1,100 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# headless entry point:  python -m p2pp input.gcode [output.gcode] [-p KEYWORD[=VALUE]]...
+
+import argparse
+import json
+import sys
+import traceback
+
+import p2pp
+import p2pp.p2ppparams as parameters
+import p2pp.stats as stats
+from p2pp.reporters import ConsoleReporter, JsonLinesReporter
+
+
+def parse_options(parameters):
+    options = {}
+    for parameter in parameters:
+        keyword, _, value = parameter.partition("=")
+        options[keyword.strip().upper()] = value.strip() if value else None
+    return options
+
+
+# unknown keywords are most likely typing errors, refuse them before any file is touched
+def check_options(parser, options):
+    unknown = [keyword for keyword in options if not parameters.known_parameter(keyword)]
+    if unknown:
+        parser.error("unknown P2PP parameter: {}".format(", ".join(unknown)))
+
+
+def write_plan(args, options, reporter, context):
+    try:
+        plan = p2pp.plan(args.input, options, reporter, context)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+    if plan is None:
+        return 1
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(stats.report(context), f, indent=2)
+    if args.plan == "-":
+        json.dump(plan, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.plan, "w") as f:
+            json.dump(plan, f, indent=2)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="p2pp", description="P2PP - Palette post processing without user interface")
+    parser.add_argument("input", help="gcode file generated by PrusaSlicer")
+    parser.add_argument("output", nargs="?", help="output file, by default the input file is overwritten")
+    parser.add_argument("-p", "--parameter", action="append", default=[], metavar="KEYWORD[=VALUE]",
+                        help="P2PP parameter, overrides the ;P2PP lines of the input file, can be repeated")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only show warnings")
+    parser.add_argument("--json", action="store_true", help="report log and progress as json lines on stdout")
+    parser.add_argument("--no-cache", action="store_true", help="process the file even when it was processed before with the same settings")
+    parser.add_argument("--stats", metavar="FILE", help="write the processing statistics as json to FILE")
+    parser.add_argument("--profile", action="store_true", help="profile the processing, the statistics are saved as <output>.pstats")
+    parser.add_argument("--plan", metavar="FILE", help="only compute the splices and pings and write them as json to FILE "
+                                                       "('-' for stdout), no output file is written")
+    args = parser.parse_args(argv)
+    options = parse_options(args.parameter)
+    check_options(parser, options)
+
+    if args.json:
+        reporter = JsonLinesReporter()
+    else:
+        reporter = ConsoleReporter(verbose=not args.quiet)
+
+    context = p2pp.ProcessingContext()
+    if args.plan:
+        return write_plan(args, options, reporter, context)
+
+    try:
+        result = p2pp.process(args.input, args.output, options, reporter, context, cache=not args.no_cache,
+                              profile=args.profile)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(stats.report(context), f, indent=2)
+
+    return 0 if result == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# bounding box and extrusion accounting
+#
+# gcode.issue_command only collects the positions and extrusions of the issued moves, the bounding box
+# (v.bb_*), the extrusion per input (v.material_extruded_per_color) and the extrusion per layer
+# (v.layer_extrusion) are computed per chunk of CHUNK moves, with numpy when it is available.
+# The X, Y and Z positions are collected separately, a chunk is flushed as soon as any of them is full.
+# The running total (v.total_material_extruded) is still kept per move, pings and splices are placed on it.
+# flush() has to be called before the results are used (end of the second pass).
+
+import p2pp.variables as v
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHUNK = 65536
+
+
+# SECTION Collect
+
+# called for every extruding move, starts a new run when the input or the layer changes
+def add_extrusion(extrusion):
+    if v.current_tool != v.account_tool or v.last_parsed_layer != v.account_layer:
+        v.account_tool = v.current_tool
+        v.account_layer = v.last_parsed_layer
+        v.account_runs.append((len(v.account_e), v.account_tool, v.account_layer))
+    v.account_e.append(extrusion)
+    if len(v.account_e) >= CHUNK:
+        flush()
+
+
+# SECTION Chunks
+
+def run_sums(extrusions, starts):
+    if numpy is not None:
+        return numpy.add.reduceat(numpy.array(extrusions), starts).tolist()
+    ends = starts[1:] + [len(extrusions)]
+    return [sum(extrusions[start:end]) for start, end in zip(starts, ends)]
+
+
+def flush_extrusion():
+    runs = v.account_runs
+    if not runs:
+        return
+
+    sums = run_sums(v.account_e, [start for start, _, _ in runs])
+    for (_, tool, layer), extruded in zip(runs, sums):
+        v.material_extruded_per_color[tool] += extruded
+        # the moves before the first layer (purge line) are part of the first layer
+        layer = max(layer, 0)
+        if layer >= len(v.layer_extrusion):
+            v.layer_extrusion.extend([0.0] * (layer + 1 - len(v.layer_extrusion)))
+        v.layer_extrusion[layer] += extruded
+
+    v.account_e = []
+    v.account_runs = []
+    v.account_tool = None
+    v.account_layer = None
+
+
+def coordinate_range(values):
+    if numpy is not None:
+        values = numpy.array(values)
+        return float(values.min()), float(values.max())
+    return min(values), max(values)
+
+
+def flush_bounding_box():
+    if v.account_x:
+        low, high = coordinate_range(v.account_x)
+        v.bb_minx = min(low, v.bb_minx)
+        v.bb_maxx = max(high, v.bb_maxx)
+        v.account_x = []
+    if v.account_y:
+        low, high = coordinate_range(v.account_y)
+        v.bb_miny = min(low, v.bb_miny)
+        v.bb_maxy = max(high, v.bb_maxy)
+        v.account_y = []
+    if v.account_z:
+        low, high = coordinate_range(v.account_z)
+        v.bb_minz = min(low, v.bb_minz)
+        v.bb_maxz = max(high, v.bb_maxz)
+        v.account_z = []
+
+
+def flush():
+    flush_extrusion()
+    flush_bounding_box()
@@ -0,0 +1,187 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# batch processing:  python -m p2pp.batch "jobs/*.gcode" [-w WORKERS] [-o OUTPUT_DIR] [-p KEYWORD[=VALUE]]...
+#                    python -m p2pp.batch --watch incoming -o processed
+#
+# the files are processed in a pool of worker processes, every worker processes its files one after the
+# other, each in its own ProcessingContext (see context.py)
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import p2pp
+import p2pp.stats as stats
+from p2pp.__main__ import parse_options, check_options
+
+# SECTION Worker
+
+
+def process_file(input_file, output_file=None, options=None, cache=True):
+    summary = {"input": input_file,
+               "output": output_file or input_file,
+               "status": "error",
+               "splices": 0,
+               "pings": 0,
+               "material": 0.0,
+               "warnings": [],
+               "seconds": 0.0}
+    starttime = time.time()
+    context = p2pp.ProcessingContext()
+    try:
+        # the PrusaSlicer environment of the caller would make every file write to the same output
+        result = p2pp.process(input_file, output_file, options, context=context, environment={}, cache=cache)
+        if result != 0:
+            summary["status"] = "halted"
+        elif context.process_warnings:
+            summary["status"] = "warnings"
+        else:
+            summary["status"] = "ok"
+        summary["splices"] = len(context.splice_extruder_position)
+        summary["pings"] = len(context.ping_extruder_position)
+        summary["material"] = round(context.total_material_extruded, 2)
+        summary["stats"] = stats.report(context)
+    except Exception as e:
+        summary["error"] = "{}: {}".format(type(e).__name__, e)
+        summary["traceback"] = traceback.format_exc()
+    summary["warnings"] = [warning[1:].strip() for warning in context.process_warnings]
+    summary["seconds"] = round(time.time() - starttime, 2)
+    return summary
+
+
+# SECTION Batch
+
+def expand_inputs(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for filename in matches:
+            if filename not in files:
+                files.append(filename)
+    return files
+
+
+def output_name(input_file, output_dir):
+    if output_dir is None:
+        return None
+    return os.path.join(output_dir, os.path.basename(input_file))
+
+
+def process_files(files, workers=None, output_dir=None, options=None, callback=None, cache=True):
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, filename, output_name(filename, output_dir), options, cache) for filename in files]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if callback:
+                callback(summary)
+    # report in the order of the input files
+    order = {filename: idx for idx, filename in enumerate(files)}
+    summaries.sort(key=lambda s: order[s["input"]])
+    return summaries
+
+
+# files are picked up once their size and modification time did not change between two scans
+def watch_directory(directory, output_dir, workers=None, options=None, interval=2.0, callback=None, cache=True):
+    seen = {}
+    done = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while True:
+            for filename in sorted(glob.glob(os.path.join(directory, "*.gcode"))):
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                key = (stat.st_size, stat.st_mtime)
+                if done.get(filename) == key or filename in running.values():
+                    continue
+                if seen.get(filename) == key:
+                    running[pool.submit(process_file, filename, output_name(filename, output_dir), options, cache)] = filename
+                    done[filename] = key
+                seen[filename] = key
+
+            for future in [f for f in running if f.done()]:
+                del running[future]
+                if callback:
+                    callback(future.result())
+            time.sleep(interval)
+
+
+# SECTION Report
+
+def format_summary(summary):
+    line = "{:8} {:4} splices {:5} pings {:10.2f}mm {:7.2f}s  {}".format(summary["status"].upper(),
+                                                                       summary["splices"], summary["pings"],
+                                                                       summary["material"], summary["seconds"],
+                                                                       summary["input"])
+    for warning in summary["warnings"]:
+        line += "\n         {}".format(warning)
+    if "error" in summary:
+        line += "\n         {}".format(summary["error"])
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="p2pp.batch", description="P2PP - process many files in parallel")
+    parser.add_argument("input", nargs="*", help="gcode files or glob patterns")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes (default: cpu count)")
+    parser.add_argument("-o", "--output-dir", default=None, help="directory for the output files, by default the input files are overwritten")
+    parser.add_argument("-p", "--parameter", action="append", default=[], metavar="KEYWORD[=VALUE]",
+                        help="P2PP parameter applied to every file, can be repeated")
+    parser.add_argument("--watch", metavar="DIRECTORY", help="keep processing the gcode files that appear in DIRECTORY")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between two scans of the watched directory")
+    parser.add_argument("--report", metavar="FILE", help="write the per file summary as json to FILE")
+    parser.add_argument("--no-cache", action="store_true", help="process every file, also the ones that were processed before")
+    args = parser.parse_args(argv)
+
+    options = parse_options(args.parameter)
+    check_options(parser, options)
+
+    def show(summary):
+        print(format_summary(summary))
+        sys.stdout.flush()
+
+    if args.watch:
+        if args.output_dir is None or os.path.abspath(args.output_dir) == os.path.abspath(args.watch):
+            parser.error("--watch needs an --output-dir different from the watched directory")
+        os.makedirs(args.output_dir, exist_ok=True)
+        try:
+            watch_directory(args.watch, args.output_dir, args.workers, options, args.interval, show, not args.no_cache)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    files = expand_inputs(args.input)
+    if not files:
+        parser.error("no input files")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    starttime = time.time()
+    summaries = process_files(files, args.workers, args.output_dir, options, show, not args.no_cache)
+    failed = len([s for s in summaries if s["status"] in ("error", "halted")])
+    print("{} files processed in {:.2f}s, {} failed".format(len(summaries), time.time() - starttime, failed))
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
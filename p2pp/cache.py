@@ -0,0 +1,247 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import p2pp.gui as gui
+import p2pp.mcf as mcf
+import p2pp.stats as stats
+import p2pp.variables as v
+import version
+
+# SECTION Result cache
+
+# Processing the same input with the same parameters gives the same output.  The output files of every processed
+# file are kept in the cache directory, keyed on
+#   - the content of the input file (which holds the PrusaSlicer config and the ;P2PP parameters)
+#   - the parameters passed by the caller
+#   - the P2PP version
+#   - the output names (SLIC3R_PP_* environment, or the input and output paths when P2PP is not called by PrusaSlicer)
+# On a hit the output files are copied from the cache instead of processing the file.
+#
+# Every entry is a directory <key> holding the output files (0, 1, ...) and entry.json.  The modification time of
+# entry.json is the last use, the least recently used entries are removed when the cache grows over its size.
+#
+# P2PP_CACHE sets the cache directory, P2PP_CACHE_SIZE its size in MB.
+
+CACHE_FORMAT = 1
+DEFAULT_SIZE = 2048  # MB
+HASH_BLOCK = 1048576
+
+# state restored on a hit, the print summary and the callers (batch summary) use it
+cached_state = ["splice_extruder_position",
+                "ping_extruder_position",
+                "total_material_extruded",
+                "palette_inputs_used",
+                "material_extruded_per_color",
+                "filament_type",
+                "filament_color_code",
+                "filament_ids",
+                "full_purge_reduction",
+                "tower_delta",
+                "min_tower_delta",
+                "max_tower_delta",
+                "palette3",
+                "palette_plus",
+                "accessory_mode",
+                "layer_extrusion",
+                "bb_minx", "bb_miny", "bb_minz",
+                "bb_maxx", "bb_maxy", "bb_maxz"]
+
+
+def default_directory():
+    if "P2PP_CACHE" in os.environ:
+        return os.environ["P2PP_CACHE"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "p2pp")
+
+
+def default_size():
+    try:
+        return int(os.environ.get("P2PP_CACHE_SIZE", DEFAULT_SIZE)) * 1048576
+    except ValueError:
+        return DEFAULT_SIZE * 1048576
+
+
+def file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+# of the SLIC3R_PP_* variables the output name changes the output (file names, job name) and the host the Palette 3
+# warnings, the others change with the printer settings only and do not invalidate the cache
+def cache_key(input_file, output_file, options, environment):
+    host = environment.get("SLIC3R_PP_HOST")
+    description = {"format": CACHE_FORMAT,
+                   "version": version.Version,
+                   "input": file_hash(input_file),
+                   "options": sorted((keyword.upper().strip(), value) for keyword, value in (options or {}).items()),
+                   "output_name": environment.get("SLIC3R_PP_OUTPUT_NAME"),
+                   "host": None if host is None else [host.startswith("File"), host.endswith(".mcfx")]}
+
+    # PrusaSlicer passes a temporary output file, the names come from the environment
+    # otherwise the file names end up in the output
+    if "SLIC3R_PP_OUTPUT_NAME" not in environment:
+        description["paths"] = [os.path.abspath(input_file), os.path.abspath(output_file)]
+
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# output files that are not known in advance (upload to the Palette 3, unprocessed copy) are not cached,
+# neither are profiled runs, processing the file again is what produces the profile
+def cacheable():
+    return len(v.output_files) > 0 and not v.p3_uploadfile and not v.save_unprocessed and not v.profile
+
+
+# SECTION Entries
+
+def entry_path(directory, key):
+    return os.path.join(directory, key)
+
+
+# the output file usually is the input file: the targets are only replaced once all files have been copied next
+# to them, a failing restore leaves the input untouched so it can still be processed
+def restore(directory, key, output_file):
+    path = entry_path(directory, key)
+    copies = []
+    try:
+        with open(os.path.join(path, "entry.json")) as f:
+            entry = json.load(f)
+        sources = [os.path.join(path, str(idx)) for idx in range(len(entry["files"]))]
+        if not all(os.path.isfile(source) for source in sources):
+            return None
+        for source, filename in zip(sources, entry["files"]):
+            target = os.path.abspath(output_file if filename is None else filename)
+            copy = os.path.join(os.path.dirname(target), ".{}.p2pp-{}".format(os.path.basename(target), os.getpid()))
+            copies.append((copy, target))
+            shutil.copyfile(source, copy)
+        for copy, target in copies:
+            os.replace(copy, target)
+        # mark as recently used
+        os.utime(os.path.join(path, "entry.json"), None)
+    except (IOError, OSError, ValueError, KeyError):
+        for copy, _ in copies:
+            if os.path.exists(copy):
+                os.remove(copy)
+        return None
+    return entry
+
+
+def store(directory, key, output_file):
+    files = []
+    size = 0
+    os.makedirs(directory, exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=".tmp-", dir=directory)
+    try:
+        for idx, filename in enumerate(v.output_files):
+            shutil.copyfile(filename, os.path.join(workdir, str(idx)))
+            size += os.path.getsize(filename)
+            # the output file is stored by role, PrusaSlicer uses another temporary name every time
+            files.append(None if os.path.abspath(filename) == os.path.abspath(output_file) else os.path.abspath(filename))
+
+        entry = {"files": files,
+                 "size": size,
+                 "state": {name: getattr(v, name) for name in cached_state},
+                 "warnings": [warning[1:] for warning in v.process_warnings],
+                 "summary": v.summary,
+                 "wait": v.consolewait or (len(v.process_warnings) > 0 and not v.ignore_warnings)}
+        with open(os.path.join(workdir, "entry.json"), "w") as f:
+            json.dump(entry, f)
+
+        # another process may have stored the same result in the mean time
+        os.rename(workdir, entry_path(directory, key))
+    except (IOError, OSError, TypeError, ValueError):
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def entries(directory):
+    result = []
+    for key in os.listdir(directory):
+        if key.startswith("."):
+            continue
+        try:
+            entry_file = os.path.join(directory, key, "entry.json")
+            with open(entry_file) as f:
+                size = json.load(f)["size"]
+            result.append((os.path.getmtime(entry_file), size, key))
+        except (IOError, OSError, ValueError, KeyError):
+            continue
+    return result
+
+
+def evict(directory, max_size):
+    try:
+        cached = sorted(entries(directory))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in cached)
+    for _, size, key in cached:
+        if total <= max_size:
+            break
+        shutil.rmtree(entry_path(directory, key), ignore_errors=True)
+        total -= size
+
+
+# SECTION Processing
+
+def report_hit(entry, input_file):
+    gui.setfilename(os.path.basename(input_file))
+    gui.create_logitem("Output restored from the P2PP cache, file was processed before with the same settings")
+    for name, value in entry["state"].items():
+        setattr(v, name, value)
+    for warning in entry["warnings"]:
+        gui.log_warning(warning)
+    gui.print_summary(entry["summary"])
+    gui.progress_string(101)
+    if entry["wait"]:
+        gui.close_button_enable()
+
+
+def p2pp_process_file(input_file, output_file, options=None, environment=None, directory=None, max_size=None):
+    if output_file is None:
+        output_file = input_file
+    if environment is None:
+        environment = os.environ
+    if directory is None:
+        directory = default_directory()
+    if max_size is None:
+        max_size = default_size()
+    stats.reset_peak_memory()
+    if v.profile:
+        return mcf.p2pp_process_file(input_file, output_file, options, environment)
+
+    starttime = time.time()
+    try:
+        key = cache_key(input_file, output_file, options, environment)
+    except (IOError, OSError):
+        # reading errors are reported by the processing
+        return mcf.p2pp_process_file(input_file, output_file, options, environment)
+
+    entry = restore(directory, key, output_file)
+    if entry is not None:
+        report_hit(entry, input_file)
+        v.processtime = time.time() - starttime
+        return 0
+
+    result = mcf.p2pp_process_file(input_file, output_file, options, environment)
+    if result == 0 and cacheable():
+        store(directory, key, output_file)
+        evict(directory, max_size)
+    return result
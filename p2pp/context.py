@@ -0,0 +1,84 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+import copy
+import threading
+import types
+
+import p2pp.variables as v
+
+# SECTION Processing context
+
+# All processing state lives in p2pp.variables and is used as v.<name> throughout the code.
+# A ProcessingContext owns a private set of that state, starting from the defaults in variables.py.
+# While a context is active its values are installed in p2pp.variables, release() takes the (changed)
+# values back into the context and restores what was there before.
+#
+#     with ProcessingContext() as ctx:
+#         mcf.p2pp_process_file(input_file, output_file)
+#     print(len(ctx.splice_extruder_position))
+#
+# Every file processed in its own context starts from a clean state, so a worker can process any
+# number of files back to back.  The reporter (v.reporter) and the progress state are part of the context,
+# a context without a reporter of its own reports to the reporter of the caller.
+#
+# A context is not thread isolation: the state is swapped in and out of the module globals, so contexts
+# serialize processing.  Only one context can be active in a process, other threads wait in activate()
+# until it is released.  Use processes to process files in parallel.
+
+# defaults captured when this module is first imported, before any file is processed
+_defaults = {}
+for _name, _value in list(vars(v).items()):
+    if _name.startswith("__") or isinstance(_value, (types.ModuleType, types.FunctionType, type)):
+        continue
+    _defaults[_name] = _value
+
+STATE_NAMES = tuple(sorted(_defaults))
+
+_lock = threading.Lock()
+
+
+class ProcessingContext(object):
+
+    __slots__ = STATE_NAMES + ("_saved",)
+
+    def __init__(self, **values):
+        for name in STATE_NAMES:
+            setattr(self, name, copy.deepcopy(_defaults[name]))
+        # the reporter is shared with the caller, not copied
+        self.reporter = None
+        for name, value in values.items():
+            setattr(self, name, value)
+        self._saved = None
+
+    def activate(self):
+        _lock.acquire()
+        if self.reporter is None:
+            self.reporter = v.reporter
+        self._saved = {}
+        for name in STATE_NAMES:
+            self._saved[name] = getattr(v, name)
+            setattr(v, name, getattr(self, name))
+        return self
+
+    def release(self):
+        if self._saved is None:
+            return
+        for name in STATE_NAMES:
+            setattr(self, name, getattr(v, name))
+            setattr(v, name, self._saved[name])
+        self._saved = None
+        _lock.release()
+
+    def __enter__(self):
+        return self.activate()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
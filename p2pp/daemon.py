@@ -0,0 +1,220 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# warm P2PP process:  python -m p2pp.daemon [--address ADDRESS]
+#
+# PrusaSlicer calls p2pp_client.py as post processing script, the client forwards the file and the SLIC3R_PP_*
+# environment to the daemon, which processes it without starting a new interpreter.
+#
+# protocol: the client sends one json line
+#     {"input": "/abs/path.gcode", "output": null, "options": {"KEYWORD": "VALUE"}, "environment": {"SLIC3R_PP_...": ...},
+#      "cache": true, "token": "..."}
+# the daemon answers with json lines from the JsonLinesReporter (log, progress, ...) followed by
+#     {"event": "result", "code": 0, "stats": {...}}
+# stats is the processing statistics report (see stats.py)
+# when the daemon is already processing a file it answers at once with
+#     {"event": "result", "code": 1, "busy": true, "stats": null}
+# and the client processes the file itself
+#
+# ADDRESS is a unix socket path or HOST:PORT, the default is given by default_address() (or the P2PP_DAEMON
+# environment variable).
+#
+# Requests are fully serialized: all processing state lives in module globals (see context.py), a process can
+# only process one file at a time.  A request arriving while another file is processed is refused as busy instead
+# of waiting for it.
+#
+# The daemon reads and writes files with the permissions of its user, so only that user may send requests:
+#   - the unix socket is created in a directory only the user can access (XDG_RUNTIME_DIR or a private 0700
+#     directory in the temp directory), with a umask that keeps it private from the start
+#   - on TCP every request has to carry the token the daemon writes to a file only the user can read (TOKEN_FILE
+#     in private_directory()), a new token is made every time the daemon starts
+
+import argparse
+import hmac
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import traceback
+
+import p2pp
+import p2pp.stats as stats
+from p2pp.reporters import JsonLinesReporter
+
+# loaded at start-up so the first request does not pay for it
+import p2pp.mcf
+import p2pp.psconfig
+import p2pp.gcode
+
+DEFAULT_PORT = 7321
+TOKEN_FILE = "daemon.token"
+
+
+# SECTION Addresses (keep in sync with p2pp_client.py)
+
+# directory only the current user can access, for the socket and the token
+def private_directory():
+    if not hasattr(os, "getuid"):
+        directory = os.path.join(os.path.expanduser("~"), ".p2pp")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.environ["XDG_RUNTIME_DIR"]
+
+    directory = os.path.join(tempfile.gettempdir(), "p2pp-{}".format(os.getuid()))
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    # the temp directory is shared, refuse a directory somebody else made or opened up
+    status = os.lstat(directory)
+    if not os.path.isdir(directory) or os.path.islink(directory) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise OSError("{} is not a private directory of the current user".format(directory))
+    return directory
+
+
+def default_address():
+    if "P2PP_DAEMON" in os.environ:
+        return os.environ["P2PP_DAEMON"]
+    if hasattr(socket, "AF_UNIX") and hasattr(os, "getuid"):
+        return os.path.join(private_directory(), "p2pp.sock")
+    return "127.0.0.1:{}".format(DEFAULT_PORT)
+
+
+def parse_address(address):
+    if ":" in address and os.path.sep not in address:
+        host, port = address.rsplit(":", 1)
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+# SECTION Token
+
+def write_token():
+    token = secrets.token_hex(32)
+    filename = os.path.join(private_directory(), TOKEN_FILE)
+    if os.path.exists(filename):
+        os.remove(filename)
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def authorized(server, request):
+    if server.token is None:
+        return True
+    return hmac.compare_digest(str(request.get("token", "")), server.token)
+
+
+# SECTION Server
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        output = io.TextIOWrapper(self.wfile, encoding="utf-8", newline="\n", write_through=True)
+        reporter = JsonLinesReporter(output)
+        error = None
+        context = p2pp.ProcessingContext()
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            if not authorized(self.server, request):
+                raise PermissionError("request without a valid token refused")
+            # one file at a time, a second client does not wait for the first one
+            if not self.server.busy.acquire(False):
+                reporter.emit("result", code=1, busy=True, stats=None)
+                output.detach()
+                return
+            try:
+                code = p2pp.process(request["input"], request.get("output"), request.get("options"), reporter, context,
+                                    environment=request.get("environment", {}), cache=request.get("cache", True))
+            finally:
+                self.server.busy.release()
+        except Exception as e:
+            error = e
+            code = 1
+        try:
+            if error is not None:
+                reporter.emit("log", level="warning", text="{}: {}".format(type(error).__name__, error))
+                reporter.emit("log", level="info", text="".join(traceback.format_tb(error.__traceback__)))
+            reporter.emit("result", code=code, stats=stats.report(context) if error is None else None)
+            output.detach()
+        except (OSError, ValueError):
+            # client went away
+            pass
+
+
+# every request gets its own thread, so a busy daemon can refuse requests right away
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+
+class TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(address):
+    family, location = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(location):
+            os.remove(location)
+        # only the current user can submit files, the socket is private as soon as it exists
+        mask = os.umask(0o177)
+        try:
+            server = UnixServer(location, RequestHandler)
+        finally:
+            os.umask(mask)
+        server.token = None
+    else:
+        server = TCPServer(location, RequestHandler)
+        server.token = write_token()
+    server.busy = threading.Lock()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="p2pp.daemon", description="P2PP - keep P2PP running for p2pp_client.py")
+    parser.add_argument("--address", help="unix socket path or HOST:PORT (default: P2PP_DAEMON or a private unix socket)")
+    args = parser.parse_args(argv)
+
+    address = args.address
+    if address is None:
+        try:
+            address = default_address()
+        except OSError as e:
+            parser.error(str(e))
+
+    server = make_server(address)
+    print("P2PP daemon listening on {}".format(address))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        family, location = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(location):
+            os.remove(location)
+        if server.token is not None:
+            os.remove(os.path.join(private_directory(), TOKEN_FILE))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
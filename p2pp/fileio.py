@@ -0,0 +1,236 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+import mmap
+import os
+import shutil
+import tempfile
+import zipfile
+
+import p2pp.variables as v
+
+
+# SECTION Input
+
+# the input file is never loaded as a whole, every pass that needs the input
+# iterates over a LineReader which maps the file and yields the stripped lines
+# one at a time.  The file is decoded per block of STREAMINGBUFFER bytes instead of per line,
+# a block always ends on a line end (the utf-8 encoding of other characters never contains "\n")
+
+class LineReader(object):
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = os.path.getsize(filename)
+        self.position = None
+
+    def _blocks(self, f):
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty file or a file that cannot be mapped
+            data = None
+
+        if data is not None:
+            with data:
+                size = len(data)
+                position = 0
+                while position < size:
+                    end = data.rfind(b"\n", position, position + v.streaming_buffer) + 1
+                    if end <= position:
+                        # line longer than the block size
+                        end = data.find(b"\n", position + v.streaming_buffer) + 1 or size
+                    self.position = end
+                    yield data[position:end]
+                    position = end
+            return
+
+        remainder = b""
+        while True:
+            block = f.read(v.streaming_buffer)
+            if not block:
+                break
+            block = remainder + block
+            end = block.rfind(b"\n") + 1
+            remainder = block[end:]
+            if end:
+                self.position = f.tell() - len(remainder)
+                yield block[:end]
+        if remainder:
+            self.position = f.tell()
+            yield remainder
+
+    def __iter__(self):
+        with open(self.filename, "rb") as f:
+            self.position = 0
+            for block in self._blocks(f):
+                lines = block.decode('utf-8').split("\n")
+                if block.endswith(b"\n"):
+                    lines.pop()
+                for line in lines:
+                    yield line.strip()
+        self.position = None
+
+    # the same lines, with the position and length in bytes of every line in the file (see InputMap)
+    def located_lines(self):
+        with open(self.filename, "rb") as f:
+            self.position = 0
+            for block in self._blocks(f):
+                start = self.position - len(block)
+                lines = block.decode('utf-8').split("\n")
+                data = block.split(b"\n")
+                if block.endswith(b"\n"):
+                    lines.pop()
+                    data.pop()
+                for line, raw in zip(lines, data):
+                    yield start, len(raw), line.strip()
+                    start += len(raw) + 1
+        self.position = None
+
+    # fraction of the file that has been read by the running iteration
+    def progress(self):
+        if self.position is None or self.size == 0:
+            return 1.0
+        return min(1.0, self.position / self.size)
+
+
+# random access to the lines of the input file by position, the file is mapped while the map is open
+class InputMap(object):
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+        self.data = None
+
+    def __enter__(self):
+        self.file = open(self.filename, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty file or a file that cannot be mapped
+            self.data = self.file.read()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = None
+        self.file.close()
+        return False
+
+    def line(self, start, length):
+        return self.data[start:start + length].decode('utf-8').strip()
+
+
+# yields the lines of a file starting from the last line, used to parse
+# the configuration block PrusaSlicer appends at the end of the file
+def read_lines_reversed(filename, blocksize=65536):
+    with open(filename, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            step = min(blocksize, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b"\n")
+            remainder = lines[0]
+            for idx in range(len(lines) - 1, 0, -1):
+                yield lines[idx].decode('utf-8').strip()
+        yield remainder.decode('utf-8').strip()
+
+
+# first lines of a file
+def read_lines(filename, count):
+    with open(filename, "rb") as f:
+        for _ in range(count):
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8').strip()
+
+
+# SECTION Output
+
+# output is written as text in large blocks, lines are joined per chunk instead of
+# being encoded and written one at a time
+class GCodeWriter(object):
+
+    def __init__(self, filename, chunk_lines=10000):
+        self.filename = filename
+        self.chunk_lines = chunk_lines
+        self.file = open(filename, "w", encoding="utf-8", newline="", buffering=v.streaming_buffer)
+
+    def write(self, text):
+        self.file.write(text)
+
+    def write_lines(self, lines):
+        for start in range(0, len(lines), self.chunk_lines):
+            self.file.write("\n".join(lines[start:start + self.chunk_lines]))
+            self.file.write("\n")
+
+    def copy_file(self, filename):
+        self.file.flush()
+        with open(filename, "rb") as f:
+            shutil.copyfileobj(f, self.file.buffer, v.streaming_buffer)
+
+    def close(self):
+        self.file.close()
+
+
+# when a writer is attached, the lines issued by gcode.issue_command are written out
+# as soon as v.output_flush_lines lines are waiting in v.processed_gcode
+def attach_output(writer):
+    v.output_writer = writer
+
+
+def flush_output():
+    if v.output_writer is not None and v.processed_gcode:
+        v.output_writer.write_lines(v.processed_gcode)
+        v.stats_flushed_lines += len(v.processed_gcode)
+        v.processed_gcode = []
+
+
+def detach_output():
+    flush_output()
+    v.output_writer = None
+
+
+# in streaming mode the body of the output is written to a temporary file during the
+# second pass, it is copied behind the header once the header is known
+def open_body_file(directory):
+    fd, filename = tempfile.mkstemp(".gcode", "p2pp_", directory or ".")
+    os.close(fd)
+    attach_output(GCodeWriter(filename))
+    return filename
+
+
+def close_body_file():
+    writer = v.output_writer
+    detach_output()
+    writer.close()
+
+
+# SECTION Palette files
+
+# accessory mode file for Palette 2 and Palette+ (.maf/.msf), the header lines end in CRLF
+def write_maf_file(filename, header):
+    with open(filename, "wb") as maf:
+        for h in header:
+            h = str(h).strip("\r\n")
+            maf.write(h.encode('ascii'))
+            maf.write("\r\n".encode('ascii'))
+
+
+# accessory mode file for Palette 3 (.mafx)
+def write_mafx_file(filename, meta, palette, thumbnail):
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("meta.json", meta)
+        zipf.writestr("palette.json", palette)
+        zipf.writestr("thumbnail.png", thumbnail)
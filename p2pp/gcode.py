@@ -7,6 +7,8 @@ __license__ = 'GPLv3 '
 __maintainer__ = 'Tom Van den Eede'
 __email__ = 'P2PP@pandora.be'
 
+import p2pp.accounting as accounting
+import p2pp.fileio as fileio
 import p2pp.variables as v
 import p2pp.bedprojection as bp
 import p2pp.genpreview as gp
@@ -28,6 +30,7 @@ EXTRUDE = 10
 RETRACT = 11
 UNRETRACT = 12
 CLASS = 13
+ORIGINAL = 15  # text of the line as parsed, None once the line has been changed (dirty)
 INTOWER = 256
 
 # PARAM     A   B   C   D  E  F   G   H   I   J   K   L   M   N   O   P   Q   R  S   T   U  V   W   X  Y  Z
@@ -41,113 +44,179 @@ parmidx = [-1, -1, -1, -1, 3, 4, -1, -1, -1, -1, -1, -1, -1, -1, -1, 6, -1, -1,
 # P = 64
 # Other values are not used!!!
 
-# SECTION String -> GCODE
+# parameter letter -> index lookup, built from parmidx so the characters in front of 'A' keep mapping to the
+# same parameters as the original ord(param[0]) - 0x41 index calculation did (e.g. '+' -> E, '>' -> X)
+# all other printable characters map to -1 (parameter goes to OTHER)
+parameter_index = {}
+for _c in range(0x20, 0x7f):
+    parameter_index[chr(_c)] = -1
+for _c in range(0x41 - len(parmidx), 0x41 + len(parmidx)):
+    parameter_index[chr(_c)] = parmidx[_c - 0x41]
 
-def create_command(gcode_line, is_comment=False, userclass=0):
+parameter_bit = [1, 2, 4, 8, 16, 32, 64]
 
-    return_value = [None, None, None, None, None, None, None, None, "", 0, False, False, False, userclass,""]
 
-    if is_comment:
-        return_value[COMMENT] = gcode_line
-    else:
+def _slow_float(s):
+    try:
+        return float(s)
+    except ValueError:
+        return None
 
-        comsplit = gcode_line.split(";", 1)
-        if len(comsplit) == 2:
-            return_value[COMMENT] = ";"+comsplit[1]
 
-        fields = comsplit[0].strip().split(" ")
+# SECTION String -> GCODE
 
-        if len(fields[0]) > 0:
+# original is set for lines read from the input file, they are written as they were read as long as they are
+# not changed (ORIGINAL).  The lines P2PP generates itself are always formatted by create_commandstring.
+def create_command(gcode_line, is_comment=False, userclass=0, original=False):
 
-            return_value[COMMAND] = fields[0]
+    return_value = [None, None, None, None, None, None, None, None, "", 0, False, False, False, userclass, "",
+                    gcode_line if original else None]
 
-            param_coefficient = 0
-            for i in range(1, len(fields)):
-                param = fields[i]
+    if is_comment:
+        return_value[COMMENT] = gcode_line
+        return return_value
 
-                try:
-                    idx = parmidx[ord(param[0])-0x41]
-                    if idx >= 0:
-                        val = float(param[1:])
-                        param_coefficient += 2 ** idx
-                        return_value[idx] = val
-                    else:
-                        return_value[OTHER] = return_value[OTHER] + " " + param
-                except (IndexError, ValueError):
-                    return_value[OTHER] = return_value[OTHER] + " " + param
-
-            if v. replace_G4P0:
-                if return_value[COMMAND] == "G4" and return_value[P] == 0:
-                    return create_command("M400", False, userclass)
-
-            check = (param_coefficient & 31)
-            if check and return_value[COMMAND] == "G1":
-                return_value[MOVEMENT] = check
-                if param_coefficient & 8:
-                    if return_value[E] < 0:
-                        return_value[RETRACT] = True
-                    else:
-                        return_value[UNRETRACT] = (return_value[MOVEMENT] & 7) == 0    # no XYZ
-                        return_value[EXTRUDE] = True
-                        # v.p3_processing_thumbnail_end = True
+    comment_start = gcode_line.find(";")
+    if comment_start == -1:
+        code = gcode_line.strip()
+    else:
+        return_value[COMMENT] = gcode_line[comment_start:]
+        code = gcode_line[:comment_start].strip()
+
+    if not code:
+        return return_value
+
+    fields = code.split(" ")
+    return_value[COMMAND] = fields[0]
+    param_coefficient = 0
+
+    # fast path, all parameter values are numeric, which is the case for about all lines
+    other = None
+    try:
+        for param in fields[1:]:
+            pidx = parameter_index[param[0]]
+            if pidx < 0:
+                if other is None:
+                    other = []
+                other.append(param)
+            else:
+                return_value[pidx] = float(param[1:])
+                param_coefficient += parameter_bit[pidx]
+
+    # slow path, empty parameters, non-numeric values or unusual characters
+    except (KeyError, IndexError, ValueError):
+        return_value[0:7] = [None, None, None, None, None, None, None]
+        param_coefficient = 0
+        other = []
+        for param in fields[1:]:
+            pidx = parameter_index.get(param[:1], -1)
+            if pidx >= 0:
+                val = _slow_float(param[1:])
+                if val is not None:
+                    return_value[pidx] = val
+                    param_coefficient += parameter_bit[pidx]
+                    continue
+            other.append(param)
+
+    if other:
+        return_value[OTHER] = " " + " ".join(other)
+
+    if v.replace_G4P0:
+        if return_value[COMMAND] == "G4" and return_value[P] == 0:
+            return create_command("M400", False, userclass)
+
+    check = (param_coefficient & 31)
+    if check and return_value[COMMAND] == "G1":
+        return_value[MOVEMENT] = check
+        if param_coefficient & 8:
+            if return_value[E] < 0:
+                return_value[RETRACT] = True
+            else:
+                return_value[UNRETRACT] = (return_value[MOVEMENT] & 7) == 0    # no XYZ
+                return_value[EXTRUDE] = True
 
     return return_value
 
 # SECTION GCODE -> String
 
-def create_commandstring(gcode_tupple):
-    if gcode_tupple[COMMAND]:
-        p = gcode_tupple[COMMAND]
-        if gcode_tupple[MOVEMENT]:
-            if gcode_tupple[X] is not None:
-                p = p + " X{:0.3f}".format(gcode_tupple[X])
-                v.bb_minx = min(gcode_tupple[X], v.bb_minx)
-                v.bb_maxx = max(gcode_tupple[X], v.bb_maxx)
-            if gcode_tupple[Y] is not None:
-                p = p + " Y{:0.3f}".format(gcode_tupple[Y])
-                v.bb_miny = min(gcode_tupple[Y], v.bb_miny)
-                v.bb_maxy = max(gcode_tupple[Y], v.bb_maxy)
-            if gcode_tupple[Z] is not None:
-                p = p + " Z{:0.3f}".format(gcode_tupple[Z])
-                v.bb_minz = min(gcode_tupple[Z], v.bb_minz)
-                v.bb_maxz = max(gcode_tupple[Z], v.bb_maxz)
-        else:
-            if gcode_tupple[X] is not None:
-                p = p + " X{}".format(gcode_tupple[X])
-            if gcode_tupple[Y] is not None:
-                p = p + " Y{}".format(gcode_tupple[Y])
-            if gcode_tupple[Z] is not None:
-                p = p + " Z{}".format(gcode_tupple[Z])
-
-        if gcode_tupple[E] is not None:
-            p = p + " E{:0.5f}".format(gcode_tupple[E])
-        if gcode_tupple[F] is not None:
-            p = p + " F{}".format(int(gcode_tupple[F]))
-        if gcode_tupple[S] is not None:
-            tmpv = float(gcode_tupple[S])
-            if tmpv == int(tmpv):
-                p = p + " S{}".format(int(gcode_tupple[S]))
+# output format per presence mask, built on first use
+# mask: parameter_bit of the X Y Z E F S P values that are set, + 128 for movements (coordinates with 3 decimals)
+command_templates = {}
+
+
+def command_template(mask):
+    template = "%s"
+    for idx, letter in enumerate("XYZEFSP"):
+        if mask & parameter_bit[idx]:
+            if idx <= Z:
+                template += " " + letter + ("%.3f" if mask & 128 else "%s")
+            elif idx == E:
+                template += " E%.5f"
+            elif idx == S:
+                template += " S%s"
             else:
-                p = p + " S{}".format(float(gcode_tupple[S]))
-        if gcode_tupple[P] is not None:
-            p = p + " P{}".format(int(gcode_tupple[P]))
-        p = p + gcode_tupple[OTHER]
-        if gcode_tupple[COMMENT] != "":
-            p = p + " " + gcode_tupple[COMMENT]
-    else:
-        p = gcode_tupple[COMMENT]
+                template += " " + letter + "%d"
+    command_templates[mask] = template
+    return template
+
+
+# the bounding box is computed per chunk of positions, see accounting.py
+def update_bounding_box(gcode_tupple):
+    if gcode_tupple[X] is not None:
+        v.account_x.append(gcode_tupple[X])
+        if len(v.account_x) >= accounting.CHUNK:
+            accounting.flush_bounding_box()
+    if gcode_tupple[Y] is not None:
+        v.account_y.append(gcode_tupple[Y])
+        if len(v.account_y) >= accounting.CHUNK:
+            accounting.flush_bounding_box()
+    if gcode_tupple[Z] is not None:
+        v.account_z.append(gcode_tupple[Z])
+        if len(v.account_z) >= accounting.CHUNK:
+            accounting.flush_bounding_box()
+
+
+def create_commandstring(gcode_tupple):
+    if not gcode_tupple[COMMAND]:
+        return gcode_tupple[COMMENT]
+
+    x, y, z, e, f, s, p = gcode_tupple[0:7]
+    mask = ((x is not None) | (y is not None) << 1 | (z is not None) << 2 | (e is not None) << 3 |
+            (f is not None) << 4 | (s is not None) << 5 | (p is not None) << 6)
+
+    if gcode_tupple[MOVEMENT]:
+        mask |= 128
+        update_bounding_box(gcode_tupple)
+
+    # S is written as an integer when it has no decimals
+    if s is not None:
+        s = float(s)
+        if s == int(s):
+            s = int(s)
+
+    values = tuple(value for value in (gcode_tupple[COMMAND], x, y, z, e, f, s, p) if value is not None)
+    try:
+        line = command_templates[mask] % values
+    except KeyError:
+        line = command_template(mask) % values
+
+    if gcode_tupple[OTHER]:
+        line += gcode_tupple[OTHER]
+    if gcode_tupple[COMMENT]:
+        line += " " + gcode_tupple[COMMENT]
     # DEBUG INFORMATION // COMMENT OUT BEFORE COMPILING
     # try:
-    #     p = p + ";\t{} - ".format(gcode_tupple[CLASS])+v.classes[gcode_tupple[CLASS]]
+    #     line = line + ";\t{} - ".format(gcode_tupple[CLASS])+v.classes[gcode_tupple[CLASS]]
     # except KeyError:
-    #     p = p + "\tUnknown class {}".format(gcode_tupple[CLASS])
-    # p = p + "[ {} {} ]".format(gcode_tupple[CLASS], gcode_tupple[MOVEMENT])
+    #     line = line + "\tUnknown class {}".format(gcode_tupple[CLASS])
+    # line = line + "[ {} {} ]".format(gcode_tupple[CLASS], gcode_tupple[MOVEMENT])
 
-    return p
+    return line
 
 # SECTION Move to Comment
 
 def move_to_comment(gcode_tupple, text):
+    gcode_tupple[ORIGINAL] = None
     if gcode_tupple[COMMAND]:
         gcode_tupple[COMMENT] = ""
         gcode_tupple[COMMENT] = "; [{}] - {}".format(text, create_commandstring(gcode_tupple))
@@ -184,21 +253,21 @@ def issue_command(gcode_tupple, speed=0):
 
             # preview simulatrion -- Z Height
             if gcode_tupple[MOVEMENT] & 4:
-                gp.z = gcode_tupple[Z]
+                v.preview_z = gcode_tupple[Z]
             # end preview simulation
 
             if gcode_tupple[MOVEMENT] & 8:  # movement WITH extrusion
                 extrusion = gcode_tupple[E] * v.extrusion_multiplier
                 v.total_material_extruded += extrusion
-                v.material_extruded_per_color[v.current_tool] += extrusion
+                accounting.add_extrusion(extrusion)
 
                 # preview simulation in this case there is Extruder movement
                 tmp = gcode_tupple[MOVEMENT] & 3
-                if tmp:
+                if tmp and not v.plan_only:
                     if tmp == 1:
-                        gp.add_extrusion(gcode_tupple[X], gp.prevy, v.current_tool, gcode_tupple[E])
+                        gp.add_extrusion(gcode_tupple[X], v.preview_prevy, v.current_tool, gcode_tupple[E])
                     elif tmp == 2:
-                        gp.add_extrusion(gp.prevx, gcode_tupple[Y], v.current_tool, gcode_tupple[E])
+                        gp.add_extrusion(v.preview_prevx, gcode_tupple[Y], v.current_tool, gcode_tupple[E])
                     else:
                         gp.add_extrusion(gcode_tupple[X], gcode_tupple[Y], v.current_tool, gcode_tupple[E])
                 # end preview simulation
@@ -210,27 +279,41 @@ def issue_command(gcode_tupple, speed=0):
                         v.absolute_counter = 0
                     v.absolute_counter += gcode_tupple[E]
                     gcode_tupple[E] = v.absolute_counter
+                    gcode_tupple[ORIGINAL] = None
             else:
 
                 # preview simulation in this case there is NO Extruder movement
                 if gcode_tupple[MOVEMENT] & 1:
-                    gp.prevx = gcode_tupple[X]
+                    v.preview_prevx = gcode_tupple[X]
                 if gcode_tupple[MOVEMENT] & 2:
-                    gp.prevy = gcode_tupple[Y]
+                    v.preview_prevy = gcode_tupple[Y]
                 # end preview_simulation
 
         elif v.absolute_extruder:
             if gcode_tupple[COMMAND] == "M83":
                 gcode_tupple[COMMAND] = "M82"
+                gcode_tupple[ORIGINAL] = None
             if gcode_tupple[COMMAND] == "G92":
                 if gcode_tupple[E] is not None:
                     v.absolute_counter = gcode_tupple[E]
 
-    s = create_commandstring(gcode_tupple)
+    # plan only, no output is generated
+    if v.plan_only:
+        return
+
+    if gcode_tupple[ORIGINAL] is None:
+        s = create_commandstring(gcode_tupple)
+    else:
+        # unchanged line, issued as it was read
+        s = gcode_tupple[ORIGINAL]
+        if gcode_tupple[MOVEMENT]:
+            update_bounding_box(gcode_tupple)
     if speed:
         s = s.replace("%SPEED%", "{:0.0f}".format(speed))
 
     v.processed_gcode.append(s)
+    if v.output_writer is not None and len(v.processed_gcode) >= v.output_flush_lines:
+        fileio.flush_output()
 
 
 def issue_code(code_string, is_comment=False):
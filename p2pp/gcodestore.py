@@ -0,0 +1,212 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+from array import array
+
+import p2pp.gcode as gcode
+
+# SECTION Storage layout
+
+# a parsed gcode line (see gcode.create_command) is a 16 element list, costing a few hundred bytes per line.
+# The store keeps the same information in columns:
+#   mask       presence of the X/Y/Z/E/F/S/P parameters (same bit order as the MOVEMENT field) + flags below
+#   values     the parameter values that are present, packed one after the other
+#   command    index in the interned command table, 0 = no command (comment line)
+#   movement   MOVEMENT field
+#   lineclass  CLASS field
+#   text       OTHER and COMMENT fields, utf-8 encoded in one shared buffer
+#   source     position and length in bytes of the line in the input file, the ORIGINAL text of unchanged
+#              command lines is read back from the input (fileio.InputMap) instead of being kept in the store,
+#              the ORIGINAL text of a comment line is its COMMENT
+# The lists handed out by get() are fresh copies, changing them does not change the store.
+
+PARAMETER_MASK = 127
+FLAG_EXTRUDE = 128
+FLAG_RETRACT = 256
+FLAG_UNRETRACT = 512
+FLAG_UNDEFINED = 1024   # EXTRUDE/RETRACT/UNRETRACT are None (line moved to comment)
+FLAG_OTHER = 2048       # text buffer contains OTHER + separator + COMMENT
+FLAG_ORIGINAL = 4096    # line is unchanged, for command lines ORIGINAL is the source text in the input file
+
+TEXT_SEPARATOR = "\x00"
+
+# parameter positions for every possible parameter mask
+_parameters = [tuple(idx for idx in range(7) if mask & (1 << idx)) for mask in range(128)]
+
+
+class GCodeStore(object):
+
+    def __init__(self):
+        self.mask = array('H')
+        self.command = array('I')
+        self.movement = array('H')
+        self.lineclass = array('H')
+        self.value_start = array('q')
+        self.values = array('d')
+        self.text_start = array('q')
+        self.text = bytearray()
+        self.source_start = array('q')
+        self.source_length = array('I')
+        self.commands = [None]
+        self.command_index = {None: 0}
+
+    def __len__(self):
+        return len(self.mask)
+
+    def __iter__(self):
+        for index in range(len(self.mask)):
+            yield self.get(index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.mask)
+        if not 0 <= index < len(self.mask):
+            raise IndexError("GCodeStore index out of range")
+        return self.get(index)
+
+    # source_start and source_length locate the line in the input file, only needed for unchanged command lines
+    def append(self, code, source_start=0, source_length=0):
+        mask = 0
+        for idx in range(7):
+            if code[idx] is not None:
+                mask |= 1 << idx
+        self.value_start.append(len(self.values))
+        for idx in _parameters[mask]:
+            self.values.append(code[idx])
+
+        if code[gcode.EXTRUDE] is None and code[gcode.RETRACT] is None and code[gcode.UNRETRACT] is None:
+            mask |= FLAG_UNDEFINED
+        else:
+            if code[gcode.EXTRUDE]:
+                mask |= FLAG_EXTRUDE
+            if code[gcode.RETRACT]:
+                mask |= FLAG_RETRACT
+            if code[gcode.UNRETRACT]:
+                mask |= FLAG_UNRETRACT
+
+        command = code[gcode.COMMAND]
+
+        self.text_start.append(len(self.text))
+        if code[gcode.ORIGINAL] is not None:
+            mask |= FLAG_ORIGINAL
+        self.source_start.append(source_start)
+        self.source_length.append(source_length)
+        if code[gcode.OTHER]:
+            mask |= FLAG_OTHER
+            self.text += (code[gcode.OTHER] + TEXT_SEPARATOR + code[gcode.COMMENT]).encode('utf-8')
+        elif code[gcode.COMMENT]:
+            self.text += code[gcode.COMMENT].encode('utf-8')
+
+        try:
+            command_id = self.command_index[command]
+        except KeyError:
+            command_id = len(self.commands)
+            self.commands.append(command)
+            self.command_index[command] = command_id
+
+        self.mask.append(mask)
+        self.command.append(command_id)
+        self.movement.append(code[gcode.MOVEMENT])
+        self.lineclass.append(code[gcode.CLASS])
+
+    # source is the fileio.InputMap of the input file, without it unchanged command lines have no ORIGINAL text
+    def get(self, index, source=None):
+        mask = self.mask[index]
+        command = self.commands[self.command[index]]
+        code = [None, None, None, None, None, None, None,
+                command, "", self.movement[index],
+                False, False, False, self.lineclass[index], "", None]
+
+        if mask & PARAMETER_MASK:
+            position = self.value_start[index]
+            for idx in _parameters[mask & PARAMETER_MASK]:
+                code[idx] = self.values[position]
+                position += 1
+
+        if mask & FLAG_UNDEFINED:
+            code[gcode.EXTRUDE] = None
+            code[gcode.RETRACT] = None
+            code[gcode.UNRETRACT] = None
+        else:
+            code[gcode.EXTRUDE] = (mask & FLAG_EXTRUDE) != 0
+            code[gcode.RETRACT] = (mask & FLAG_RETRACT) != 0
+            code[gcode.UNRETRACT] = (mask & FLAG_UNRETRACT) != 0
+
+        start = self.text_start[index]
+        if index + 1 < len(self.text_start):
+            end = self.text_start[index + 1]
+        else:
+            end = len(self.text)
+        if end > start:
+            text = self.text[start:end].decode('utf-8')
+            if mask & FLAG_OTHER:
+                code[gcode.OTHER], code[gcode.COMMENT] = text.split(TEXT_SEPARATOR, 1)
+            else:
+                code[gcode.COMMENT] = text
+        if mask & FLAG_ORIGINAL:
+            if not command:
+                code[gcode.ORIGINAL] = code[gcode.COMMENT]
+            elif source is not None:
+                code[gcode.ORIGINAL] = source.line(self.source_start[index], self.source_length[index])
+
+        return code
+
+    def get_parameter(self, index, parameter):
+        mask = self.mask[index]
+        if not mask & (1 << parameter):
+            return None
+        position = self.value_start[index]
+        for idx in _parameters[mask & PARAMETER_MASK]:
+            if idx == parameter:
+                return self.values[position]
+            position += 1
+
+
+# SECTION Segmented store
+
+# the parsed file is kept in segments of SEGMENT_LINES lines, consume() hands out the lines in order
+# and drops every segment as soon as all its lines have been handed out, so memory is released
+# while the second pass runs without ever copying the remaining lines
+# the lines can only be read through consume(), there is no random access into the store
+
+SEGMENT_LINES = 65536
+
+
+class SegmentedGCodeStore(object):
+
+    def __init__(self, segment_lines=SEGMENT_LINES):
+        self.segment_lines = segment_lines
+        self.segments = []
+        self.length = 0
+        # the command table is shared by all segments
+        self.commands = [None]
+        self.command_index = {None: 0}
+
+    def __len__(self):
+        return self.length
+
+    def append(self, code, source_start=0, source_length=0):
+        if not self.segments or len(self.segments[-1]) >= self.segment_lines:
+            segment = GCodeStore()
+            segment.commands = self.commands
+            segment.command_index = self.command_index
+            self.segments.append(segment)
+        self.segments[-1].append(code, source_start, source_length)
+        self.length += 1
+
+    def consume(self, source=None):
+        segments = self.segments
+        for number in range(len(segments)):
+            segment = segments[number]
+            segments[number] = None
+            get = segment.get
+            for index in range(len(segment)):
+                yield get(index, source)
+        self.segments = []
+        self.length = 0
@@ -4,22 +4,20 @@
 # import p2pp.variables as v
 # from cycler import cycler
 
-extrusions = {}
-z = 0
-prevx = 0
-prevy = 0
+import p2pp.variables as v
+
+# the simulation state is kept in p2pp.variables (preview_*)
 
 
 def add_extrusion(x, y, tool, extrusion):
-    global prevx, prevy, extrusions
     if extrusion > 0:
         try:
-            extrusions[z].append((x, y, prevx, prevy, tool))
+            v.preview_extrusions[v.preview_z].append((x, y, v.preview_prevx, v.preview_prevy, tool))
         except KeyError:
-            extrusions[z] = [(x, y, prevx, prevy, tool)]
+            v.preview_extrusions[v.preview_z] = [(x, y, v.preview_prevx, v.preview_prevy, tool)]
     else:
-        prevx = x
-        prevy = y
+        v.preview_prevx = x
+        v.preview_prevy = y
 
 
 def buildpreview():
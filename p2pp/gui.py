@@ -7,21 +7,24 @@ __license__ = 'GPLv3'
 __maintainer__ = 'Tom Van den Eede'
 __email__ = 'P2PP@pandora.be'
 
-from PyQt5 import uic, QtWebEngineWidgets
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtGui import QFont
+import time
 import traceback
-import image_rc
+
 import p2pp.variables as v
 import p2pp.colornames as colornames
-import version
-import sys
-import os
-import traceback
+from p2pp.reporters import WARNING_COLOR
+
+# all logging and progress information goes to the active reporter v.reporter (see reporters.py)
+# the P2PP window installs its Qt reporter when p2pp.qtgui is imported, no Qt code is loaded otherwise
+# the reporter is part of the processing state, set_reporter() inside a ProcessingContext only changes that context
+
+
+def set_reporter(new_reporter):
+    v.reporter = new_reporter
 
-last_pct = -10
 
-ui_file = "p2pp.ui"
+def interactive():
+    return v.reporter.interactive
 
 
 def logexception(e):
@@ -46,6 +49,12 @@ def print_summary(summary):
     create_logitem("Number of splices:    {0:5}".format(len(v.splice_extruder_position)))
     create_logitem("Number of pings:      {0:5}".format(len(v.ping_extruder_position)))
     create_logitem("Total print length {:-8.2f}mm".format(v.total_material_extruded))
+    if v.layer_extrusion:
+        layer = v.layer_extrusion.index(max(v.layer_extrusion))
+        create_logitem("Longest layer      {:-8.2f}mm (layer {})".format(v.layer_extrusion[layer], layer))
+    if v.bb_minx <= v.bb_maxx:
+        create_logitem("Bounding box       X {:.2f} - {:.2f}  Y {:.2f} - {:.2f}  Z {:.2f} - {:.2f}"
+                       .format(v.bb_minx, v.bb_maxx, v.bb_miny, v.bb_maxy, v.bb_minz, v.bb_maxz))
 
     if v.full_purge_reduction or v.tower_delta:
         create_emptyline()
@@ -67,30 +76,16 @@ def print_summary(summary):
 
 
 def progress_string(pct):
-    global last_pct
-    if pct - last_pct < 2:
-        return
-    if int(last_pct/10) != int(pct/10):
-        app.sync()
-
-    form.progress.setProperty("value", min(100, pct))
-    if pct >= 100:
-        form.label_5.setText("")
-        if len(v.process_warnings) == 0:
-            form.textBrowser.setStyleSheet("background-color: #DDFFDD;")
-            form.label_6.setText("COMPLETED OK")
-            form.label_6.setStyleSheet("color: #008000")
-        else:
-            form.textBrowser.setStyleSheet("background-color: #FFDDDD;")
-            form.label_6.setText("COMPLETED WITH WARNINGS")
-            form.label_6.setStyleSheet("color: #FF0000")
-
-    last_pct = pct
+    if 0 < pct < 100:
+        now = time.time()
+        if now - v.last_progress < v.reporter.progress_interval:
+            return
+        v.last_progress = now
+    v.reporter.progress(pct)
 
 
 def create_logitem(text, color="#000000", force_update=True, position=0):
-    word = '<span style=\" color: {}\">  {}</span>'.format(color, text)
-    form.textBrowser.append(word)
+    v.reporter.log(text, color)
 
 
 def create_colordefinition(reporttype, p2_input, filament_type, color_code, filamentused):
@@ -113,70 +108,21 @@ def create_colordefinition(reporttype, p2_input, filament_type, color_code, fila
     if reporttype == 1:
         word = "  \t{}  {}  - {} <span style=\" color: #{};\">[######]]</span>   \t{:15} {}".format(name, p2_input, filament_type, color_code, colornames.find_nearest_colour(color_code), filament_id)
 
-    form.textBrowser.append(word)
+    v.reporter.log(word, None)
 
 
 def create_emptyline():
     create_logitem('')
 
 
-def on_click():
-    sys.exit(0)
-
-
 def close_button_enable():
-    if not v.exit_enabled:
-        form.exitButton.clicked.connect(on_click)
-        form.exitButton.setEnabled(True)
-        v.exit_enabled = True
-        app.exec_()
+    v.reporter.finish()
 
 
 def setfilename(text):
-    form.filename.setText(text)
-    if text == "":
-        form.filename.setText('')
-        form.label_4.setText('')
+    v.reporter.set_filename(text)
 
 
 def log_warning(text):
     v.process_warnings.append(";" + text)
-    create_logitem(text, "#FF0000")
-
-
-# SECTION MAIN Routine
-
-if sys.platform == 'darwin' or sys.platform == 'linux':
-    if len(os.path.dirname(sys.argv[0])) > 0:
-        ui = "{}/{}".format(os.path.dirname(sys.argv[0]), ui_file)
-    else:
-        ui = ui_file
-else:
-    ui = "p2pp.ui"
-    if len(os.path.dirname(sys.argv[0])) > 0:
-        ui = "{}\\{}".format(os.path.dirname(sys.argv[0]), ui_file)
-    else:
-        ui = ui_file
-
-app = QApplication([])
-Form, Window = uic.loadUiType(ui)
-window = Window()
-form = Form()
-form.setupUi(window)
-create_logitem("P2PP Version: {}".format(version.Version))
-create_logitem("Python Version: {}".format(sys.version.split(' ')[0]))
-create_logitem("Platform: {}".format(sys.platform))
-create_emptyline()
-
-if sys.platform != "darwin":
-    form.filename.setFont(QFont("Courier", 8))
-    form.label_6.setFont(QFont("Courier", 10))
-    form.label_5.setFont(QFont("Courier", 8))
-    form.label_4.setFont(QFont("Courier", 8))
-    form.label.setFont(QFont("Courier", 8))
-    form.exitButton.setFont(QFont("Courier", 8))
-    form.textBrowser.setFont(QFont("Courier", 8))
-window.show()
-app.sync()
-
-
+    create_logitem(text, WARNING_COLOR)
@@ -0,0 +1,43 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+from bisect import bisect_right
+
+import p2pp.variables as v
+
+# SECTION Layer index
+
+# the first pass records the input line at which every layer starts in v.layer_starts (ascending).
+# The list is never changed afterwards, the second pass walks it with a cursor and other code can
+# look up the layer of any input line.
+
+
+def add_layer_start(line):
+    v.layer_starts.append(line)
+
+
+def layer_count():
+    return len(v.layer_starts)
+
+
+# layer of an input line, -1 for the lines before the first layer
+def layer_at(line):
+    return bisect_right(v.layer_starts, line) - 1
+
+
+# first input line of a layer
+def layer_start(layer):
+    return v.layer_starts[layer]
+
+
+# input lines of a layer, the last layer runs to the end of the file
+def layer_lines(layer):
+    if layer + 1 < len(v.layer_starts):
+        return range(v.layer_starts[layer], v.layer_starts[layer + 1])
+    return range(v.layer_starts[layer], max(v.input_line_count, v.layer_starts[layer]))
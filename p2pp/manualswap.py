@@ -10,10 +10,12 @@ __email__ = 'P2PP@pandora.be'
 import p2pp.variables as v
 import p2pp.gui as gui
 import p2pp.gcode as gc
+import p2pp.stats as stats
 
 warning = True
 
 
+@stats.generator("manualswap")
 def swap_pause(command):
     global warning
     if v.z_maxheight > 0:
@@ -28,5 +30,6 @@ def swap_pause(command):
     gc.issue_code(command)
 
 
+@stats.generator("manualswap")
 def swap_unpause(z=v.current_position_z):
     gc.issue_code("G1 Z{:.2f} F10800".format(z))
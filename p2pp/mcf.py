@@ -8,13 +8,23 @@ __maintainer__ = 'Tom Van den Eede'
 __email__ = 'P2PP@pandora.be'
 
 import os
+import sys
 import time
+import p2pp.accounting as accounting
+import p2pp.fileio as fileio
 import p2pp.gcode as gcode
+import p2pp.gcodestore as gcodestore
 import p2pp.gui as gui
+import p2pp.layers as layers
+import p2pp.p2ppparams as parameters
 import p2pp.pings as pings
+import p2pp.profiler as profiler
 import p2pp.purgetower as purgetower
+import p2pp.sidecar as sidecar
+import p2pp.stats as stats
+import p2pp.toolchanges as toolchanges
 import p2pp.variables as v
-from p2pp.psconfig import parse_config_parameters
+from p2pp.psconfig import parse_config_file
 from p2pp.omega import header_generate_omega, header_generate_omega_palette3
 from p2pp.sidewipe import create_side_wipe
 import p2pp.manualswap as swap
@@ -23,8 +33,6 @@ import base64
 import version
 import zipfile
 
-import p2pp.p3_upload as upload
-
 
 # GCODE BLOCK CLASSES
 CLS_UNDEFINED = 0
@@ -82,6 +90,7 @@ def speed_limiter(g_code):
     if g_code[gcode.F] is not None and g_code[gcode.EXTRUDE] and g_code[gcode.F] > v.wipe_feedrate:
         g_code[gcode.COMMENT] = ";-- SLOW DOWN {} --> {}--;".format(g_code[gcode.F], v.wipe_feedrate)
         g_code[gcode.F] = v.wipe_feedrate
+        g_code[gcode.ORIGINAL] = None
         v.keep_speed = v.wipe_feedrate
 
 
@@ -219,7 +228,7 @@ def check_tower_update(stage):
         v.side_wipe_towerdefined = True
 
 
-def find_alternative_tower():
+def find_alternative_tower(gcode_lines):
     v.wipe_tower_info_maxx = v.wipe_tower_posx
     v.wipe_tower_info_minx = v.wipe_tower_posx
     v.wipe_tower_info_maxy = v.wipe_tower_posy
@@ -227,8 +236,7 @@ def find_alternative_tower():
 
     if v.wipe_tower_posx and v.wipe_tower_posy:
         state = 0
-        for i in range(len(v.input_gcode)):
-            line = v.input_gcode[i]
+        for line in gcode_lines:
             if line.startswith(";"):
                 if line.startswith(";TYPE:Prime tower") or line.startswith(";TYPE:Wipe tower"):
                     state = 1
@@ -293,7 +301,7 @@ def process_layer(layer, index):
     if layer == v.last_parsed_layer:
         return
     v.last_parsed_layer = layer
-    v.layer_end.append(index)
+    layers.add_layer_start(index)
     if layer > 0:
         v.skippable_layer.append((v.layer_emptygrid_counter > 0) and (v.layer_toolchange_counter == 0))
 
@@ -301,33 +309,43 @@ def process_layer(layer, index):
     v.layer_emptygrid_counter = 0
 
 
-def parse_gcode_first_pass():
+def set_line_class(index, line_class):
+    # all lines as from index get line_class, runs starting at or after index are replaced
+    while v.class_runs and v.class_runs[-1][0] >= index:
+        v.class_runs.pop()
+    if not v.class_runs or v.class_runs[-1][1] != line_class:
+        v.class_runs.append([index, line_class])
+
+
+def parse_gcode_first_pass(gcode_lines):
     v.layer_toolchange_counter = 0
     v.layer_emptygrid_counter = 0
 
     v.block_classification = CLS_NORMAL
     v.previous_block_classification = CLS_NORMAL
-    total_line_count = len(v.input_gcode)
+
+    # the first pass only records the line classes and tower positions, the
+    # parsed lines are kept for the second pass unless running in streaming mode
+    v.class_runs = []
+    v.intower_toggles = []
+    v.parsed_gcode = gcodestore.SegmentedGCodeStore()
+    toolchanges.start_table()
+    intower_state = False
 
     flh = int(v.first_layer_height * 1000)
     olh = int(v.layer_height * 1000)
 
-    backpass_line = -1
-    jndex = 0
+    backpass_line = 0
+    index = -1
 
-    find_alternative_tower()
+    find_alternative_tower(gcode_lines)
 
-    for index in range(total_line_count):
+    for index, (source_start, source_length, line) in enumerate(gcode_lines.located_lines()):
 
         v.previous_block_classification = v.block_classification
 
-        # memory management, reduce size of data structures when data is processed
-        line = v.input_gcode[jndex]
-        jndex += 1
-        if jndex == 100000:
-            gui.progress_string(4 + 46 * index // total_line_count)
-            v.input_gcode = v.input_gcode[jndex:]
-            jndex = 0
+        if index % 10000 == 0:
+            gui.progress_string(4 + int(46 * gcode_lines.progress()))
 
         # actual line processing, starting with comments processing
         if line.startswith(';'):
@@ -335,7 +353,7 @@ def parse_gcode_first_pass():
             is_comment = True
 
             # extract thumbnail from gcode file
-            if not v.p3_processing_thumbnail_end:
+            if not v.p3_processing_thumbnail_end and not v.plan_only:
                 if line.startswith("; thumbnail"):
                     v.p3_thumbnail = not v.p3_thumbnail
                     if not v.p3_thumbnail:
@@ -372,23 +390,31 @@ def parse_gcode_first_pass():
                         v.block_classification = CLS_TOOL_PURGE
                     cur_tool = int(line[1])
                     v.set_tool = cur_tool
+                    toolchanges.add_toolchange(index, cur_tool, intower_state)
             except (TypeError, ValueError):
                 gui.log_warning("Unknown T-command: {}".format(line))
             except IndexError:   # in case there is an empty line there will be no line[0]
                 pass
 
-        code = gcode.create_command(line, is_comment, v.block_classification)
-        v.parsed_gcode.append(code)
+        code = gcode.create_command(line, is_comment, v.block_classification, True)
+        if not (v.streaming_mode or v.plan_only):
+            v.parsed_gcode.append(code, source_start, source_length)
+
+        if not v.class_runs or v.class_runs[-1][1] != v.block_classification:
+            v.class_runs.append([index, v.block_classification])
+            toolchanges.end_extrusion()
+
+        if code[gcode.MOVEMENT] & 8:
+            toolchanges.add_extrusion(index, code)
 
         if v.block_classification != v.previous_block_classification:
 
             if v.block_classification in [CLS_TOOL_START, CLS_TOOL_UNLOAD, CLS_EMPTY, CLS_BRIM]:
-                for idx in range(backpass_line, len(v.parsed_gcode)):
-                    v.parsed_gcode[idx][gcode.CLASS] = v.block_classification
+                set_line_class(backpass_line, v.block_classification)
 
         # determine tower size - old method
+        intower = v.tower_measure
         if v.tower_measure:
-            code[gcode.MOVEMENT] += gcode.INTOWER
             if code[gcode.X]:
                 v.wipe_tower_info_minx = min(v.wipe_tower_info_minx, code[gcode.X] - 2 * v.extrusion_width)
                 v.wipe_tower_info_maxx = max(v.wipe_tower_info_maxx, code[gcode.X] + 2 * v.extrusion_width)
@@ -406,70 +432,104 @@ def parse_gcode_first_pass():
         # determine block separators by looking at the last full XY positioning move without extrusion
         if (code[gcode.MOVEMENT] & 3) == 3: # XY
             if (code[gcode.MOVEMENT] & 8) == 0: # no extrusion
-                backpass_line = len(v.parsed_gcode) - 1
+                backpass_line = index
+                toolchanges.end_extrusion()
 
             # add
             if v.side_wipe_towerdefined:
                 if ((v.wipe_tower_info_minx <= code[gcode.X] <= v.wipe_tower_info_maxx) and
                         (v.wipe_tower_info_miny <= code[gcode.Y] <= v.wipe_tower_info_maxy)):
-                    code[gcode.MOVEMENT] += gcode.INTOWER
+                    intower = True
 
             if v.block_classification in [CLS_ENDGRID, CLS_ENDPURGE]:
-                if not (code[gcode.MOVEMENT] & gcode.INTOWER):
-                    v.parsed_gcode[-1][gcode.CLASS] = CLS_NORMAL
+                if not intower:
+                    set_line_class(index, CLS_NORMAL)
                     v.block_classification = CLS_NORMAL
 
+        if intower != intower_state:
+            v.intower_toggles.append(index)
+            intower_state = intower
+
         if v.block_classification == CLS_BRIM_END:
             v.block_classification = CLS_NORMAL
 
-    v.input_gcode = None
+    v.input_line_count = index + 1
+    toolchanges.build_table([CLS_TOOL_START, CLS_TOOL_UNLOAD], CLS_TOOL_PURGE)
 
 
 # SECTION Second Pass
 
 
-def parse_gcode_second_pass():
-    idx = 0
+# yields the parsed lines for the second pass, either from the lines kept by the first pass
+# or, in streaming mode, by parsing the input file once more.  Plan only runs parse the file once more as
+# well, that is faster than keeping the parsed lines.
+def second_pass_source(gcode_lines):
+    if v.streaming_mode or v.plan_only:
+        for line in gcode_lines:
+            yield gcode.create_command(line, line.startswith(';'), 0, True)
+        return
+
+    # the lines are released segment by segment as they are processed, the text of unchanged lines
+    # is read back from the input file
+    with fileio.InputMap(gcode_lines.filename) as source:
+        for g in v.parsed_gcode.consume(source):
+            yield g
+
+
+def parse_gcode_second_pass(gcode_lines):
     intower = False
     purge = False
-    total_line_count = len(v.parsed_gcode)
+    total_line_count = v.input_line_count
     v.retraction = 0
     v.last_parsed_layer = -1
-    v.previous_block_classification = v.parsed_gcode[0][gcode.CLASS]
+    v.previous_block_classification = v.class_runs[0][1]
+
+    # layer starts, line classes and tower positions as recorded during the first pass
+    layer_starts = v.layer_starts
+    layer_cursor = 0
+    next_layer_line = layer_starts[0] if layer_starts else sys.maxsize
+    run_index = 0
+    next_class_line = 0
+    current_block_class = CLS_NORMAL
+    toggle_index = 0
+    next_toggle_line = v.intower_toggles[0] if v.intower_toggles else -1
+    line_intower = False
 
     # include firmware purge length accounting
     v.total_material_extruded = v.firmwarepurge
     v.material_extruded_per_color[v.current_tool] = v.firmwarepurge
 
-    for process_line_count in range(total_line_count):
+    for process_line_count, g in enumerate(second_pass_source(gcode_lines)):
 
-        try:
-            if process_line_count >= v.layer_end[0]:
-                v.last_parsed_layer += 1
-                v.layer_end.pop(0)
+        if process_line_count >= next_layer_line:
+            v.last_parsed_layer += 1
+            layer_cursor += 1
+            next_layer_line = layer_starts[layer_cursor] if layer_cursor < len(layer_starts) else sys.maxsize
+            if v.last_parsed_layer < len(v.skippable_layer):
                 v.current_layer_is_skippable = v.skippable_layer[v.last_parsed_layer] and not v.last_parsed_layer == 0
                 if v.current_layer_is_skippable:
                     if v.last_parsed_layer == 0:
                         v.cur_tower_z_delta += v.first_layer_height
                     else:
                         v.cur_tower_z_delta += v.layer_height
-        except IndexError:
-            pass
-
-        g = v.parsed_gcode[idx]
 
-        idx = idx + 1
+        if process_line_count % 10000 == 0:
+            gui.progress_string(50 + 50 * process_line_count // total_line_count)
 
-        # ----- MEMORY MANAGEMENT - when 100K lines are processed, remove the top of the list
+        if process_line_count == next_class_line:
+            current_block_class = v.class_runs[run_index][1]
+            run_index += 1
+            next_class_line = v.class_runs[run_index][0] if run_index < len(v.class_runs) else -1
 
-        if idx > 100000:
-            v.parsed_gcode = v.parsed_gcode[idx:]
-            idx = 0
+        if process_line_count == next_toggle_line:
+            line_intower = not line_intower
+            toggle_index += 1
+            next_toggle_line = v.intower_toggles[toggle_index] if toggle_index < len(v.intower_toggles) else -1
 
-        if process_line_count % 10000 == 0:
-            gui.progress_string(50 + 50 * process_line_count // total_line_count)
+        g[gcode.CLASS] = current_block_class
+        if line_intower:
+            g[gcode.MOVEMENT] += gcode.INTOWER
 
-        current_block_class = g[gcode.CLASS]
 
         # ---- FIRST SECTION HANDLES DELAYED TEMPERATURE COMMANDS ----
 
@@ -562,12 +622,14 @@ def parse_gcode_second_pass():
                             if current_block_class not in [CLS_TOOL_PURGE, CLS_TOOL_START,
                                                            CLS_TOOL_UNLOAD]:
                                 g[gcode.COMMENT] += " Unprocessed temp "
+                                g[gcode.ORIGINAL] = None
                                 v.new_temp = gcode.get_parameter(g, gcode.S, v.current_temp)
                                 v.current_temp = v.new_temp
                             else:
                                 v.new_temp = gcode.get_parameter(g, gcode.S, v.current_temp)
                                 if v.new_temp >= v.current_temp:
                                     g[gcode.COMMAND] = "M109"
+                                    g[gcode.ORIGINAL] = None
                                     v.temp2_stored_command = gcode.create_commandstring(g)
                                     gcode.move_to_comment(g,
                                                           "--P2PP-- delayed temp rise until after purge {}-->{}".format(
@@ -597,6 +659,7 @@ def parse_gcode_second_pass():
                     elif command_num == 572:
                         for i in range(1, v.filament_count):
                             g[gcode.OTHER] = g[gcode.OTHER].replace("D{}".format(i), "D0")
+                        g[gcode.ORIGINAL] = None
 
                     elif not v.generate_M0 and g[gcode.COMMAND] == "M0":
                         gcode.move_to_comment(g, "--P2PP-- remove M0 command")
@@ -627,6 +690,7 @@ def parse_gcode_second_pass():
             else:
                 v.current_position_z = g[gcode.Z]
                 g[gcode.COMMENT]= ";recorded Z={}".format(v.current_position_z)
+                g[gcode.ORIGINAL] = None
 
         if g[gcode.MOVEMENT] & 16:
             v.keep_speed = g[gcode.F]
@@ -672,9 +736,11 @@ def parse_gcode_second_pass():
             if current_block_class == CLS_TOOL_PURGE:
                 if g[gcode.F] is not None:
                     g[gcode.F] = int(g[gcode.F] * 1.0 * v.purgespeedmultiplier)
+                    g[gcode.ORIGINAL] = None
                 if g[gcode.F] is not None and g[gcode.F] > v.purgetopspeed and g[gcode.E]:
                     g[gcode.F] = v.purgetopspeed
                     g[gcode.COMMENT] += " prugespeed topped"
+                    g[gcode.ORIGINAL] = None
 
             if v.towerskipped:
                 gcode.move_to_comment(g, "--P2PP-- tower skipped")
@@ -780,6 +846,7 @@ def parse_gcode_second_pass():
                 g[gcode.X] = v.retract_x
                 g[gcode.Y] = v.retract_y
                 g[gcode.MOVEMENT] |= 3
+                g[gcode.ORIGINAL] = None
                 v.retract_move = False
 
                 if v.retraction <= - v.retract_length[v.current_tool]:
@@ -826,14 +893,17 @@ def parse_gcode_second_pass():
             if current_block_class == CLS_TOOL_PURGE:
                 if g[gcode.F] is not None:
                     g[gcode.F] = int(g[gcode.F] * 1.0 * v.purgespeedmultiplier)
+                    g[gcode.ORIGINAL] = None
                 if g[gcode.F] is not None and g[gcode.F] > v.purgetopspeed and g[gcode.E]:
                     g[gcode.F] = v.purgetopspeed
                     g[gcode.COMMENT] += " prugespeed topped"
+                    g[gcode.ORIGINAL] = None
 
         # --------------------- GLOBAL PROCESSING
 
         if g[gcode.UNRETRACT]:
             g[gcode.E] = min(-v.retraction, g[gcode.E])
+            g[gcode.ORIGINAL] = None
             v.retraction += g[gcode.E]
         elif g[gcode.RETRACT]:
             v.retraction += g[gcode.E]
@@ -880,6 +950,9 @@ def parse_gcode_second_pass():
     # LAST STEP IS ADDING AN EXTRA TOOL UNLOAD TO DETERMINE THE LENGTH OF THE LAST SPLICE
     gcode_process_toolchange(-1)
 
+    # after the last toolchange, AUTOADDPURGE may add purge moves there
+    accounting.flush()
+
 
 # -- MAIN ROUTINE --- GLUES ALL THE PROCESSING ROUTINED
 # -- FILE READING / FIRST PASS / SECOND PASS / FILE WRITING
@@ -974,26 +1047,42 @@ def config_checks():
 
 # Section Main
 
-def p2pp_process_file(input_file, output_file):
+# with v.profile set (--profile) the whole run is profiled, ;P2PP PROFILE starts the profiler while the config is read
+def p2pp_process_file(input_file, output_file, options=None, environment=None):
+    stats.reset_peak_memory()
+    if v.profile:
+        profiler.start()
+    try:
+        return process_file(input_file, output_file, options, environment)
+    finally:
+        profiler.stop(output_file or input_file, os.environ if environment is None else environment)
+
+
+def process_file(input_file, output_file, options=None, environment=None):
     starttime = time.time()
 
     if output_file is None:
         output_file = input_file
 
+    # PrusaSlicer passes the output name and host in the environment, callers running P2PP on behalf
+    # of PrusaSlicer (daemon) pass these values explicitly
+    if environment is None:
+        environment = os.environ
+
     # get the base name from the environment variable if available....
     # check for P3 that output is written to file at this point.
     # check for P3 that the output file is named mcfx
 
     try:
-        basename = os.environ["SLIC3R_PP_OUTPUT_NAME"]
-        pathname = os.path.dirname(os.environ["SLIC3R_PP_OUTPUT_NAME"])
+        basename = environment["SLIC3R_PP_OUTPUT_NAME"]
+        pathname = os.path.dirname(environment["SLIC3R_PP_OUTPUT_NAME"])
         maffile = basename
         mybasename = os.path.basename(basename)
 
-        if v.palette3 and not os.environ["SLIC3R_PP_HOST"].startswith("File"):
+        if v.palette3 and not environment["SLIC3R_PP_HOST"].startswith("File"):
             gui.log_warning("Palette 3 File uploading currently not supported")
 
-        if v.palette3 and not os.environ["SLIC3R_PP_HOST"].endswith(".mcfx"):
+        if v.palette3 and not environment["SLIC3R_PP_HOST"].endswith(".mcfx"):
             gui.log_warning("Palette 3 files should have a .mcfx extension")
 
     # if any the retrieval of this information fails, the good old way is used
@@ -1013,87 +1102,130 @@ def p2pp_process_file(input_file, output_file):
     _task_name = _task_name.replace(".mcf", "")
     _task_name = _task_name.replace(".gcode", "")
 
-    gui.app.sync()
-
-    # Read the input file
+    # Open the input file, the lines are read as they are needed by the different passes
     try:
-        opf = open(input_file, encoding='utf-8')
         gui.create_logitem("Reading File " + input_file)
         gui.progress_string(1)
-        v.input_gcode = opf.readlines()
-        opf.close()
-        v.input_gcode = [item.strip() for item in v.input_gcode]
+        with stats.Phase("read"):
+            input_lines = fileio.LineReader(input_file)
+
+        gui.create_logitem("Analyzing Prusa Slicer Configuration")
+        gui.progress_string(2)
+
+        # Parse the Prusa Slicer  and P2PP Config Parameters
+        with stats.Phase("config"):
+            parse_config_file(input_file)
 
     except (IOError, MemoryError):
         gui.log_warning("Error Reading: '{}'".format(input_file))
-        return
+        return -1
 
-    gui.create_logitem("Analyzing Prusa Slicer Configuration")
-    gui.progress_string(2)
+    # parameters passed by the caller (headless use) override the ;P2PP parameters of the file
+    if options:
+        for message in parameters.validate_parameters(options.items()):
+            gui.create_logitem(message)
+        for keyword in options:
+            parameters.check_config_parameters(keyword, options[keyword])
 
-    parse_config_parameters()  # Parse the Prusa Slicer  and P2PP Config Parameters
+    if v.streaming_mode:
+        gui.create_logitem("Streaming mode, input file is read twice, output is buffered on disk")
 
     # Write the unprocessed file
-    if v.save_unprocessed:
+    if v.save_unprocessed and not v.plan_only:
         pre, ext = os.path.splitext(input_file)
         of = pre + "_unprocessed" + ext
         gui.create_logitem("Saving unpocessed code to: " + of)
         opf = open(of, "wb")
-        for line in v.input_gcode:
+        for line in input_lines:
             opf.write(line.encode('utf8'))
             opf.write("\n""".encode('utf8'))
         opf.close()
 
     gui.progress_string(4)
     gui.create_logitem("GCode Analysis ... Pass 1")
-    parse_gcode_first_pass()
-
-    if config_checks() == -1:
-        return
+    with stats.Phase("pass1"):
+        parse_gcode_first_pass(input_lines)
+
+    with stats.Phase("checks"):
+        checked = config_checks()
+        if checked != -1:
+            toolchanges.check_plan()
+    if checked == -1:
+        return -1
 
     gui.create_logitem("Gcode Analysis ... Pass 2")
-    parse_gcode_second_pass()
+    body_file = None
+    try:
+        with stats.Phase("pass2"):
+            if v.streaming_mode and not v.plan_only:
+                # the header is only known at the end, the body is kept in a temporary file until then
+                body_file = fileio.open_body_file(os.path.dirname(output_file))
+                try:
+                    parse_gcode_second_pass(input_lines)
+                finally:
+                    fileio.close_body_file()
+            else:
+                parse_gcode_second_pass(input_lines)
+        v.stats_output_lines = stats.lines_issued()
 
-    v.processtime = time.time() - starttime
+        v.processtime = time.time() - starttime
 
-    omega_result = header_generate_omega(_task_name)
-    header = omega_result['header'] + omega_result['summary'] + omega_result['warnings']
+        if v.plan_only:
+            gui.create_logitem("Plan only, no output written")
+            gui.create_logitem("Processing time {:-5.2f}s".format(v.processtime))
+            gui.print_summary([])
+            gui.progress_string(101)
+            return 0
 
-    # write the output file
-    ######################
+        with stats.Phase("header"):
+            omega_result = header_generate_omega(_task_name)
+        header = omega_result['header'] + omega_result['summary'] + omega_result['warnings']
+        v.summary = omega_result['summary']
 
-    path, _ = os.path.split(output_file)
+        # write the output file
+        ######################
 
-    if v.palette3 and not v.accessory_mode:
-        opf = open(os.path.join(path, "print.gcode"), "wb")
-        gui.create_logitem("Generating MCFX file: " + output_file)
-    else:
-        opf = open(output_file, "wb")
-        gui.create_logitem("Generating GCODE file: (temp location, PS will move) " + output_file)
+        write = stats.Phase("write").start()
+        path, _ = os.path.split(output_file)
 
-    if not v.accessory_mode and not v.palette3:
-        for line in header:
-            opf.write(line.encode('utf8'))
-        opf.write(
-            ("\n\n;--------- THIS CODE HAS BEEN PROCESSED BY P2PP v{} --- \n\n".format(version.Version)).encode('utf8'))
-        if v.generate_M0:
-            header.append("M0\n")
-        opf.write("T0\n".encode('utf8'))
-    else:
-        opf.write(
-            ("\n\n;--------- THIS CODE HAS BEEN PROCESSED BY P2PP v{} --- \n\n".format(version.Version)).encode('utf8'))
+        if v.palette3 and not v.accessory_mode:
+            opf = fileio.GCodeWriter(os.path.join(path, "print.gcode"))
+            gui.create_logitem("Generating MCFX file: " + output_file)
+        else:
+            opf = fileio.GCodeWriter(output_file)
+            gui.create_logitem("Generating GCODE file: (temp location, PS will move) " + output_file)
+
+        if not v.accessory_mode and not v.palette3:
+            opf.write("".join(header))
+            opf.write("\n\n;--------- THIS CODE HAS BEEN PROCESSED BY P2PP v{} --- \n\n".format(version.Version))
+            if v.generate_M0:
+                header.append("M0\n")
+            opf.write("T0\n")
+        else:
+            opf.write("\n\n;--------- THIS CODE HAS BEEN PROCESSED BY P2PP v{} --- \n\n".format(version.Version))
 
-    if v.splice_offset == 0:
-        gui.log_warning("SPLICE_OFFSET not defined")
-    for line in v.processed_gcode:
+        if v.splice_offset == 0:
+            gui.log_warning("SPLICE_OFFSET not defined")
         try:
-            opf.write(line.encode('utf8'))
+            if body_file is not None:
+                opf.copy_file(body_file)
+            opf.write_lines(v.processed_gcode)
+            if v.stats_comments:
+                opf.write_lines(stats.comments())
         except IOError:
-            gui.log_warning("Line : {} could not be written to output".format(line))
-        opf.write("\n".encode('utf8'))
-    opf.close()
+            gui.log_warning("Output could not be written to {}".format(opf.filename))
+        opf.close()
+        v.processed_gcode = []
+        if not v.palette3 or v.accessory_mode:
+            v.output_files.append(output_file)
+        write.stop()
+    finally:
+        # also when processing fails half way, the body file is only needed until it is copied into the output
+        if body_file is not None and os.path.exists(body_file):
+            os.remove(body_file)
 
     if v.palette3:
+        zipping = stats.Phase("zip").start()
         meta, palette = header_generate_omega_palette3(None)
 
         meta_file = os.path.join(path, "meta.json")
@@ -1136,6 +1268,7 @@ def p2pp_process_file(input_file, output_file):
             zipf.write(palette_file, "palette.json")
             zipf.write(im_file, "thumbnail.png")
             zipf.close()
+            v.output_files.append(maffile)
         else:
             zipf = zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED)
             zipf.write(meta_file, "meta.json")
@@ -1143,11 +1276,15 @@ def p2pp_process_file(input_file, output_file):
             zipf.write(gcode_file, "print.gcode")
             zipf.write(im_file, "thumbnail.png")
             zipf.close()
+            v.output_files.append(output_file)
             os.remove(os.path.join(path, "print.gcode"))
 
         os.remove(meta_file)
         os.remove(palette_file)
         os.remove(im_file)
+        zipping.stop()
+
+    write.start()
 
     # 22/02/2022 added accessory mode for palette 3
     if v.accessory_mode and not v.palette3:
@@ -1163,14 +1300,17 @@ def p2pp_process_file(input_file, output_file):
 
         gui.create_logitem("Generating PALETTE MAF/MSF file: " + maffile)
 
-        maf = open(maffile, 'wb')
-
-        for h in header:
-            h = str(h).strip("\r\n")
-            maf.write(h.encode('ascii'))
-            maf.write("\r\n".encode('ascii'))
+        fileio.write_maf_file(maffile, header)
+        v.output_files.append(maffile)
 
-        maf.close()
+    if v.sidecar:
+        if "SLIC3R_PP_OUTPUT_NAME" in environment:
+            sidecar_file = sidecar.sidecar_name(environment["SLIC3R_PP_OUTPUT_NAME"])
+        else:
+            sidecar_file = sidecar.sidecar_name(output_file)
+        sidecar.write_sidecar(sidecar_file, _task_name)
+        v.output_files.append(sidecar_file)
+    write.stop()
 
     gui.print_summary(omega_result['summary'])
 
@@ -1194,7 +1334,7 @@ def p2pp_process_file(input_file, output_file):
                 localfile = output_file
 
             try:  # get the correct output filename from the PS environment variable
-                filename = os.path.basename(os.environ["SLIC3R_PP_OUTPUT_NAME"])
+                filename = os.path.basename(environment["SLIC3R_PP_OUTPUT_NAME"])
                 if filename.endswith(".gcode"):
                     filename = filename.replace(".gcode", tgtsuffix)
 
@@ -1202,8 +1342,16 @@ def p2pp_process_file(input_file, output_file):
             except (TypeError, KeyError):  # regardsless of the error, use this filename
                 filename = "output" + tgtsuffix
 
-            upload.uploadfile(localfile, filename)
+            # uploading needs the P2PP window (hostname dialog, progress, printer page)
+            if gui.interactive():
+                import p2pp.p3_upload as upload
+                with stats.Phase("upload"):
+                    upload.uploadfile(localfile, filename)
+            else:
+                gui.log_warning("P3_UPLOADFILE requires the P2PP window, {} was not uploaded".format(localfile))
 
     if (len(v.process_warnings) > 0 and not v.ignore_warnings) or v.consolewait:
 
         gui.close_button_enable()
+
+    return 0
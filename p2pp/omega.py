@@ -400,6 +400,7 @@ def generate_meta():
                 lena[str(v.inputs_recalc[i])] = int(v.material_extruded_per_color[i] + add)
                 vola[str(v.inputs_recalc[i])] = int(purgetower.volfromlength(v.material_extruded_per_color[i] + add))
 
+    # bounding box of the issued moves, computed by accounting.py
     bounding_box = {"min": [v.bb_minx, v.bb_miny, v.bb_minz], "max": [v.bb_maxx, v.bb_maxy, v.bb_maxz]}
 
 
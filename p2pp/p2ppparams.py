@@ -8,6 +8,7 @@ __maintainer__ = 'Tom Van den Eede'
 __email__ = 'P2PP@pandora.be'
 
 import p2pp.gui as gui
+import p2pp.profiler as profiler
 import p2pp.variables as v
 from packaging import version as semver_version
 
@@ -33,516 +34,559 @@ def check_splice_table():
         gui.log_warning("Algorithm definitions should appear AFTER Palette Model selection (PALETTE3/PALETTE3_PRO/ACCESSORYMODE_MAF/ACCESSORYMODE_MSF)")
 
 
-# SECTION P2PP Parameter parsing
+# SECTION Parameter handlers
 
+# parameters that do more than setting a single variable have their own handler, handler(value)
 
-def check_config_parameters(keyword, value):
-    keyword = keyword.upper().strip()
 
-    if value is None:
+# defines the printer profile for config storage on the Palette hardware
+def _printerprofile(value):
+    value = value.strip(" ")
+    _idlen = 16
+    if v.palette3:
+        _idlen = 32
+
+    if len(value) != _idlen:
+        gui.log_warning("Invalid Printer profile!  - Has invalid length (expect {}) - [{}]"
+                        .format(_idlen, value))
         value = ""
 
-    # allows for delaying the change of temperature until after the putge block
-    # not sure if this should stay in future releases.   To be evaluated
-    #  low complexity, but it adds a waiting position calculation which moves off the regular path.
-    if keyword == "TEMPERATURECONTROL":
-        v.process_temp = True
-
-    # saves the unprocessed file, so it can be sent for processing simulation in case of errors
-    if keyword == "SAVEUNPROCESSED":
-        v.save_unprocessed = True
-
-    # enable the preheat function on the Palette 3
-    if keyword == "P3_PROCESSPREHEAT":
-        v.p3_process_preheat = True
-
-    # enable the preheat function on the Palette 3
-    if keyword == "P3_ROTATEINTERFACE":
-        v.p3_upside_down = True
-
-    # defines the printer profile for config storage on the Palette hardware
-    if keyword == "PRINTERPROFILE":
-        value = value.strip(" ")
-        _idlen = 16
-        if v.palette3:
-            _idlen = 32
-
-        if len(value) != _idlen:
-            gui.log_warning("Invalid Printer profile!  - Has invalid length (expect {}) - [{}]"
-                            .format(_idlen, value))
-            value = ""
-
-        if not all(char in set("0123456789ABCDEFabcdef") for char in value):
-            gui.log_warning("Invalid Printer profile!  - Invalid characters  (expect 0123456789abcdef) - [{}]"
-                            .format(value))
-            value = ""
-
-        if len(value) <= _idlen:
-            v.printer_profile_string = value
-            return
-
-    # toggles hardware to Palette 3 - sets the number of inputs, output format.
-    if keyword == "PALETTE3":
-        if len(v.printer_profile_string) == 16:
-            gui.log_warning("Invalid Printer profile!  - P3 printer profile should be 32 characters ({})".format(v.printer_profile_string))
-
-        v.palette3 = True
-        v.colors = 4
-        # Min first splice length for P3 == 130
-        v.min_start_splice_length = max(v.min_start_splice_length, v.min_first_splice_p3)
-        v.min_splice_length = max(v.min_splice_length, v.min_splice_p3)
-        check_splice_table()
-        return
-
-    # toggles hardware to Palette 3 Pro - sets the number of inputs, output format.
-    if keyword == "PALETTE3_PRO":
-        if len(v.printer_profile_string) == 16:
-            gui.log_warning("Invalid Printer profile!  - P3 printer profile should be 32 characters")
-
-        v.palette3 = True
-        v.colors = 8
-        # Min first splice length for P3 == 130
-        v.min_start_splice_length = max(v.min_start_splice_length, v.min_first_splice_p3)
-        v.min_splice_length = max(v.min_splice_length, v.min_splice_p3)
-        check_splice_table()
-        return
-
-    if keyword == "P3_HOSTNAME":
-        v.p3_hostname = value
-
-    if keyword == "P3_PROFILENAME":
-        v.p3_printername = value
-
-    if keyword == "P3_UPLOADFILE":
-        v.p3_uploadfile = True
-
-    if keyword == "P3_SHOWPRINTERPAGE":
-        v.p3_showwebbrowser = True
-
-    # toggles Palette 3 accessory mode = added 22/02/2022
-    if keyword == "ACCESSORYMODE_MAFX":
-        if not v.palette3:
-            gui.log_warning("ACCESSORYMODE_MAFX can only be used with Palette 3!")
-            gui.log_warning("This file may not print correctly")
-
-        v.accessory_mode = True
-        gui.create_logitem("Config: Palette3 Accessory Mode Selected")
-        return
-
-
-    # toggles Palette 3 accessory mode = added 22/12/2022
-    # if keyword == "CONNECTED_ACCESSORYMODE_MAFX":
-    #     if not v.palette3:
-    #         gui.log_warning("CONNECTED_ACCESSORYMODE_MAFX can only be used with Palette 3!")
-    #         gui.log_warning("This file may not print correctly")
-    #     v.accessory_mode = True
-    #     v.connected_accessory_mode = True
-    #     gui.create_logitem("Config: Palette3 Connected Accessory Mode Selected")
-    #     gui.create_logitem("This file will only print with Octoprintn and the P3PING plugin configured and enabled!!")
-    #     return
-
-    # toggles Palette 2 accessory mode
-    if keyword == "ACCESSORYMODE_MAF":
-        if v.palette3:
-            gui.log_warning("For Palette3 use ACCESSORYMODE_MAFX instead of ACCESSORYMODE_MAF")
-            gui.log_warning("This file may not print correctly")
-
-
-        v.accessory_mode = True
-        v.colors = 4
-        gui.create_logitem("Config: Palette2 Accessory Mode Selected")
-        check_splice_table()
-        return
-
-    # toggles Palette + Accessory Mode
-    if keyword == "ACCESSORYMODE_MSF":
-        if v.palette3:
-            gui.log_warning("For Palette3 use ACCESSORYMODE_MAFX instead of ACCESSORYMODE_MSF")
-            gui.log_warning("This file may not print correctly")
-
-        v.accessory_mode = True
-        v.palette_plus = True
-        v.colors = 4
-        gui.create_logitem("Config: Palette+ Accessory Mode Selected")
-        check_splice_table()
-        return
-
-    # Loading Offset - Required for the P+ configuration, take from existing print after callibration with Chroma
-    if keyword == "P+LOADINGOFFSET":
-        v.palette_plus_loading_offset = int(float(value))
-        return
-
-    # PPM  - Required for the P+ configuration, take from existing print after callibration with Chroma
-    if keyword == "P+PPM":
-        v.palette_plus_ppm = floatparameter(value)
-        return
-
-    # Splice offset defines how much the start of the toolchange is located after the position of the toolchange.
-    # in general, you want this value as small as possible BUT this value is the buffer you need when material is consumed
-    # at a too high rate, so putting it very low may result in early transition
-    if keyword == "SPLICEOFFSET":
-        v.splice_offset = floatparameter(value)
-        gui.create_logitem("SPLICE OFFSET: {:-5.2f}mm".format(v.splice_offset))
-        return
-
-    # This parameter sets the amount of extra filament that is generated at the end of the print, to allow for the filament to still
-    # engage with the motor gears.   This should be at least the plength of the path from the nozzel to the gears of the extruder motor
-    if keyword == "EXTRAENDFILAMENT":
-        v.extra_runout_filament = floatparameter(value)
-        gui.create_logitem("Extra filament at end of print {:-8.2f}mm".format(v.extra_runout_filament))
-        return
-
-    # This parameter specified the minimal amount of total filament  USE ???
-    if keyword == "P3_MINIMALTOTALFILAMENT":
-        v.minimaltotal_filament = floatparameter(value)
-        gui.create_logitem("Minimal ilament length {:-8.2f}mm".format(v.minimaltotal_filament))
-        return
-
-    # Specially Added for Manmeet - Not  documented
-    if keyword == "MANUAL_SWAP":
-        v.manual_filament_swap = True
-        gui.create_logitem("Manual filament swap in place.")
-        return
-
-    # May be removed ??
-    if keyword == "BEFORESIDEWIPEGCODE":
-        v.before_sidewipe_gcode.append(value)
-        return
-
-    # May be removed ??
-    if keyword == "AFTERSIDEWIPEGCODE":
-        v.after_sidewipe_gcode.append(value)
-        return
-
-    # unused ???
-    if keyword == "AUTOLOADINGOFFSET":
-        v.autoloadingoffset = floatparameter(value)
-        return
-
-    if keyword == "PURGESPEEDADJUST":
-        v.purgespeedmultiplier = floatparameter(value)/100.0
-        # 10 % trhough 500%
-        v.purgespeedmultiplier = min(max(v.purgespeedmultiplier, 0.1), 5.0)
-
-    # autmoaticall adds purge in case of short splices when fullpruereduction is applied
-    if keyword == "AUTOADDPURGE":
-        v.autoaddsplice = True
-        return
-
-    # special reauest feature - not documents - allows for pings shorter than 300 mm
-    if keyword == "POWERCHAOS":   # Special feature request to allow sub 300 mm pings
-        v.powerchaos = True
-        return
-
-    # sets the minimal first splice length (100 / 130 for P2/P3 resp)
-    if keyword == "MINSTARTSPLICE":
-        v.min_start_splice_length = floatparameter(value)
-        if v.palette3:
-            if v.min_start_splice_length < v.min_first_splice_p3:
-                gui.log_warning("Minimal first slice length adjusted to {}mm for palette 3".format(v.min_first_splice_p3))
-                v.min_start_splice_length = v.min_first_splice_p3
-
-        if v.min_start_splice_length < 100:
-            v.min_start_splice_length = 100
-            gui.log_warning("Minimal first slice length adjusted to 100mm")
-        return
-
-    # firmware purge support
-    if keyword == "FIRMWARE_PURGE_LENGTH":
-        v.firmwarepurge = intparameter(value)
-        return
-
-    # SECTION BLOBSTER and BB3D
-
-    # BB3D/BLOBSTER config parm
-    if keyword in ["BIGBRAIN3D_BLOBSIZE", "BLOBSTER_BLOBSIZE"]:
-        v.mechpurge_blob_size = intparameter(value)
-        return
-
-    # BLOBSTER config parm
-    if keyword in ["BLOBSTER_ENGAGETIME"]:
-        v.blobster_engagetime = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_SINGLEBLOB":
-        v.single_blob = True
-        return
-
-    # BB3D/blobster config parm
-    if keyword in ["BIGBRAIN3D_BLOBSPEED", "BLOBSTER_BLOBSPEED"]:
-        v.mechpurge_blob_speed = intparameter(value)
-        return
-
-    # BB3D/blobster config parm
-    if keyword in ["BIGBRAIN3D_COOLINGTIME", "BLOBSTER_COOLINGTIME"]:
-        v.mechpurge_blob_cooling_time = intparameter(value)
-        return
-
-    # BB3D/blobster config parm
-    if keyword in ["BIGBRAIN3D_PURGEPOSITION", "BLOBSTER_PURGEPOSITION"]:
-        v.mechpurge_x_position = floatparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_PURGEYPOSITION":
-        v.bigbrain3d_y_position = floatparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_MOTORPOWER_HIGH":
-        v.bigbrain3d_motorpower_high = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_MOTORPOWER_NORMAL":
-        v.bigbrain3d_motorpower_normal = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_NUMBER_OF_WHACKS":
-        v.bigbrain3d_whacks = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword in ["BIGBRAIN3D_PRIME_BLOBS", "BLOBSTER_PRIME_BLOBS"]:
-        v.mechpurge_prime_blobs = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_FAN_OFF_PAUSE":
-        v.bigbrain3d_fanoffdelay = intparameter(value)
-        return
-
-    # BB3D config parm
-    if keyword == "BIGBRAIN3D_LEFT_SIDE":
-        v.bigbrain3d_left = -1
-        return
-
-    # BB3D/BLOBSTER config parm
-    if keyword in ["BIGBRAIN3D_CLEARANCE_MM", "BLOBSTER_CLEARANCE_MM"]:
-        v.mechpurge_minimalclearenceheight = floatparameter(value)
-        return
-
-    # BB3D/BLBSTER config parm
-    if keyword in ["BIGBRAIN3D_RETRACT", "BLOBSTER_RETRACT"]:
-        v.mechpurge_retract = floatparameter(value)
-        return
-
-    # BB3D/BLOBSTER config parm
-    if keyword == "BIGBRAIN3D_ENABLE":
-        if not v.wipe_remove_sparse_layers:
-            v.bigbrain3d_purge_enabled = True
-            gui.create_logitem("<b>BIGBRAIN3D Will only work with installed hardware on a Prusa Printer</b>")
-        else:
-            gui.log_warning("<b>BIGBRAIN3D mode not compatible with sparse wipe tower in PS</b>")
-        return
-
-    if keyword == "BLOBSTER_ADVANCED":
-        v.blobster_advanced = True
-        gui.create_logitem("<b>BLOBSTER ADVANCED MODE ENABLED</b>")
-        return
-
-    if keyword == "BLOBSTER_ADVANCED_LENGTH":
-        v.blobster_advanced_length = []
-        fields = value.split(",")
-        for i in fields:
-            try:
-                v.blobster_advanced_length.append(abs(int(i)))
-            except ValueError:
-                gui.log_warning("BLOBSTER_ADVANCED_LENGTH parameter accepts a list of interger values (length in mm)")
-        return
+    if not all(char in set("0123456789ABCDEFabcdef") for char in value):
+        gui.log_warning("Invalid Printer profile!  - Invalid characters  (expect 0123456789abcdef) - [{}]"
+                        .format(value))
+        value = ""
+
+    v.printer_profile_string = value
+
+
+# toggles hardware to Palette 3 - sets the number of inputs, output format.
+def _palette3(value):
+    if len(v.printer_profile_string) == 16:
+        gui.log_warning("Invalid Printer profile!  - P3 printer profile should be 32 characters ({})".format(v.printer_profile_string))
+
+    v.palette3 = True
+    v.colors = 4
+    # Min first splice length for P3 == 130
+    v.min_start_splice_length = max(v.min_start_splice_length, v.min_first_splice_p3)
+    v.min_splice_length = max(v.min_splice_length, v.min_splice_p3)
+    check_splice_table()
+
+
+# toggles hardware to Palette 3 Pro - sets the number of inputs, output format.
+def _palette3_pro(value):
+    if len(v.printer_profile_string) == 16:
+        gui.log_warning("Invalid Printer profile!  - P3 printer profile should be 32 characters")
+
+    v.palette3 = True
+    v.colors = 8
+    # Min first splice length for P3 == 130
+    v.min_start_splice_length = max(v.min_start_splice_length, v.min_first_splice_p3)
+    v.min_splice_length = max(v.min_splice_length, v.min_splice_p3)
+    check_splice_table()
+
+
+# toggles Palette 3 accessory mode = added 22/02/2022
+def _accessorymode_mafx(value):
+    if not v.palette3:
+        gui.log_warning("ACCESSORYMODE_MAFX can only be used with Palette 3!")
+        gui.log_warning("This file may not print correctly")
+
+    v.accessory_mode = True
+    gui.create_logitem("Config: Palette3 Accessory Mode Selected")
+
+
+# toggles Palette 2 accessory mode
+def _accessorymode_maf(value):
+    if v.palette3:
+        gui.log_warning("For Palette3 use ACCESSORYMODE_MAFX instead of ACCESSORYMODE_MAF")
+        gui.log_warning("This file may not print correctly")
+
+    v.accessory_mode = True
+    v.colors = 4
+    gui.create_logitem("Config: Palette2 Accessory Mode Selected")
+    check_splice_table()
+
+
+# toggles Palette + Accessory Mode
+def _accessorymode_msf(value):
+    if v.palette3:
+        gui.log_warning("For Palette3 use ACCESSORYMODE_MAFX instead of ACCESSORYMODE_MSF")
+        gui.log_warning("This file may not print correctly")
+
+    v.accessory_mode = True
+    v.palette_plus = True
+    v.colors = 4
+    gui.create_logitem("Config: Palette+ Accessory Mode Selected")
+    check_splice_table()
+
+
+# Loading Offset - Required for the P+ configuration, take from existing print after callibration with Chroma
+def _palette_plus_loadingoffset(value):
+    v.palette_plus_loading_offset = int(floatparameter(value))
+
+
+# Splice offset defines how much the start of the toolchange is located after the position of the toolchange.
+# in general, you want this value as small as possible BUT this value is the buffer you need when material is consumed
+# at a too high rate, so putting it very low may result in early transition
+def _spliceoffset(value):
+    v.splice_offset = floatparameter(value)
+    gui.create_logitem("SPLICE OFFSET: {:-5.2f}mm".format(v.splice_offset))
+
+
+# This parameter sets the amount of extra filament that is generated at the end of the print, to allow for the filament to still
+# engage with the motor gears.   This should be at least the plength of the path from the nozzel to the gears of the extruder motor
+def _extraendfilament(value):
+    v.extra_runout_filament = floatparameter(value)
+    gui.create_logitem("Extra filament at end of print {:-8.2f}mm".format(v.extra_runout_filament))
+
+
+# This parameter specified the minimal amount of total filament  USE ???
+def _p3_minimaltotalfilament(value):
+    v.minimaltotal_filament = floatparameter(value)
+    gui.create_logitem("Minimal ilament length {:-8.2f}mm".format(v.minimaltotal_filament))
+
+
+# Specially Added for Manmeet - Not  documented
+def _manual_swap(value):
+    v.manual_filament_swap = True
+    gui.create_logitem("Manual filament swap in place.")
+
+
+def _purgespeedadjust(value):
+    v.purgespeedmultiplier = floatparameter(value)/100.0
+    # 10 % trhough 500%
+    v.purgespeedmultiplier = min(max(v.purgespeedmultiplier, 0.1), 5.0)
+
+
+# sets the minimal first splice length (100 / 130 for P2/P3 resp)
+def _minstartsplice(value):
+    v.min_start_splice_length = floatparameter(value)
+    if v.palette3:
+        if v.min_start_splice_length < v.min_first_splice_p3:
+            gui.log_warning("Minimal first slice length adjusted to {}mm for palette 3".format(v.min_first_splice_p3))
+            v.min_start_splice_length = v.min_first_splice_p3
+
+    if v.min_start_splice_length < 100:
+        v.min_start_splice_length = 100
+        gui.log_warning("Minimal first slice length adjusted to 100mm")
+
+
+# defines the minimal splice length ( this is the safe length to make sure a splice is only heated once (70/90 for P2/P3 resp)
+def _minsplice(value):
+    v.min_splice_length = floatparameter(value)
+    if v.palette3:
+        if v.min_splice_length < v.min_splice_p3:
+            gui.log_warning("Minimal slice length adjusted to {}mm for palette 3".format(v.min_splice_p3))
+            v.min_splice_length = v.min_splice_p3
+
+    if v.min_splice_length < 70:
+        v.min_splice_length = 70
+        gui.log_warning("Minimal slice length adjusted to 70mm")
+
+
+# SECTION BLOBSTER and BB3D handlers
 
-    if keyword == "BLOBSTER_ADVANCED_SPEED":
-        v.blobster_advanced_speed = []
+def _bigbrain3d_enable(value):
+    if not v.wipe_remove_sparse_layers:
+        v.bigbrain3d_purge_enabled = True
+        gui.create_logitem("<b>BIGBRAIN3D Will only work with installed hardware on a Prusa Printer</b>")
+    else:
+        gui.log_warning("<b>BIGBRAIN3D mode not compatible with sparse wipe tower in PS</b>")
+
+
+def _blobster_advanced(value):
+    v.blobster_advanced = True
+    gui.create_logitem("<b>BLOBSTER ADVANCED MODE ENABLED</b>")
+
+
+def _blobster_advanced_length(value):
+    v.blobster_advanced_length = []
+    fields = value.split(",")
+    for i in fields:
+        try:
+            v.blobster_advanced_length.append(abs(int(i)))
+        except ValueError:
+            gui.log_warning("BLOBSTER_ADVANCED_LENGTH parameter accepts a list of interger values (length in mm)")
+
+
+def _blobster_advanced_speed(value):
+    v.blobster_advanced_speed = []
+    fields = value.split(",")
+    for i in fields:
+        try:
+            v.blobster_advanced_speed.append(abs(int(i)))
+        except ValueError:
+            gui.log_warning("BLOBSTER_ADVANCED_SPEEDH parameter accepts a list of interger values (length in mm)")
+
+
+def _blobster_advanced_fan(value):
+    v.blobster_advanced_fan = []
+    fields = value.split(",")
+    for i in fields:
+        try:
+            v.blobster_advanced_fan.append(int(min(abs(int(i)), 100)*2.55))
+        except ValueError:
+            gui.log_warning("BLOBSTER_ADVANCED_FAN parameter accepts a list of interger values (percentage 0-100)")
+
+
+def _blobster_enable(value):
+    if not v.wipe_remove_sparse_layers:
+        v.blobster_purge_enabled = True
+        v.mechpurge_blob_size = 180
+        v.mechpurge_minimalclearenceheight = 30
+        v.mechpurge_blob_cooling_time = 60
+
+        gui.create_logitem("<b>BLOBSTER Will only work with installed hardware on a Prusa Printer</b>")
+    else:
+        gui.log_warning("<b>BLOBSTER mode not compatible with sparse wipe tower in PS</b>")
+
+
+# IDEX secondary extruder
+def _mapphysicalextruder(value):
+    try:
         fields = value.split(",")
-        for i in fields:
+        v.mapphysical = True
+        v.mapphysicalfrom = int(floatparameter(fields[0]))
+        v.mapphysicalto = int(floatparameter(fields[1]))
+    except (IndexError, ValueError):
+        gui.log_warning("MAPPHYSICALEXTRUDER - ERROR in parameters {}, should be source,target".format(value))
+        v.mapphysical = False
+
+
+# set the distance between pings (same length every time), instead of increasing ping lengths
+def _linearpinglength(value):
+    v.ping_interval = floatparameter(value)
+    v.ping_length_multiplier = 1.0
+    if not v.powerchaos:
+        if v.ping_interval < 100:
+            v.ping_interval = 100
+            gui.log_warning("Minimal Linear Ping distance is 300mm!  Your config stated: {}".format(value))
+        gui.create_logitem("Linear Ping interval of  {:-6.2f}mm".format(v.ping_interval))
+
+
+# define a Z-Hop for jumps to the wipe location
+def _sidewipezhop(value):
+    v.addzop = floatparameter(value)
+    gui.create_logitem("Side Wipe ZHOP of {:3.2f}mm".format(v.addzop))
+
+
+# set the highest top speed for purging
+def _purgetopspeed(value):
+    v.purgetopspeed = int(floatparameter(value))
+
+    # if parameter specified is below 200 then the value is assumed mm/sec and is converted to mm/min
+    if v.purgetopspeed < 200:
+        v.purgetopspeed = v.purgetopspeed * 60
+
+    gui.create_logitem("Purge Max speed set to {:.0f}mm/min ({}mm/s)".format(v.purgetopspeed, v.purgetopspeed / 60))
+
+
+# define a extrusion multiplier for sidewipe.  needed???
+def _sidewipecorrection(value):
+    v.sidewipe_correction = floatparameter(value)
+    if v.sidewipe_correction < 0.9 or v.sidewipe_correction > 1.10:
+        v.sidewipe_correction = 1.0
+
+
+# apply delta (similar to sparse layer removal in PS2.4
+def _purgetowerdelta(value):
+    parm = abs(floatparameter(value))
+    if parm > 0.001 and v.wipe_remove_sparse_layers:
+        gui.log_warning("TOWER DELTA feature mode not compatible with sparse wipe tower in PS")
+        v.max_tower_delta = 0.0
+    else:
+        if parm != float(0):
+            v.max_tower_z_delta = abs(floatparameter(value))
+            gui.create_logitem("Max Purge Tower Delta set to {:-2.2f}mm".format(v.max_tower_z_delta))
+
+
+# simlir to tower delta but rather reduces the base of the tower to make it growmore evenly with the print
+def _fullpurgereduction(value):
+    if not v.wipe_remove_sparse_layers:
+        gui.create_logitem("Full purge reduction configured")
+        v.full_purge_reduction = True
+        v.needpurgetower = True
+    else:
+        gui.log_warning("FULL PURGE TOWER REDUCTION feature mode not compatible with sparse wipe tower in PS")
+        v.full_purge_reduction = False
+
+
+# chech the version of P2PP on startup (requires an internet connection)
+def _checkversion(value):
+    import p2pp.checkversion as cv
+    import version
+    latest = cv.get_version(cv.MASTER)
+    if latest:
+        if semver_version.parse(latest) > semver_version.parse(version.Version):
+            gui.create_logitem("New version of P2PP available ({})".format(latest), "red", False, "2.0")
+
+
+# buffer size in kB used when streaming the input and output files
+def _streamingbuffer(value):
+    buffer_size = intparameter(value)
+    if buffer_size > 0:
+        v.streaming_buffer = buffer_size * 1024
+    else:
+        gui.log_warning("STREAMINGBUFFER must be a positive number of kB, default used")
+
+
+# profiles the rest of the processing, see profiler.py
+def _profile(value):
+    profiler.start()
+
+
+def _finish_moves_m400(value):
+    v.finish_moves = "M400"
+    v.replace_G4P0 = True
+
+
+# p2pp_process_file a gcode file with absolute extrusios instead of relative ones
+def _absoluteextruder(value):
+    v.absolute_extruder = True
+    gui.create_logitem("Convert to absolute extrusion parameters")
+
+
+# unused !!! to be removed.
+def _debugtcommand(value):
+    v.debug_leaveToolCommands = True
+    gui.log_warning("DEBUGTCOMMAND ACTIVE - File will not print correctly!!")
+
+
+# SECTION Parameter registry
+
+# every ;P2PP KEYWORD[=VALUE] parameter is described by a Parameter:
+#   kind     FLAG (no value, sets target to value), INT, FLOAT, TEXT, APPEND (value added to the target list)
+#            or IGNORED (accepted, no effect)
+#   target   variable in p2pp.variables set by the parameter, handler(value) for anything more complex
+#   devices  the Palette models the parameter can be used with, None for all
+# the registry is used to apply the parameters, to validate them before processing and by the configuration tool
+
+FLAG = "flag"
+INT = "int"
+FLOAT = "float"
+TEXT = "text"
+APPEND = "append"
+IGNORED = "ignored"
+
+PALETTE2 = "P2"
+PALETTE3 = "P3"
+PALETTEPLUS = "P+"
+
+device_names = {PALETTE2: "Palette 2",
+                PALETTE3: "Palette 3",
+                PALETTEPLUS: "Palette+"}
+
+
+class Parameter(object):
+
+    def __init__(self, name, kind, target=None, handler=None, value=True, devices=None, description=""):
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.handler = handler
+        self.value = value
+        self.devices = devices
+        self.description = description
+
+    def apply(self, value):
+        if self.handler:
+            self.handler(value)
+        elif self.kind == FLAG:
+            setattr(v, self.target, self.value)
+        elif self.kind == INT:
+            setattr(v, self.target, intparameter(value))
+        elif self.kind == FLOAT:
+            setattr(v, self.target, floatparameter(value))
+        elif self.kind == TEXT:
+            setattr(v, self.target, value)
+        elif self.kind == APPEND:
+            getattr(v, self.target).append(value)
+
+    # returns an error message when the value cannot be used, None otherwise
+    def check(self, value):
+        if self.kind == INT:
             try:
-                v.blobster_advanced_speed.append(abs(int(i)))
+                int(value)
             except ValueError:
-                gui.log_warning("BLOBSTER_ADVANCED_SPEEDH parameter accepts a list of interger values (length in mm)")
-        return
-
-    if keyword == "BLOBSTER_ADVANCED_FAN":
-        v.blobster_advanced_fan = []
-        fields = value.split(",")
-        for i in fields:
+                return "{} expects an integer value, got '{}'".format(self.name, value)
+        if self.kind == FLOAT:
             try:
-                v.blobster_advanced_fan.append(int(min(abs(int(i)), 100)*2.55))
+                float(value)
             except ValueError:
-                gui.log_warning("BLOBSTER_ADVANCED_FAN parameter accepts a list of interger values (percentage 0-100)")
-        return
-
-    # BB3D/BLOBSTER config parm
-    if keyword == "BLOBSTER_ENABLE":
-        if not v.wipe_remove_sparse_layers:
-            v.blobster_purge_enabled = True
-            v.mechpurge_blob_size = 180
-            v.mechpurge_minimalclearenceheight = 30
-            v.mechpurge_blob_cooling_time = 60
-
-            gui.create_logitem("<b>BLOBSTER Will only work with installed hardware on a Prusa Printer</b>")
-        else:
-            gui.log_warning("<b>BLOBSTER mode not compatible with sparse wipe tower in PS</b>")
-        return
-
-    # BB3D/BLOBSTER config parm
-    if keyword in ["BIGBRAIN3D_SMARTFAN", "BLOBSTER_SMARTFAN"]:
-        v.mechpurge_smartfan = True
-        return
-
-    # defines the minimal splice length ( this is the safe length to make sure a splice is only heated once (70/90 for P2/P3 resp)
-    if keyword == "MINSPLICE":
-        v.min_splice_length = floatparameter(value)
-        if v.palette3:
-            if v.min_splice_length < v.min_splice_p3:
-                gui.log_warning("Minimal slice length adjusted to {}mm for palette 3".format(v.min_splice_p3))
-                v.min_splice_length = v.min_splice_p3
-
-        if v.min_splice_length < 70:
-            v.min_splice_length = 70
-            gui.log_warning("Minimal slice length adjusted to 70mm")
-        return
-
-    # IDEX secondary extruder
-    if keyword == "MAPPHYSICALEXTRUDER":
-        try:
-            fields = value.split(",")
-            v.mapphysical = True
-            v.mapphysicalfrom=int(floatparameter(fields[0]))
-            v.mapphysicalto = int(floatparameter(fields[1]))
-        except (IndexError, ValueError):
-            gui.log_warning("MAPPHYSICALEXTRUDER - ERROR in parameters {}, should be source,target".format(value))
-            v.mapphysical = False
-
-    # LINEAR PING removed
-
-    # set the distance between pings (same length every time), instead of increasing ping lengths
-    if keyword == "LINEARPINGLENGTH":
-        v.ping_interval = floatparameter(value)
-        v.ping_length_multiplier = 1.0
-        if not v.powerchaos:
-            if v.ping_interval < 100:
-                v.ping_interval = 100
-                gui.log_warning("Minimal Linear Ping distance is 300mm!  Your config stated: {}".format(value))
-            gui.create_logitem("Linear Ping interval of  {:-6.2f}mm".format(v.ping_interval))
-        return
-
-    # Set the location for the side wipes
-    if keyword == "SIDEWIPELOC":
-        v.side_wipe_loc = value
-        return
-
-    # define a Z-Hop for jumps to the wipe location
-    if keyword == "SIDEWIPEZHOP":
-        v.addzop = floatparameter(value)
-        gui.create_logitem("Side Wipe ZHOP of {:3.2f}mm".format(v.addzop))
-
-    # maybe removed??
-    if keyword == "SIDEWIPEZHOP_SKIPRETURN":
-        v.sidewipe_delay_zreturn = True
-
-    # set the highest top speed for purging
-    if keyword == "PURGETOPSPEED":
-        v.purgetopspeed = int(floatparameter(value))
-
-        # if parameter specified is below 200 then the value is assumed mm/sec and is converted to mm/min
-        if v.purgetopspeed < 200:
-            v.purgetopspeed = v.purgetopspeed * 60
-
-        gui.create_logitem("Purge Max speed set to {:.0f}mm/min ({}mm/s)".format(v.purgetopspeed, v.purgetopspeed / 60))
-        return
-
-    # set the wipe feedrate
-    if keyword == "WIPEFEEDRATE":
-        v.wipe_feedrate = floatparameter(value)
-        return
-
-    # define the sidewipe minimal and macimal Y position
-    if keyword == "SIDEWIPEMINY":
-        v.sidewipe_miny = floatparameter(value)
-        return
-
-    # define the sidewipe minimal and macimal Y position
-    if keyword == "SIDEWIPEMAXY":
-        v.sidewipe_maxy = floatparameter(value)
-        return
-
-    # define a extrusion multiplier for sidewipe.  needed???
-    if keyword == "SIDEWIPECORRECTION":
-        v.sidewipe_correction = floatparameter(value)
-        if v.sidewipe_correction < 0.9 or v.sidewipe_correction > 1.10:
-            v.sidewipe_correction = 1.0
-        return
-
-    # apply delta (similar to sparse layer removal in PS2.4
-    if keyword == "PURGETOWERDELTA":
-        parm = abs(floatparameter(value))
-        if parm > 0.001 and v.wipe_remove_sparse_layers:
-            gui.log_warning("TOWER DELTA feature mode not compatible with sparse wipe tower in PS")
-            v.max_tower_delta = 0.0
-        else:
-            if parm != float(0):
-                v.max_tower_z_delta = abs(floatparameter(value))
-                gui.create_logitem("Max Purge Tower Delta set to {:-2.2f}mm".format(v.max_tower_z_delta))
-        return
-
-    # simlir to tower delta but rather reduces the base of the tower to make it growmore evenly with the print
-    if keyword == "FULLPURGEREDUCTION":
-        if not v.wipe_remove_sparse_layers:
-            gui.create_logitem("Full purge reduction configured")
-            v.full_purge_reduction = True
-            v.needpurgetower = True
-        else:
-            gui.log_warning("FULL PURGE TOWER REDUCTION feature mode not compatible with sparse wipe tower in PS")
-            v.full_purge_reduction = False
-        return
-
-    if keyword == "FIRSTTOWERLAYERSPEEDUP":
-        v.firsttowerlayerspeedup = True
-        return
-
-    # chech the version of P2PP on startup (requires an internet connection)
-    if keyword == "CHECKVERSION":
-        import p2pp.checkversion as cv
-        import version
-        latest = cv.get_version(cv.MASTER)
-        if latest:
-            if semver_version.parse(latest) > semver_version.parse(version.Version):
-                gui.create_logitem("New version of P2PP available ({})".format(latest), "red", False, "2.0")
-
-    # co be removed ?
-    if keyword == "DO_NOT_GENERATE_M0":
-        v.generate_M0 = False
-        return
-
-    # wait for user feedback at the ned of processing
-    if keyword == "CONSOLEWAIT":
-        v.consolewait = True
-        return
-
-    if keyword == "FINISH_MOVES_M400":
-        v.finish_moves = "M400"
-        v.replace_G4P0 = True
-
-    # process toolchanges the KLIPPER way
-    if keyword == "KLIPPER_TOOLCHANGE":
-        v.klipper = True
-        return
-
-    # close and continue even if there are warnings
-    if keyword == "IGNOREWARNINGS":
-        v.ignore_warnings = True
-        return
-
-    # p2pp_process_file a gcode file with absolute extrusios instead of relative ones
-    if keyword == "ABSOLUTEEXTRUDER":
-        v.absolute_extruder = True
-        gui.create_logitem("Convert to absolute extrusion parameters")
-        return
-
-    # unused !!! to be removed.
-    if keyword == "DEBUGTCOMMAND":
-        v.debug_leaveToolCommands = True
-        gui.log_warning("DEBUGTCOMMAND ACTIVE - File will not print correctly!!")
-        return
+                return "{} expects a numeric value, got '{}'".format(self.name, value)
+        if self.kind == TEXT and value.strip() == "":
+            return "{} expects a value".format(self.name)
+        return None
+
+
+parameter_table = {}
+
+
+def register(name, kind, target=None, handler=None, value=True, devices=None, description="", aliases=()):
+    parameter = Parameter(name, kind, target, handler, value, devices, description)
+    for keyword in (name,) + tuple(aliases):
+        parameter_table[keyword] = parameter
+    return parameter
+
+
+# hardware selection
+register("PALETTE3", FLAG, handler=_palette3, description="Palette 3 (4 inputs)")
+register("PALETTE3_PRO", FLAG, handler=_palette3_pro, description="Palette 3 Pro (8 inputs)")
+register("ACCESSORYMODE_MAFX", FLAG, handler=_accessorymode_mafx,
+         description="Generate MAFX file (accessory mode)")
+register("ACCESSORYMODE_MAF", FLAG, handler=_accessorymode_maf, description="Generate MAF file (accessory mode)")
+register("ACCESSORYMODE_MSF", FLAG, handler=_accessorymode_msf, description="Generate MSF file (accessory mode)")
+register("PRINTERPROFILE", TEXT, handler=_printerprofile, description="Printer profile ID of the Palette")
+register("P+LOADINGOFFSET", FLOAT, handler=_palette_plus_loadingoffset, devices=(PALETTEPLUS,),
+         description="Palette+ loading offset")
+register("P+PPM", FLOAT, "palette_plus_ppm", devices=(PALETTEPLUS,), description="Palette+ pulses per mm")
+
+# Palette 3
+register("P3_HOSTNAME", TEXT, "p3_hostname", devices=(PALETTE3,), description="Hostname or IP address of the Palette 3")
+register("P3_PROFILENAME", TEXT, "p3_printername", devices=(PALETTE3,), description="Printer profile name on the Palette 3")
+register("P3_UPLOADFILE", FLAG, "p3_uploadfile", devices=(PALETTE3,), description="Upload the file to the Palette 3")
+register("P3_SHOWPRINTERPAGE", FLAG, "p3_showwebbrowser", devices=(PALETTE3,),
+         description="Open the Palette 3 page after the upload")
+register("P3_PROCESSPREHEAT", FLAG, "p3_process_preheat", devices=(PALETTE3,),
+         description="Enable the preheat function on the Palette 3")
+register("P3_ROTATEINTERFACE", FLAG, "p3_upside_down", devices=(PALETTE3,),
+         description="Rotate the Palette 3 interface")
+register("P3_MINIMALTOTALFILAMENT", FLOAT, handler=_p3_minimaltotalfilament, description="Minimal total filament length")
+
+# splices and pings
+register("SPLICEOFFSET", FLOAT, handler=_spliceoffset, description="Splice offset")
+register("EXTRAENDFILAMENT", FLOAT, handler=_extraendfilament, description="Extra filament at the end of the print")
+register("MINSTARTSPLICE", FLOAT, handler=_minstartsplice, description="Minimal first splice length")
+register("MINSPLICE", FLOAT, handler=_minsplice, description="Minimal splice length")
+register("LINEARPINGLENGTH", FLOAT, handler=_linearpinglength, description="Length between pings")
+register("POWERCHAOS", FLAG, "powerchaos", description="Allow pings shorter than 300mm")
+register("AUTOADDPURGE", FLAG, "autoaddsplice", description="Automatically add purge to meet minsplice requirements")
+register("MANUAL_SWAP", FLAG, handler=_manual_swap, description="Manual filament swap")
+register("FIRMWARE_PURGE_LENGTH", INT, "firmwarepurge", description="Firmware purge length")
+register("MAPPHYSICALEXTRUDER", TEXT, handler=_mapphysicalextruder, description="IDEX extruder mapping (source,target)")
+
+# purge tower
+register("PURGESPEEDADJUST", FLOAT, handler=_purgespeedadjust, description="Purge speed adjustment (%)")
+register("PURGETOPSPEED", FLOAT, handler=_purgetopspeed, description="Maximal purge speed")
+register("PURGETOWERDELTA", FLOAT, handler=_purgetowerdelta, description="Maximal purge tower delta")
+register("FULLPURGEREDUCTION", FLAG, handler=_fullpurgereduction, description="Full purge reduction")
+register("FIRSTTOWERLAYERSPEEDUP", FLAG, "firsttowerlayerspeedup", description="Speed up the first tower layer")
+register("WIPEFEEDRATE", FLOAT, "wipe_feedrate", description="Wipe feedrate")
+
+# side wipe
+register("SIDEWIPELOC", TEXT, "side_wipe_loc", description="Side wipe location")
+register("SIDEWIPEMINY", FLOAT, "sidewipe_miny", description="Side wipe minimal Y position")
+register("SIDEWIPEMAXY", FLOAT, "sidewipe_maxy", description="Side wipe maximal Y position")
+register("SIDEWIPECORRECTION", FLOAT, handler=_sidewipecorrection, description="Side wipe extrusion multiplier")
+register("SIDEWIPEZHOP", FLOAT, handler=_sidewipezhop, description="Z-hop for moves to the side wipe location")
+register("SIDEWIPEZHOP_SKIPRETURN", FLAG, "sidewipe_delay_zreturn", description="Delay the Z return after a side wipe")
+register("BEFORESIDEWIPEGCODE", APPEND, "before_sidewipe_gcode", description="GCode executed before a side wipe")
+register("AFTERSIDEWIPEGCODE", APPEND, "after_sidewipe_gcode", description="GCode executed after a side wipe")
+register("AUTOLOADINGOFFSET", FLOAT, "autoloadingoffset", description="Unused")
+
+# BB3D and BLOBSTER
+register("BIGBRAIN3D_ENABLE", FLAG, handler=_bigbrain3d_enable, description="Enable BigBrain3D")
+register("BLOBSTER_ENABLE", FLAG, handler=_blobster_enable, description="Enable Blobster")
+register("BIGBRAIN3D_BLOBSIZE", INT, "mechpurge_blob_size", aliases=("BLOBSTER_BLOBSIZE",), description="Blob size")
+register("BLOBSTER_ENGAGETIME", INT, "blobster_engagetime", description="Blobster engage time")
+register("BIGBRAIN3D_SINGLEBLOB", FLAG, "single_blob", description="Single blob")
+register("BIGBRAIN3D_BLOBSPEED", INT, "mechpurge_blob_speed", aliases=("BLOBSTER_BLOBSPEED",), description="Blob speed")
+register("BIGBRAIN3D_COOLINGTIME", INT, "mechpurge_blob_cooling_time", aliases=("BLOBSTER_COOLINGTIME",),
+         description="Blob cooling time")
+register("BIGBRAIN3D_PURGEPOSITION", FLOAT, "mechpurge_x_position", aliases=("BLOBSTER_PURGEPOSITION",),
+         description="Purge X position")
+register("BIGBRAIN3D_PURGEYPOSITION", FLOAT, "bigbrain3d_y_position", aliases=("BIGBRAIN3D_PURGEPOSITIONY",),
+         description="Purge Y position")
+register("BIGBRAIN3D_MOTORPOWER_HIGH", INT, "bigbrain3d_motorpower_high", description="High motor power")
+register("BIGBRAIN3D_MOTORPOWER_NORMAL", INT, "bigbrain3d_motorpower_normal", description="Normal motor power")
+register("BIGBRAIN3D_NUMBER_OF_WHACKS", INT, "bigbrain3d_whacks", description="Number of whacks")
+register("BIGBRAIN3D_PRIME_BLOBS", INT, "mechpurge_prime_blobs", aliases=("BLOBSTER_PRIME_BLOBS",),
+         description="Number of prime blobs")
+register("BIGBRAIN3D_FAN_OFF_PAUSE", INT, "bigbrain3d_fanoffdelay", description="Pause after turning off the fan")
+register("BIGBRAIN3D_LEFT_SIDE", FLAG, "bigbrain3d_left", value=-1, description="BigBrain3D on the left side")
+register("BIGBRAIN3D_CLEARANCE_MM", FLOAT, "mechpurge_minimalclearenceheight", aliases=("BLOBSTER_CLEARANCE_MM",),
+         description="Minimal clearance height")
+register("BIGBRAIN3D_RETRACT", FLOAT, "mechpurge_retract", aliases=("BLOBSTER_RETRACT",), description="Retraction")
+register("BIGBRAIN3D_SMARTFAN", FLAG, "mechpurge_smartfan", aliases=("BLOBSTER_SMARTFAN",), description="Smart fan")
+register("BLOBSTER_ADVANCED", FLAG, handler=_blobster_advanced, description="Blobster advanced mode")
+register("BLOBSTER_ADVANCED_LENGTH", TEXT, handler=_blobster_advanced_length, description="Blob lengths (mm)")
+register("BLOBSTER_ADVANCED_SPEED", TEXT, handler=_blobster_advanced_speed, description="Blob speeds")
+register("BLOBSTER_ADVANCED_FAN", TEXT, handler=_blobster_advanced_fan, description="Blob fan speeds (%)")
+
+# output and processing
+register("TEMPERATURECONTROL", FLAG, "process_temp", description="Delay temperature changes until after the purge block")
+register("SAVEUNPROCESSED", FLAG, "save_unprocessed", description="Save a copy of the unprocessed file")
+register("CHECKVERSION", FLAG, handler=_checkversion, description="Check for a new P2PP version")
+register("DO_NOT_GENERATE_M0", FLAG, "generate_M0", value=False, description="Do not generate M0")
+register("CONSOLEWAIT", FLAG, "consolewait", description="Wait for the user at the end of processing")
+register("STREAMINGMODE", FLAG, "streaming_mode", description="Read the input twice instead of keeping it in memory")
+register("STREAMINGBUFFER", INT, handler=_streamingbuffer, description="Streaming buffer size (kB)")
+register("FINISH_MOVES_M400", FLAG, handler=_finish_moves_m400, description="Use M400 to finish moves")
+register("KLIPPER_TOOLCHANGE", FLAG, "klipper", description="Process toolchanges the Klipper way")
+register("IGNOREWARNINGS", FLAG, "ignore_warnings", description="Close even when there are warnings")
+register("SIDECAR", FLAG, "sidecar", description="Save the splice/ping plan to regenerate the Palette files")
+register("STATS", FLAG, "stats_comments", description="Add the processing statistics as comments to the output")
+register("PROFILE", FLAG, handler=_profile, description="Save a cProfile profile of the processing next to the output")
+register("ABSOLUTEEXTRUDER", FLAG, handler=_absoluteextruder, description="Convert to absolute extrusion")
+register("DEBUGTCOMMAND", FLAG, handler=_debugtcommand, description="Keep the tool commands (debug)")
+
+# since 5.1.0 taken from the input file
+for _keyword in ["BEDORIGINX", "BEDORIGINY", "BEDSIZEX", "BEDSIZEY"]:
+    register(_keyword, IGNORED, description="Taken from the input file")
+
+
+def parameter_names():
+    return sorted(set(parameter.name for parameter in parameter_table.values()))
+
+
+def known_parameter(keyword):
+    return keyword.upper().strip() in parameter_table
+
+
+# ;P2PP line for the configuration tool, raises KeyError for unknown keywords
+def parameter_line(keyword, value=None):
+    parameter = parameter_table[keyword]
+    if parameter.kind == FLAG or value is None:
+        return ";P2PP {}".format(keyword)
+    return ";P2PP {}={}".format(keyword, value)
+
+
+# SECTION P2PP Parameter parsing
+
+def selected_device(keywords):
+    if v.palette3 or "PALETTE3" in keywords or "PALETTE3_PRO" in keywords:
+        return PALETTE3
+    if v.palette_plus or "ACCESSORYMODE_MSF" in keywords:
+        return PALETTEPLUS
+    return PALETTE2
+
+
+# checks a complete set of (keyword, value) parameters before any of them is applied
+# the messages are informational, the parameters are applied (or ignored) as before
+def validate_parameters(items):
+    items = [(keyword.upper().strip(), "" if value is None else value) for keyword, value in items]
+    device = selected_device([keyword for keyword, value in items])
+    messages = []
+    for keyword, value in items:
+        parameter = parameter_table.get(keyword)
+        if parameter is None:
+            messages.append("Unknown parameter {} - ignored".format(keyword))
+            continue
+        message = parameter.check(value)
+        if message:
+            messages.append(message)
+        if parameter.devices and device not in parameter.devices:
+            messages.append("{} is only used with {}"
+                            .format(keyword, " / ".join(device_names[d] for d in parameter.devices)))
+    return messages
+
+
+def check_config_parameters(keyword, value):
+    keyword = keyword.upper().strip()
+
+    if value is None:
+        value = ""
+
+    parameter = parameter_table.get(keyword)
+    if parameter:
+        parameter.apply(value)
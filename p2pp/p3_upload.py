@@ -12,6 +12,7 @@ import requests
 
 import p2pp.variables as v
 import p2pp.gui as gui
+import p2pp.qtgui as qtgui
 from PyQt5 import uic, QtCore
 from PyQt5.QtGui import QTextCursor, QTransform
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings
@@ -23,13 +24,13 @@ total_bytes = 0
 def callback(monitor):
     pct = min(int(50*monitor.bytes_read / (total_bytes+1))+1, 50)
     newline = "|" + '█'*pct + '-'*(50-pct)+"| {}/{}Kb [{:3}%]".format(int(monitor.bytes_read/1024),int(total_bytes/1024), pct*2)
-    cur = gui.form.textBrowser.textCursor()
-    gui.form.textBrowser.moveCursor(QTextCursor.End, QTextCursor.MoveAnchor)
-    gui.form.textBrowser.moveCursor(QTextCursor.StartOfLine, QTextCursor.MoveAnchor)
-    gui.form.textBrowser.moveCursor(QTextCursor.End, QTextCursor.KeepAnchor)
-    gui.form.textBrowser.textCursor().removeSelectedText()
-    gui.form.textBrowser.textCursor().deletePreviousChar()
-    gui.form.textBrowser.setTextCursor(cur)
+    cur = qtgui.form.textBrowser.textCursor()
+    qtgui.form.textBrowser.moveCursor(QTextCursor.End, QTextCursor.MoveAnchor)
+    qtgui.form.textBrowser.moveCursor(QTextCursor.StartOfLine, QTextCursor.MoveAnchor)
+    qtgui.form.textBrowser.moveCursor(QTextCursor.End, QTextCursor.KeepAnchor)
+    qtgui.form.textBrowser.textCursor().removeSelectedText()
+    qtgui.form.textBrowser.textCursor().deletePreviousChar()
+    qtgui.form.textBrowser.setTextCursor(cur)
     gui.create_logitem(newline, "blue", True)
 
 # SECTION UPLOAD ROUTINE
@@ -60,7 +61,7 @@ def uploadfile(localfile, p3file):
         form.label_5.setText("Please specify hostname or IP.\nP3_HOSTNAME config parameter missing.")
         form.RetryButton.setText("Upload")
         window.show()
-        gui.app.exec()
+        qtgui.app.exec()
         v.p3_hostname = form.hostname.text()
     else:
         form.hostname.setText(v.p3_hostname)
@@ -68,7 +69,7 @@ def uploadfile(localfile, p3file):
     form.RetryButton.setText("Retry")
 
     gui.create_logitem("Sending file {}  to P3 ({})".format(p3file, v.p3_hostname), "blue", True)
-    gui.app.sync()
+    qtgui.app.sync()
     while v.retry_state:
         try:
             with open(localfile, "rb") as mcfx_file:
@@ -93,7 +94,7 @@ def uploadfile(localfile, p3file):
         except Exception as e:
             # print(e)
             gui.log_warning("Could not send file ({}) to P3 ({})".format(p3file, v.p3_hostname))
-            gui.app.sync()
+            qtgui.app.sync()
             _error = "Connection Error occurred!"
 
         if v.p3_showwebbrowser and _error is None:
@@ -128,7 +129,7 @@ def uploadfile(localfile, p3file):
                 else:
                     webform.webBrowser.load(QtCore.QUrl(tgtName))
                 webwindow.show()
-                gui.app.exec()
+                qtgui.app.exec()
 
             except Exception as e:
                 gui.logexception(e)
@@ -136,7 +137,7 @@ def uploadfile(localfile, p3file):
         if v.retry_state and _error is not None:
             form.label_5.setText(_error)
             window.show()
-            gui.app.exec()
+            qtgui.app.exec()
             v.p3_hostname = form.hostname.text()
 
     gui.close_button_enable()
@@ -147,7 +148,7 @@ def on_clickretry():
     v.retry_state = True
     window.hide()
     webwindow.hide()
-    gui.app.quit()
+    qtgui.app.quit()
 
 
 def on_clickclose():
@@ -160,7 +161,7 @@ def on_clickabort():
     gui.create_logitem("Upload aborted by user")
     window.hide()
     webwindow.hide()
-    gui.app.quit()
+    qtgui.app.quit()
 
 # SECTION ERROR WINDOWS
 
@@ -0,0 +1,41 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# plan only mode (p2pp.plan(), python -m p2pp --plan):  the file is processed to place the splices and pings,
+# but no output is generated (no gcode lines, header, palette files, thumbnail or zip) and nothing is written.
+# report() returns the numbers of the print summary as a dict, for job costing and scheduling.
+
+import p2pp.variables as v
+
+
+# state is p2pp.variables or a ProcessingContext after processing
+def report(state=v):
+    splices = []
+    per_input = {}
+    for tool, length in zip(state.splice_used_tool, state.splice_length):
+        splices.append({"input": tool + 1, "length": round(length, 2)})
+        per_input[str(tool + 1)] = round(per_input.get(str(tool + 1), 0) + length, 2)
+
+    filaments = []
+    for i, used in enumerate(state.palette_inputs_used):
+        if used:
+            filaments.append({"input": i + 1,
+                              "type": state.filament_type[i],
+                              "color": state.filament_color_code[i].strip(),
+                              "length": round(state.material_extruded_per_color[i], 2)})
+
+    return {"version": state.version,
+            "splices": len(state.splice_extruder_position),
+            "splice_lengths": splices,
+            "splice_length_per_input": per_input,
+            "pings": len(state.ping_extruder_position),
+            "filaments": filaments,
+            "total_length": round(state.total_material_extruded, 2),
+            "printing_time": state.printing_time,
+            "warnings": [warning.lstrip(";") for warning in state.process_warnings]}
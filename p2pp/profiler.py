@@ -0,0 +1,51 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# profiling of a processing run with cProfile, for slow files in bug reports
+#
+#   --profile (P2PP.py, python -m p2pp) profiles the whole run
+#   ;P2PP PROFILE (or -p PROFILE) starts the profiler once the parameter is read
+#
+# the statistics are saved as <output>.pstats next to the output, to look at them:
+#
+#     python -m pstats plate.pstats        (then e.g. "sort cumtime" and "stats 30")
+
+import cProfile
+import os
+
+import p2pp.gui as gui
+import p2pp.variables as v
+
+SUFFIX = ".pstats"
+
+
+def profile_name(output_name):
+    return os.path.splitext(output_name)[0] + SUFFIX
+
+
+def start():
+    v.profile = True
+    if v.profiler is None:
+        v.profiler = cProfile.Profile()
+        v.profiler.enable()
+
+
+def stop(output_file, environment):
+    if v.profiler is None:
+        return
+    v.profiler.disable()
+
+    # PrusaSlicer passes a temporary output file, keep the profile next to the final output
+    filename = profile_name(environment.get("SLIC3R_PP_OUTPUT_NAME", output_file))
+    try:
+        v.profiler.dump_stats(filename)
+        gui.create_logitem("Profile saved to " + filename)
+    except (IOError, OSError):
+        gui.log_warning("Profile could not be written to {}".format(filename))
+    v.profiler = None
@@ -10,6 +10,7 @@ __email__ = 'P2PP@pandora.be'
 import math
 import re
 
+import p2pp.fileio as fileio
 import p2pp.gui as gui
 import p2pp.variables as v
 import p2pp.p2ppparams as parameters
@@ -115,359 +116,419 @@ def get_bedshape(line):
 
 # SECTION PS Parameters
 
-def parse_config_parameters():
+# every config line "; key = value" is split once and handed to the handler registered for its key.
+# The lines are processed from the last line of the file up to the first, some handlers depend on this
+# (layer_height is known before first_layer_height, filament_start_gcode before filament_type)
 
-    # TODO - get this information from the environment parameters
-    # TODO - need to find out as from what version of PS this is working
-    for idx in range(len(v.input_gcode) - 1, -1, -1):
+def _printing_time(gcode_line, value):
+    try:
+        fields = gcode_line.split("=")
+        fields = fields[-1].split(" ")
+        for i in range(len(fields)):
+            fields[i] = "0" + fields[i].strip('hms')
 
-        gcode_line = v.input_gcode[idx]
-        
-        # Stopping point of the config parameters
-        if gcode_line.startswith("; EXTRA_CONFIG_VARIABLES"):
-            return
-        
-        if gcode_line.startswith("; estimated printing time"):
-            try:
-                fields = gcode_line.split("=")
-                fields = fields[-1].split(" ")
-                for i in range(len(fields)):
-                    fields[i] = "0" + fields[i].strip('hms')
+        if len(fields) > 2:
+            h = int(fields[-3])
+        else:
+            h = 0
 
-                if len(fields) > 2:
-                    h = int(fields[-3])
-                else:
-                    h = 0
+        if len(fields) > 1:
+            m = int(fields[-2])
+        else:
+            m = 0
 
-                if len(fields) > 1:
-                    m = int(fields[-2])
-                else:
-                    m = 0
+        if len(fields) > 0:
+            s = int(fields[-1])
+        else:
+            s = 0
 
-                if len(fields) > 0:
-                    s = int(fields[-1])
-                else:
-                    s = 0
+        v.printing_time = h*3600 + m*60 + s
 
-                v.printing_time = h*3600 + m*60 + s
+    except (ValueError, IndexError):
+        pass
 
-            except (ValueError, IndexError):
-                pass
 
-        if gcode_line.startswith("; filament_settings_id"):
-            v.filament_ids = split_csv_strings(gcode_line)
+def _filament_settings_id(gcode_line, value):
+    v.filament_ids = split_csv_strings(gcode_line)
 
-        if "generated by PrusaSlicer" in gcode_line:
-            try:
-                s1 = gcode_line.split("+")
-                s2 = s1[0].split(" ")
-                v.ps_version = s2[-1]
-                gui.create_logitem("File was created with PS version:{}".format(v.ps_version))
-                if v.ps_version < "2.2":
-                    gui.create_logitem("<b>This version of P2PP is optimized to work with PS2.2 and higher!<b>")
-            except (ValueError, IndexError):
-                pass
-            continue
 
-        if gcode_line.startswith("; single_extruder_multi_material_priming"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                try:
-                    if int(gcode_line[parameter_start + 1:].strip()) == 1:
-                        gui.log_warning("[Print Settings][Multiple Extruders][Wipe Tower]Prime all printing extruders MUST be turned off")
-                        gui.log_warning("THIS FILE WILL NOT PRINT CORRECTLY")
-                except (ValueError, IndexError):
-                    pass
-            continue
+def _ps_version(gcode_line):
+    try:
+        s1 = gcode_line.split("+")
+        s2 = s1[0].split(" ")
+        v.ps_version = s2[-1]
+        gui.create_logitem("File was created with PS version:{}".format(v.ps_version))
+        if v.ps_version < "2.2":
+            gui.create_logitem("<b>This version of P2PP is optimized to work with PS2.2 and higher!<b>")
+    except (ValueError, IndexError):
+        pass
 
-        if gcode_line.startswith("; wipe_tower_no_sparse_layers"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                try:
-                    v.wipe_remove_sparse_layers = (int(gcode_line[parameter_start + 1:].strip()) == 1)
-                except (ValueError, IndexError):
-                    pass
-            continue
 
-        if gcode_line.startswith("; variable_layer_height"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.variable_layer = int(gcode_line[parameter_start + 1:].strip()) == 1
-            continue
+def _multi_material_priming(gcode_line, value):
+    try:
+        if int(value) == 1:
+            gui.log_warning("[Print Settings][Multiple Extruders][Wipe Tower]Prime all printing extruders MUST be turned off")
+            gui.log_warning("THIS FILE WILL NOT PRINT CORRECTLY")
+    except (ValueError, IndexError):
+        pass
 
-        if gcode_line.startswith("; bed_shape") and not v.bed_shape_warning:
-            get_bedshape(gcode_line)
-
-        if gcode_line.startswith("; first_layer_temperature"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                try:
-                    temps = gcode_line[parameter_start + 1:].strip().split(",")
-                    v.p3_printtemp = []
-                    for i in range(len(temps)):
-                        v.p3_printtemp.append(int(temps[i]))
-                except (IndexError, ValueError):
-                    v.p3_printtemp = [0, 0, 0, 0, 0, 0, 0, 0]
-
-        if gcode_line.startswith("; first_layer_bed_temperature"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                try:
-                    temps = gcode_line[parameter_start + 1:].strip().split(",")
-                    v.p3_bedtemp = []
-                    for i in range(len(temps)):
-                        v.p3_bedtemp.append(int(temps[i]))
-                except (IndexError, ValueError):
-                    v.p3_bedtemp = [0, 0, 0, 0, 0, 0, 0, 0]
-
-        if gcode_line.startswith("; max_print_height") or gcode_line.startswith("; printable_height"):  
-
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.z_maxheight = float(gcode_line[parameter_start + 1:].strip())
-            continue
 
-        if gcode_line.startswith("; wipe_tower_x"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1 and gcode_line.find(",") == -1:
-                v.wipe_tower_posx = float(gcode_line[parameter_start + 1:].strip())
-            continue
+def _no_sparse_layers(gcode_line, value):
+    try:
+        v.wipe_remove_sparse_layers = (int(value) == 1)
+    except (ValueError, IndexError):
+        pass
 
-        if gcode_line.startswith("; min_skirt_length"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.skirtsize = float(gcode_line[parameter_start + 1:].strip())
-            continue
 
-        if gcode_line.startswith("; skirts") or gcode_line.startswith("; skirt_loops"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.skirts = float(gcode_line[parameter_start + 1:].strip())
-            continue
+def _variable_layer_height(gcode_line, value):
+    v.variable_layer = int(value) == 1
 
-        if gcode_line.startswith("; wipe_tower_width") or gcode_line.startswith("; prime_tower_width"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.wipe_tower_width = float(gcode_line[parameter_start + 1:].strip())
-            continue
 
-        if gcode_line.startswith("; wipe_tower_y"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1 and gcode_line.find(",") == -1:
-                v.wipe_tower_posy = float(gcode_line[parameter_start + 1:].strip())
-            continue
+def _bed_shape(gcode_line, value):
+    if not v.bed_shape_warning:
+        get_bedshape(gcode_line)
 
-        if gcode_line.startswith("; extrusion_width") or gcode_line.startswith("; line_width"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                parm = gcode_line[parameter_start + 1:].strip()
-
-                if len(parm) == 0:
-                    gui.log_warning("extrusion width parameter does not contain any values FULL PURGE REDUCTION will not work")
-                    gui.log_warning("Please manually set the values for default extrusion (Print Settings/Advanced/Extrusion Width to resolve")
-                    continue
-
-                if parm[-1] == "%":
-                    parm = parm.replace("%", "").strip()
-                    tmpval = float(parm)
-                    v.extrusion_width = v.nozzle_diameter * tmpval / 100.0
-                else:
-                    v.extrusion_width = float(gcode_line[parameter_start + 1:].strip())
-
-                v.tx_offset = 2 + 4 * v.extrusion_width
-                v.yy_offset = 2 + 8 * v.extrusion_width
-            continue
 
-        if gcode_line.startswith("; infill_speed") or gcode_line.startswith("; internal_solid_infill_speed"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.infill_speed = float(gcode_line[parameter_start + 1:].strip()) * 60
-            continue
+def _first_layer_temperature(gcode_line, value):
+    try:
+        temps = value.split(",")
+        v.p3_printtemp = []
+        for i in range(len(temps)):
+            v.p3_printtemp.append(int(temps[i]))
+    except (IndexError, ValueError):
+        v.p3_printtemp = [0, 0, 0, 0, 0, 0, 0, 0]
 
-        if gcode_line.startswith("; layer_height"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                v.layer_height = float(gcode_line[parameter_start + 1:].strip())
-            continue
 
-        # this next function assumes that the parameters are stored in alphabetical order
-        # so layer_height is defined BEFORE first layer height when parsing back to front
-        if gcode_line.startswith("; first_layer_height"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                value = gcode_line[parameter_start + 1:].strip()
-                if value[-1] == "%":
-                    v.first_layer_height = float(value[:-1]) / 100.0 * v.layer_height
-                else:
-                    v.first_layer_height = float(value)
-            continue
+def _first_layer_bed_temperature(gcode_line, value):
+    try:
+        temps = value.split(",")
+        v.p3_bedtemp = []
+        for i in range(len(temps)):
+            v.p3_bedtemp.append(int(temps[i]))
+    except (IndexError, ValueError):
+        v.p3_bedtemp = [0, 0, 0, 0, 0, 0, 0, 0]
 
-        if gcode_line.startswith("; support_material_synchronize_layers"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                tmp = float(gcode_line[parameter_start + 1:].strip())
-                v.synced_support = tmp == 1
-            continue
 
-        if gcode_line.startswith("; support_material "):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                tmp = float(gcode_line[parameter_start + 1:].strip())
-                v.support_material = tmp == 1
-            continue
+def _max_print_height(gcode_line, value):
+    v.z_maxheight = float(value)
 
-        if gcode_line.startswith("; nozzle_diameter "):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                tmp = gcode_line[parameter_start + 1:].strip().split(",")
-                tmp = float(tmp[0])
 
-                v.nozzle_diameter = tmp
-            continue
+def _wipe_tower_x(gcode_line, value):
+    if gcode_line.find(",") == -1:
+        v.wipe_tower_posx = float(value)
 
-        if gcode_line.startswith("; start_filament_gcode ") or gcode_line.startswith("; filament_start_gcode "):
-            parameter_start = gcode_line.find("=")
-            gcode_value = gcode_line[parameter_start + 2:].strip()
-            fields = split_csv_strings(gcode_value)
-            for i in range(len(fields)):
-                lines = fields[0].split("\\n")
-                for line in lines:
-                    if line.startswith(";P2PP PROFILETYPEOVERRIDE="):
-                        value = line[26:]
-                        v.filament_type[i] = value
-                        v.used_filament_types.append(v.filament_type[i])
-                        v.used_filament_types = list(dict.fromkeys(v.used_filament_types))
-            continue
 
-        # start_gcode -> prusaslicer, machine_start_gcode -> bambu/orcaslicer
-        if gcode_line.startswith("; start_gcode ") or gcode_line.startswith("; machine_start_gcode "): 
-            parameter_start = gcode_line.find("=")
-            gcode_value = gcode_line[parameter_start + 2:].strip()
-            lines = gcode_value.split("\\n")
-            for line in lines:
-                m = v.regex_p2pp.match(line)
-                if m:
-                    if m.group(1).startswith("MATERIAL"):
-                        algorithm_process_material_configuration(m.group(1)[9:])
-                    else:
-                        parameters.check_config_parameters(m.group(1), m.group(2))
-
-            if v.blobster_advanced:
-                if len(v.blobster_advanced_speed) == 0:
-                    gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_SPEED parameter")
-                if len(v.blobster_advanced_fan) == 0:
-                    gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_FAN parameter")
-                if len(v.blobster_advanced_length) == 0:
-                    gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_LENGTH parameter")
-
-                if len(v.blobster_advanced_speed) != len(v.blobster_advanced_fan) or len(v.blobster_advanced_speed) != len(v.blobster_advanced_length):
-                    gui.log_warning("BLOBSTER - Advanced mode - BLOBSTER_ADVANCED_LENGTH/FAN/SPEED parameter must have same number of parameters")
-
-        if gcode_line.startswith("; extruder_colour") or gcode_line.startswith("; filament_colour"):
-            filament_colour = ''
-            parameter_start = gcode_line.find("=")
-            gcode_line = gcode_line[parameter_start + 1:].strip()
-            parameter_start = gcode_line.find("#")
-            if parameter_start != -1:
-                filament_colour = gcode_line.split(";")
-            v.filament_count = len(filament_colour)
-            for i in range(v.filament_count):
-                v.filament_color_code[i] = filament_colour[i][1:]
-
-        if gcode_line.startswith("; filament_diameter"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                filament_diameters = gcode_line[parameter_start + 1:].strip(" ").split(",")
-                v.filament_diameter = [1.75] * max(len(filament_diameters), 4)
-                for i in range(len(filament_diameters)):
-                    v.filament_diameter[i] = float(filament_diameters[i])
-            continue
+def _wipe_tower_y(gcode_line, value):
+    if gcode_line.find(",") == -1:
+        v.wipe_tower_posy = float(value)
 
-        if gcode_line.startswith("; filament_type"):
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                filament_string = gcode_line[parameter_start + 1:].strip(" ").split(";")
-                for i in range(len(filament_string)):
-                    if v.filament_type[i] != "":
-                        filament_string[i] = v.filament_type[i]
-                v.filament_type = filament_string
-                v.used_filament_types = list(set(filament_string))
 
-            continue
+def _min_skirt_length(gcode_line, value):
+    v.skirtsize = float(value)
 
-        if gcode_line.startswith("; retract_length = ") or gcode_line.startswith("; retract_length_toolchange"):
-            retract_error = False
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                retracts = gcode_line[parameter_start + 1:].strip(" ").split(",")
-                v.retract_length = [0.8] * max(len(retracts), v.colors)
-                for i in range(len(retracts)):
-                    v.retract_length[i] = float(retracts[i])-0.02
-                    if v.retract_length[i] < 0.0:
-                        retract_error = True
-                        gui.log_warning(
-                            "[Printer Settings]->[Extruders 1 -> {}]->[Retraction Length] should not be set to zero.".format(i))
-                    if retract_error:
-                        gui.log_warning("Generated file might not print correctly")
-            continue
 
-        if gcode_line.startswith("; gcode_flavor"):
-            if "reprap" in gcode_line:
-                v.isReprap_Mode = True
-            continue
+def _skirts(gcode_line, value):
+    v.skirts = float(value)
 
-        if "use_firmware_retraction" in gcode_line:
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                gcode_line = gcode_line[parameter_start + 1:].replace(";", "")
-                if "1" in gcode_line:
-                    gui.log_warning("Hardware retraction no longer supported")
-            continue
 
-        if "use_relative_e_distances" in gcode_line:
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                gcode_line = gcode_line[parameter_start + 1:].replace(";", "")
-                if "1" not in gcode_line:
-                    gui.log_warning("P2PP requires input file with RELATIVE extrusion")
-            continue
+def _wipe_tower_width(gcode_line, value):
+    v.wipe_tower_width = float(value)
+
+
+def _extrusion_width(gcode_line, value):
+    parm = value
+
+    if len(parm) == 0:
+        gui.log_warning("extrusion width parameter does not contain any values FULL PURGE REDUCTION will not work")
+        gui.log_warning("Please manually set the values for default extrusion (Print Settings/Advanced/Extrusion Width to resolve")
+        return
+
+    if parm[-1] == "%":
+        parm = parm.replace("%", "").strip()
+        tmpval = float(parm)
+        v.extrusion_width = v.nozzle_diameter * tmpval / 100.0
+    else:
+        v.extrusion_width = float(value)
+
+    v.tx_offset = 2 + 4 * v.extrusion_width
+    v.yy_offset = 2 + 8 * v.extrusion_width
+
+
+def _infill_speed(gcode_line, value):
+    v.infill_speed = float(value) * 60
+
+
+def _layer_height(gcode_line, value):
+    v.layer_height = float(value)
+
+
+def _first_layer_height(gcode_line, value):
+    if value[-1] == "%":
+        v.first_layer_height = float(value[:-1]) / 100.0 * v.layer_height
+    else:
+        v.first_layer_height = float(value)
+
+
+def _support_material_synchronize_layers(gcode_line, value):
+    tmp = float(value)
+    v.synced_support = tmp == 1
+
+
+def _support_material(gcode_line, value):
+    tmp = float(value)
+    v.support_material = tmp == 1
+
+
+def _nozzle_diameter(gcode_line, value):
+    tmp = value.split(",")
+    tmp = float(tmp[0])
 
-        if gcode_line.startswith("; wiping_volumes_matrix") or gcode_line.startswith("; flush_volumes_matrix"):
-            wiping_info = []
+    v.nozzle_diameter = tmp
+
+
+def _filament_start_gcode(gcode_line, value):
+    fields = split_csv_strings(value)
+    for i in range(len(fields)):
+        lines = fields[0].split("\\n")
+        for line in lines:
+            if line.startswith(";P2PP PROFILETYPEOVERRIDE="):
+                value = line[26:]
+                v.filament_type[i] = value
+                v.used_filament_types.append(v.filament_type[i])
+                v.used_filament_types = list(dict.fromkeys(v.used_filament_types))
+
+
+# start_gcode -> prusaslicer, machine_start_gcode -> bambu/orcaslicer
+def _start_gcode(gcode_line, value):
+    lines = value.split("\\n")
+    matches = [m for m in (v.regex_p2pp.match(line) for line in lines) if m]
+
+    # all parameters are checked before the first one is applied
+    for message in parameters.validate_parameters([m.groups() for m in matches if not m.group(1).startswith("MATERIAL")]):
+        gui.create_logitem(message)
+
+    for m in matches:
+        if m.group(1).startswith("MATERIAL"):
+            v.material_definitions.append(m.group(1)[9:])
+            algorithm_process_material_configuration(m.group(1)[9:])
+        else:
+            parameters.check_config_parameters(m.group(1), m.group(2))
+
+    if v.blobster_advanced:
+        if len(v.blobster_advanced_speed) == 0:
+            gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_SPEED parameter")
+        if len(v.blobster_advanced_fan) == 0:
+            gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_FAN parameter")
+        if len(v.blobster_advanced_length) == 0:
+            gui.log_warning("BLOBSTER - Advanced mode required BLOBSTER_ADVANCED_LENGTH parameter")
+
+        if len(v.blobster_advanced_speed) != len(v.blobster_advanced_fan) or len(v.blobster_advanced_speed) != len(v.blobster_advanced_length):
+            gui.log_warning("BLOBSTER - Advanced mode - BLOBSTER_ADVANCED_LENGTH/FAN/SPEED parameter must have same number of parameters")
+
+
+def _filament_colour(gcode_line, value):
+    filament_colour = ''
+    if value.find("#") != -1:
+        filament_colour = value.split(";")
+    v.filament_count = len(filament_colour)
+    for i in range(v.filament_count):
+        v.filament_color_code[i] = filament_colour[i][1:]
+
+
+def _filament_diameter(gcode_line, value):
+    filament_diameters = value.split(",")
+    v.filament_diameter = [1.75] * max(len(filament_diameters), 4)
+    for i in range(len(filament_diameters)):
+        v.filament_diameter[i] = float(filament_diameters[i])
+
+
+def _filament_type(gcode_line, value):
+    filament_string = value.split(";")
+    for i in range(len(filament_string)):
+        if v.filament_type[i] != "":
+            filament_string[i] = v.filament_type[i]
+    v.filament_type = filament_string
+    v.used_filament_types = list(set(filament_string))
+
+
+def _retract_length(gcode_line, value):
+    retract_error = False
+    retracts = value.split(",")
+    v.retract_length = [0.8] * max(len(retracts), v.colors)
+    for i in range(len(retracts)):
+        v.retract_length[i] = float(retracts[i])-0.02
+        if v.retract_length[i] < 0.0:
+            retract_error = True
+            gui.log_warning(
+                "[Printer Settings]->[Extruders 1 -> {}]->[Retraction Length] should not be set to zero.".format(i))
+        if retract_error:
+            gui.log_warning("Generated file might not print correctly")
+
+
+def _gcode_flavor(gcode_line, value):
+    if "reprap" in gcode_line:
+        v.isReprap_Mode = True
+
+
+def _firmware_retraction(gcode_line, value):
+    if "1" in value.replace(";", ""):
+        gui.log_warning("Hardware retraction no longer supported")
+
+
+def _relative_e_distances(gcode_line, value):
+    if "1" not in value.replace(";", ""):
+        gui.log_warning("P2PP requires input file with RELATIVE extrusion")
+
+
+def _wiping_volumes_matrix(gcode_line, value):
+    _warning = False
+    wiping_info = value.split(",")
+    _warning = True
+    for i in range(len(wiping_info)):
+        if int(wiping_info[i]) != 140 and int(wiping_info[i]) != 0:
             _warning = False
-            parameter_start = gcode_line.find("=")
-            if parameter_start != -1:
-                wiping_info = gcode_line[parameter_start + 1:].strip(" ").split(",")
-                _warning = True
-                for i in range(len(wiping_info)):
-                    if int(wiping_info[i]) != 140 and int(wiping_info[i]) != 0:
-                        _warning = False
-                    wiping_info[i] =float(wiping_info[i])
-
-            v.max_wipe = max(wiping_info)
-            v.bigbrain3d_matrix_blobs = v.max_wipe < 20
-            if not v.bigbrain3d_matrix_blobs:
-                map(filament_volume_to_length,wiping_info)
-            else:
-                gui.create_emptyline()
-                gui.create_logitem("BigBrain3D BLOB transitions detected")
-                color_table_size = int(math.sqrt(len(wiping_info)))
-                header = "<table><tr><th>From\\To</th>"
-                data = ""
-                for i in range(color_table_size):
-                    header = header + "<th>  Input {}  </th>".format(i)
-                    data = data + "<tr><th>Input {}   </th>".format(i)
-                    for j in range(color_table_size):
-                          data = data + ("<td align=center>{}</td>".format(int(wiping_info[j*color_table_size + i])))
-                    data = data + "</tr>"
-
-                header = header + "</tr>"
-                data = data + "</table>"
-                gui.create_logitem(header + data)
-                
-                gui.create_emptyline()
-
-            v.wiping_info = wiping_info
-            if _warning:
-                gui.create_logitem("<b>All purge lenghths 70/70 OR 140.  Purge lengths may not have been set correctly.</b>")
-            continue
+        wiping_info[i] =float(wiping_info[i])
+
+    v.max_wipe = max(wiping_info)
+    v.bigbrain3d_matrix_blobs = v.max_wipe < 20
+    if not v.bigbrain3d_matrix_blobs:
+        map(filament_volume_to_length,wiping_info)
+    else:
+        gui.create_emptyline()
+        gui.create_logitem("BigBrain3D BLOB transitions detected")
+        color_table_size = int(math.sqrt(len(wiping_info)))
+        header = "<table><tr><th>From\\To</th>"
+        data = ""
+        for i in range(color_table_size):
+            header = header + "<th>  Input {}  </th>".format(i)
+            data = data + "<tr><th>Input {}   </th>".format(i)
+            for j in range(color_table_size):
+                  data = data + ("<td align=center>{}</td>".format(int(wiping_info[j*color_table_size + i])))
+            data = data + "</tr>"
+
+        header = header + "</tr>"
+        data = data + "</table>"
+        gui.create_logitem(header + data)
+
+        gui.create_emptyline()
+
+    v.wiping_info = wiping_info
+    if _warning:
+        gui.create_logitem("<b>All purge lenghths 70/70 OR 140.  Purge lengths may not have been set correctly.</b>")
+
+
+config_handlers = {
+    "filament_settings_id": _filament_settings_id,
+    "single_extruder_multi_material_priming": _multi_material_priming,
+    "wipe_tower_no_sparse_layers": _no_sparse_layers,
+    "variable_layer_height": _variable_layer_height,
+    "bed_shape": _bed_shape,
+    "first_layer_temperature": _first_layer_temperature,
+    "first_layer_bed_temperature": _first_layer_bed_temperature,
+    "max_print_height": _max_print_height,
+    "printable_height": _max_print_height,
+    "wipe_tower_x": _wipe_tower_x,
+    "min_skirt_length": _min_skirt_length,
+    "skirts": _skirts,
+    "skirt_loops": _skirts,
+    "wipe_tower_width": _wipe_tower_width,
+    "prime_tower_width": _wipe_tower_width,
+    "wipe_tower_y": _wipe_tower_y,
+    "extrusion_width": _extrusion_width,
+    "line_width": _extrusion_width,
+    "infill_speed": _infill_speed,
+    "internal_solid_infill_speed": _infill_speed,
+    "layer_height": _layer_height,
+    "first_layer_height": _first_layer_height,
+    "support_material_synchronize_layers": _support_material_synchronize_layers,
+    "support_material": _support_material,
+    "nozzle_diameter": _nozzle_diameter,
+    "start_filament_gcode": _filament_start_gcode,
+    "filament_start_gcode": _filament_start_gcode,
+    "start_gcode": _start_gcode,
+    "machine_start_gcode": _start_gcode,
+    "extruder_colour": _filament_colour,
+    "filament_colour": _filament_colour,
+    "filament_diameter": _filament_diameter,
+    "filament_type": _filament_type,
+    "retract_length": _retract_length,
+    "retract_length_toolchange": _retract_length,
+    "gcode_flavor": _gcode_flavor,
+    "use_firmware_retraction": _firmware_retraction,
+    "use_relative_e_distances": _relative_e_distances,
+    "wiping_volumes_matrix": _wiping_volumes_matrix,
+    "flush_volumes_matrix": _wiping_volumes_matrix,
+}
+
+
+def process_config_line(gcode_line):
+    if "generated by PrusaSlicer" in gcode_line:
+        _ps_version(gcode_line)
+        return
+
+    if not gcode_line.startswith("; "):
+        return
+    parameter_start = gcode_line.find("=")
+    if parameter_start == -1:
+        return
+    key = gcode_line[2:parameter_start].strip()
+
+    try:
+        handler = config_handlers[key]
+    except KeyError:
+        # "estimated printing time (normal mode)", "estimated printing time (silent mode)"
+        if key.startswith("estimated printing time"):
+            _printing_time(gcode_line, None)
+        return
+
+    handler(gcode_line, gcode_line[parameter_start + 1:].strip())
+
+
+# gcode_lines iterates the input file from the last line up to the first
+def parse_config_parameters(gcode_lines):
+
+    # TODO - get this information from the environment parameters
+    # TODO - need to find out as from what version of PS this is working
+    for gcode_line in gcode_lines:
+
+        # Stopping point of the config parameters
+        if gcode_line.startswith("; EXTRA_CONFIG_VARIABLES"):
+            return
+
+        process_config_line(gcode_line)
+
+
+HEAD_LINES = 20
+
+
+def config_block_start(gcode_line):
+    # "; prusaslicer_config = begin" and the same for the PrusaSlicer forks, "; CONFIG_BLOCK_START" (Bambu/OrcaSlicer)
+    return gcode_line.endswith("_config = begin") or gcode_line.startswith("; CONFIG_BLOCK_START")
+
+
+# the config block is at the end of the file, only the end of the file is read (backwards) up to the start
+# of the config block plus the statistics comments just above it (estimated printing time, ...).
+# The slicer information is taken from the first lines of the file.
+# Files without a recognised config block are scanned completely, as before.
+def parse_config_file(filename):
+    in_statistics = False
+    for gcode_line in fileio.read_lines_reversed(filename):
+
+        if gcode_line.startswith("; EXTRA_CONFIG_VARIABLES"):
+            return
+
+        if in_statistics:
+            if gcode_line and not gcode_line.startswith(";"):
+                break
+        elif config_block_start(gcode_line):
+            in_statistics = True
+
+        process_config_line(gcode_line)
+
+    else:
+        # the whole file has been read
+        return
+
+    for gcode_line in fileio.read_lines(filename, HEAD_LINES):
+        if "generated by PrusaSlicer" in gcode_line:
+            _ps_version(gcode_line)
@@ -13,28 +13,13 @@ import p2pp.psconfig as gcodeparser
 import p2pp.variables as v
 import p2pp.manualswap as swap
 import p2pp.gui as gui
-import copy
-
-solidlayer = []
-emptylayer = []
-filllayer = []
-brimlayer = []
+import p2pp.stats as stats
+from p2pp.gcodestore import GCodeStore
 
 PURGE_SOLID = 1
 PURGE_EMPTY = 2
 
-current_purge_form = PURGE_SOLID
-current_purge_index = 0
-
-sequence_length_solid = 0
-sequence_length_empty = 0
-sequence_length_brim = 0
-
-last_posx = None
-last_posy = None
-
-last_brim_x = None
-last_brim_y = None
+# the purge layers and sequence state are kept in p2pp.variables (purge_*)
 
 # SECTION HELPERS
 
@@ -76,23 +61,24 @@ def generate_rectangle(result, x, y, w, h):
 
 
 def _purge_calculate_sequences_length():
-    global sequence_length_solid, sequence_length_empty, sequence_length_brim
-
-    sequence_length_solid = 0
-    sequence_length_empty = 0
-    sequence_length_brim = 0
+    v.sequence_length_solid = 0
+    v.sequence_length_empty = 0
+    v.sequence_length_brim = 0
 
-    for i in solidlayer:
-        if i[gcode.E] is not None:
-            sequence_length_solid += i[gcode.E]
+    for i in range(len(v.purge_solidlayer)):
+        e = v.purge_solidlayer.get_parameter(i, gcode.E)
+        if e is not None:
+            v.sequence_length_solid += e
 
-    for i in emptylayer:
-        if i[gcode.E] is not None:
-            sequence_length_empty += i[gcode.E]
+    for i in range(len(v.purge_emptylayer)):
+        e = v.purge_emptylayer.get_parameter(i, gcode.E)
+        if e is not None:
+            v.sequence_length_empty += e
 
-    for i in brimlayer:
-        if i[gcode.E] is not None:
-            sequence_length_brim += i[gcode.E]
+    for i in range(len(v.purge_brimlayer)):
+        e = v.purge_brimlayer.get_parameter(i, gcode.E)
+        if e is not None:
+            v.sequence_length_brim += e
 
 
 def _purge_create_sequence(code, pformat, x, y, w, h, step1):
@@ -127,11 +113,9 @@ def _purge_create_sequence(code, pformat, x, y, w, h, step1):
 
 
 def purge_create_layers(x, y, w, h):
-    global solidlayer, emptylayer, filllayer
-
-    solidlayer = []
-    emptylayer = []
-    filllayer = []
+    v.purge_solidlayer = GCodeStore()
+    v.purge_emptylayer = GCodeStore()
+    v.purge_filllayer = GCodeStore()
 
     ew = v.extrusion_width
 
@@ -142,18 +126,18 @@ def purge_create_layers(x, y, w, h):
     w = int(w / ew) * ew
     h = int(h / ew) * ew
 
-    solidlayer.append(gcode.create_command(";---- SOLID WIPE -------"))
-    generate_rectangle(solidlayer, x, y, w, h)
+    v.purge_solidlayer.append(gcode.create_command(";---- SOLID WIPE -------"))
+    generate_rectangle(v.purge_solidlayer, x, y, w, h)
 
-    emptylayer.append(gcode.create_command(";---- EMPTY WIPE -------"))
-    generate_rectangle(emptylayer, x, y, w, h)
+    v.purge_emptylayer.append(gcode.create_command(";---- EMPTY WIPE -------"))
+    generate_rectangle(v.purge_emptylayer, x, y, w, h)
 
-    filllayer.append(gcode.create_command(";---- FILL LAYER -------"))
-    generate_rectangle(filllayer, x, y, w, h)
+    v.purge_filllayer.append(gcode.create_command(";---- FILL LAYER -------"))
+    generate_rectangle(v.purge_filllayer, x, y, w, h)
 
-    _purge_create_sequence(solidlayer, "G1 X{:.3f} Y{:.3f} F%SPEED%", x, y, w, h, ew)
-    _purge_create_sequence(emptylayer, "G1 Y{:.3f} X{:.3f} F%SPEED%", y, x, h, w, 2)
-    _purge_create_sequence(filllayer, "G1 Y{:.3f} X{:.3f} F%SPEED%", y, x, h, w, 15)
+    _purge_create_sequence(v.purge_solidlayer, "G1 X{:.3f} Y{:.3f} F%SPEED%", x, y, w, h, ew)
+    _purge_create_sequence(v.purge_emptylayer, "G1 Y{:.3f} X{:.3f} F%SPEED%", y, x, h, w, 2)
+    _purge_create_sequence(v.purge_filllayer, "G1 Y{:.3f} X{:.3f} F%SPEED%", y, x, h, w, 15)
 
     _purge_generate_tower_brim(x, y, w, h)
 
@@ -165,60 +149,57 @@ def purge_create_layers(x, y, w, h):
 # SECTION Purge Output Generation
 
 def _purge_number_of_gcodelines():
-    if current_purge_form == PURGE_SOLID:
-        return len(solidlayer)
+    if v.current_purge_form == PURGE_SOLID:
+        return len(v.purge_solidlayer)
     else:
-        return len(emptylayer)
+        return len(v.purge_emptylayer)
 
 
 def _purge_update_sequence_index():
-    global current_purge_form, current_purge_index
-
-    current_purge_index = (current_purge_index + 1) % _purge_number_of_gcodelines()
-    if current_purge_index == 0:
+    v.current_purge_index = (v.current_purge_index + 1) % _purge_number_of_gcodelines()
+    if v.current_purge_index == 0:
         if (v.purgelayer + 1) * v.layer_height < v.current_position_z - 5:
-            current_purge_form = PURGE_EMPTY
+            v.current_purge_form = PURGE_EMPTY
         else:
-            current_purge_form = PURGE_SOLID
+            v.current_purge_form = PURGE_SOLID
         v.purgelayer += 1
         if v.side_wipe_length > 0:
             gcode.issue_code("G1 Z{:.2f} F10800".format((v.purgelayer + 1) * v.layer_height))
 
 
 def _purge_get_nextcommand_in_sequence():
-    if current_purge_form == PURGE_SOLID:
-        return copy.deepcopy(solidlayer[current_purge_index])
+    if v.current_purge_form == PURGE_SOLID:
+        return v.purge_solidlayer.get(v.current_purge_index)
     else:
-        return copy.deepcopy(emptylayer[current_purge_index])
+        return v.purge_emptylayer.get(v.current_purge_index)
 
 
 def _purge_generate_tower_brim(x, y, w, h):
-    global brimlayer, last_brim_x, last_brim_y
-
     ew = v.extrusion_width
-    brimlayer = []
+    v.purge_brimlayer = GCodeStore()
     y -= ew
     w += ew
     h += 2 * ew
 
-    brimlayer.append(gcode.create_command("; P2PP - BRIM CODE"))
-    brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f} F8640".format(x, y)))
-    brimlayer.append(gcode.create_command("G1 Z{:.3f}".format(v.layer_height)))
+    v.purge_brimlayer.append(gcode.create_command("; P2PP - BRIM CODE"))
+    v.purge_brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f} F8640".format(x, y)))
+    v.purge_brimlayer.append(gcode.create_command("G1 Z{:.3f}".format(v.layer_height)))
 
     for i in range(4):
-        brimlayer.append(
+        v.purge_brimlayer.append(
             gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f} F{}".format(x + w, y, calculate_purge(w), 1200)))
-        brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x + w, y + h, calculate_purge(h))))
+        v.purge_brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x + w, y + h, calculate_purge(h))))
         x -= ew
         w += 2 * ew
-        brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x, y + h, calculate_purge(w))))
+        v.purge_brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x, y + h, calculate_purge(w))))
         y -= ew
         h += 2 * ew
-        brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x, y, calculate_purge(h))))
+        v.purge_brimlayer.append(gcode.create_command("G1 X{:.3f} Y{:.3f}  E{:.4f}".format(x, y, calculate_purge(h))))
 
 
 # SECTION Retractions
 
+@stats.generator("purgetower")
 def retract(tool, speed=-1):
     length = v.retract_length[tool]
     if speed > 0:
@@ -228,17 +209,20 @@ def retract(tool, speed=-1):
     v.retraction -= length
 
 
+@stats.generator("purgetower")
 def largeretract(value=-3):
     gcode.issue_code("G1 E-{:.2f} F1200".format(value))
     v.retraction -= value
 
 
+@stats.generator("purgetower")
 def largeunretract():
     if v.retraction != 0:
         gcode.issue_code("G1 E{:.2f} F2400".format(-v.retraction))
         v.retraction = 0
 
 
+@stats.generator("purgetower")
 def unretract(tool, speed=-1, comment=""):
 
     if v.retraction == 0:
@@ -260,27 +244,27 @@ def getwipespeed():
         return v.wipe_feedrate
 
 
+@stats.generator("purgetower")
 def purge_generate_brim():
-    for i in range(len(brimlayer)):
-        gcode.issue_command(brimlayer[i])
+    for i in range(len(v.purge_brimlayer)):
+        gcode.issue_command(v.purge_brimlayer.get(i))
         if i == 1 and v.retraction:
             unretract(v.current_tool)
 
     # set the flag to update the post-session retraction move section
     v.retract_move = True
-    v.retract_x = last_brim_x
-    v.retract_y = last_brim_y
+    v.retract_x = v.last_brim_x
+    v.retract_y = v.last_brim_y
     retract(v.current_tool)
     # correct the amount of extrusion for the brim
 
 
+@stats.generator("purgetower")
 def purge_generate_sequence():
-    global last_posx, last_posy
-
-    if last_posx is None:
-        last_posx = v.purge_sequence_x
-    if last_posy is None:
-        last_posy = v.purge_sequence_y
+    if v.purge_last_posx is None:
+        v.purge_last_posx = v.purge_sequence_x
+    if v.purge_last_posy is None:
+        v.purge_last_posy = v.purge_sequence_y
 
     if not v.side_wipe_length > 0:
         return
@@ -303,11 +287,11 @@ def purge_generate_sequence():
     v.max_tower_delta = max(v.max_tower_delta, v.current_position_z - (v.purgelayer + 1) * v.layer_height)
     v.min_tower_delta = min(v.min_tower_delta, v.current_position_z - (v.purgelayer + 1) * v.layer_height)
 
-    if last_posx and last_posy:
+    if v.purge_last_posx and v.purge_last_posy:
         # gcode.issue_code(";retraction {}".format(v.retraction))
         if v.retraction == 0:
             retract(v.current_tool)
-        gcode.issue_code("G1 X{} Y{} F8640".format(last_posx, last_posy))
+        gcode.issue_code("G1 X{} Y{} F8640".format(v.purge_last_posx, v.purge_last_posy))
 
         if v.manual_filament_swap:
             swap.swap_pause("M25")
@@ -319,8 +303,8 @@ def purge_generate_sequence():
     while v.side_wipe_length > 0:
         next_command = _purge_get_nextcommand_in_sequence()
 
-        last_posx = if_defined(next_command[gcode.X], last_posx)
-        last_posy = if_defined(next_command[gcode.Y], last_posy)
+        v.purge_last_posx = if_defined(next_command[gcode.X], v.purge_last_posx)
+        v.purge_last_posy = if_defined(next_command[gcode.Y], v.purge_last_posy)
         v.side_wipe_length -= if_defined(next_command[gcode.E], 0)
         actual += if_defined(next_command[gcode.E], 0)
         gcode.issue_command(next_command, getwipespeed())
@@ -340,6 +324,6 @@ def purge_generate_sequence():
     # if we extruded more we need to account for that in the total count
 
     v.side_wipe_length = 0
-    v.retract_x = last_posx
-    v.retract_y = last_posy
+    v.retract_x = v.purge_last_posx
+    v.retract_y = v.purge_last_posy
     v.expect_retract = True
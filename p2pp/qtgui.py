@@ -0,0 +1,107 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+from PyQt5 import uic, QtWebEngineWidgets
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QFont
+import image_rc
+import p2pp.gui as gui
+import p2pp.variables as v
+from p2pp.reporters import Reporter
+import version
+import sys
+import os
+
+ui_file = "p2pp.ui"
+
+
+# SECTION Qt reporter, shows the log and progress in the P2PP window
+
+class QtReporter(Reporter):
+
+    interactive = True
+    # the window is only repainted with the progress updates
+    progress_interval = 0.1
+
+    def log(self, text, color="#000000"):
+        if color is None:
+            form.textBrowser.append(text)
+        else:
+            word = '<span style=\" color: {}\">  {}</span>'.format(color, text)
+            form.textBrowser.append(word)
+
+    def progress(self, pct):
+        form.progress.setProperty("value", max(0, min(100, pct)))
+        if pct >= 100:
+            form.label_5.setText("")
+            if len(v.process_warnings) == 0:
+                form.textBrowser.setStyleSheet("background-color: #DDFFDD;")
+                form.label_6.setText("COMPLETED OK")
+                form.label_6.setStyleSheet("color: #008000")
+            else:
+                form.textBrowser.setStyleSheet("background-color: #FFDDDD;")
+                form.label_6.setText("COMPLETED WITH WARNINGS")
+                form.label_6.setStyleSheet("color: #FF0000")
+        app.sync()
+
+    def set_filename(self, text):
+        form.filename.setText(text)
+        if text == "":
+            form.filename.setText('')
+            form.label_4.setText('')
+
+    def finish(self):
+        if not v.exit_enabled:
+            form.exitButton.clicked.connect(on_click)
+            form.exitButton.setEnabled(True)
+            v.exit_enabled = True
+            app.exec_()
+
+
+def on_click():
+    sys.exit(0)
+
+
+# SECTION MAIN Routine
+
+if sys.platform == 'darwin' or sys.platform == 'linux':
+    if len(os.path.dirname(sys.argv[0])) > 0:
+        ui = "{}/{}".format(os.path.dirname(sys.argv[0]), ui_file)
+    else:
+        ui = ui_file
+else:
+    ui = "p2pp.ui"
+    if len(os.path.dirname(sys.argv[0])) > 0:
+        ui = "{}\\{}".format(os.path.dirname(sys.argv[0]), ui_file)
+    else:
+        ui = ui_file
+
+app = QApplication([])
+Form, Window = uic.loadUiType(ui)
+window = Window()
+form = Form()
+form.setupUi(window)
+gui.set_reporter(QtReporter())
+gui.create_logitem("P2PP Version: {}".format(version.Version))
+gui.create_logitem("Python Version: {}".format(sys.version.split(' ')[0]))
+gui.create_logitem("Platform: {}".format(sys.platform))
+gui.create_emptyline()
+
+if sys.platform != "darwin":
+    form.filename.setFont(QFont("Courier", 8))
+    form.label_6.setFont(QFont("Courier", 10))
+    form.label_5.setFont(QFont("Courier", 8))
+    form.label_4.setFont(QFont("Courier", 8))
+    form.label.setFont(QFont("Courier", 8))
+    form.exitButton.setFont(QFont("Courier", 8))
+    form.textBrowser.setFont(QFont("Courier", 8))
+window.show()
+app.sync()
+
+
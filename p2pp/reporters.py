@@ -0,0 +1,108 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+import json
+import re
+import sys
+import time
+
+# SECTION Reporters
+
+# p2pp.gui forwards all logging and progress information to the active reporter.
+# The P2PP window uses the Qt reporter (p2pp/qtgui.py), headless runs use one of the reporters below.
+#
+#   log(text, color)     log line, text may contain html markup, color None means text is preformatted html
+#   progress(pct)        progress of the processing 0..100, >100 when done
+#   set_filename(text)   name of the file being processed
+#   finish()             processing has ended, the window waits for the user to close it
+#
+# progress updates are rate limited on wall clock time by gui.progress_string, a reporter receives
+# at most one update every progress_interval seconds (start, end and errors always get through)
+
+_html_tag = re.compile(r"<[^>]*>")
+
+WARNING_COLOR = "#FF0000"
+
+
+def strip_html(text):
+    return _html_tag.sub("", str(text)).replace("&nbsp;", " ")
+
+
+class Reporter(object):
+
+    # reporters that can interact with the user (upload dialogs etc)
+    interactive = False
+    progress_interval = 0.5
+
+    def log(self, text, color="#000000"):
+        pass
+
+    def progress(self, pct):
+        pass
+
+    def set_filename(self, text):
+        pass
+
+    def finish(self):
+        pass
+
+
+# does nothing at all, for benchmarks and embedding
+class NullReporter(Reporter):
+
+    progress_interval = float("inf")
+
+
+# plain text on stderr, progress is only shown on a terminal
+class ConsoleReporter(Reporter):
+
+    def __init__(self, stream=None, verbose=True):
+        self.stream = stream if stream is not None else sys.stderr
+        self.verbose = verbose
+        self.show_progress = verbose and self.stream.isatty()
+        self.progress_shown = False
+
+    def log(self, text, color="#000000"):
+        # without verbose output only the warnings are shown
+        if self.verbose or color == WARNING_COLOR:
+            if self.progress_shown:
+                self.stream.write("\n")
+                self.progress_shown = False
+            self.stream.write(strip_html(text) + "\n")
+
+    def progress(self, pct):
+        if self.show_progress:
+            self.stream.write("\rProcessing {:3}%".format(max(0, min(100, int(pct)))))
+            self.stream.flush()
+            self.progress_shown = True
+
+
+# one json object per line, for tools driving P2PP
+class JsonLinesReporter(Reporter):
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        fields["time"] = round(time.time(), 3)
+        self.stream.write(json.dumps(fields) + "\n")
+        self.stream.flush()
+
+    def log(self, text, color="#000000"):
+        self.emit("log", level="warning" if color == WARNING_COLOR else "info", text=strip_html(text))
+
+    def progress(self, pct):
+        self.emit("progress", percent=max(0, min(100, int(pct))))
+
+    def set_filename(self, text):
+        self.emit("file", name=text)
+
+    def finish(self):
+        self.emit("finish")
@@ -0,0 +1,202 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# splice/ping plan ("sidecar"):  ;P2PP SIDECAR saves <output>.p2pp.json next to the output
+#
+# The Palette files of accessory mode (.maf, .msf, .mafx) only hold the splice plan, the G-code is the same for
+# every Palette model.  The sidecar keeps what the omega header functions need (splices, pings, filaments,
+# material definitions, ...), so these files can be regenerated for another Palette model, printer profile or
+# splice offset without processing the G-code again:
+#
+#     python -m p2pp.sidecar plate.p2pp.json --device P3 [-p PRINTERPROFILE=...] [-p SPLICEOFFSET=40] [-o plate.mafx]
+
+import argparse
+import base64
+import json
+import os
+import sys
+
+import p2pp.fileio as fileio
+import p2pp.gui as gui
+import p2pp.psconfig  # has to be loaded before omega (omega -> purgetower -> psconfig -> omega)
+import p2pp.omega as omega
+import p2pp.p2ppparams as parameters
+import p2pp.variables as v
+from p2pp.context import ProcessingContext
+from p2pp.reporters import ConsoleReporter
+
+SIDECAR_FORMAT = 1
+SUFFIX = ".p2pp.json"
+
+# state read by the omega header functions
+sidecar_state = ["splice_extruder_position",
+                 "splice_length",
+                 "splice_used_tool",
+                 "ping_extruder_position",
+                 "ping_extrusion_between_pause",
+                 "palette_inputs_used",
+                 "material_extruded_per_color",
+                 "total_material_extruded",
+                 "filament_type",
+                 "filament_color_code",
+                 "filament_ids",
+                 "used_filament_types",
+                 "splice_offset",
+                 "autoloadingoffset",
+                 "hotswap_count",
+                 "printer_profile_string",
+                 "palette_plus_ppm",
+                 "palette_plus_loading_offset",
+                 "palette3",
+                 "palette_plus",
+                 "accessory_mode",
+                 "colors",
+                 "min_start_splice_length",
+                 "min_splice_length",
+                 "printing_time",
+                 "p3_printername",
+                 "p3_process_preheat",
+                 "p3_printtemp",
+                 "p3_bedtemp",
+                 "p3_thumbnail_data",
+                 "bb_minx", "bb_miny", "bb_minz",
+                 "bb_maxx", "bb_maxy", "bb_maxz"]
+
+# parameters selecting the Palette model of the regenerated file
+devices = {"P2": ["ACCESSORYMODE_MAF"],
+           "P+": ["ACCESSORYMODE_MSF"],
+           "P3": ["PALETTE3", "ACCESSORYMODE_MAFX"],
+           "P3PRO": ["PALETTE3_PRO", "ACCESSORYMODE_MAFX"]}
+
+
+def sidecar_name(output_name):
+    return os.path.splitext(output_name)[0] + SUFFIX
+
+
+# SECTION Save
+
+def write_sidecar(filename, job_name):
+    plan = {"format": SIDECAR_FORMAT,
+            "version": v.version,
+            "job_name": job_name,
+            "material_definitions": v.material_definitions,
+            "state": {name: getattr(v, name) for name in sidecar_state}}
+    with open(filename, "w") as f:
+        json.dump(plan, f)
+    gui.create_logitem("Splice/ping plan saved to " + filename)
+
+
+# SECTION Regenerate
+
+def load_sidecar(filename):
+    with open(filename) as f:
+        plan = json.load(f)
+    if plan.get("format") != SIDECAR_FORMAT:
+        raise ValueError("{} was not written by this version of P2PP".format(filename))
+    return plan
+
+
+def output_extension():
+    if v.palette3:
+        return ".mafx"
+    if v.palette_plus:
+        return ".msf"
+    return ".maf"
+
+
+# the splice positions include the splice offset, the first splice absorbs the difference
+def apply_splice_offset(previous_offset):
+    delta = v.splice_offset - previous_offset
+    if delta == 0 or len(v.splice_extruder_position) == 0:
+        return
+    v.splice_extruder_position = [position + delta for position in v.splice_extruder_position]
+    v.splice_length[0] += delta
+    if v.splice_length[0] < v.min_start_splice_length:
+        gui.log_warning("SHORT FIRST SPLICE (min {}mm) Length:{:-3.2f} Input {}"
+                        .format(v.min_start_splice_length, v.splice_length[0], v.splice_used_tool[0] + 1))
+
+
+# installs the plan in the active context, device is one of devices or None to keep the Palette model of the plan
+def load_plan(plan, device=None, options=None):
+    for name, value in plan["state"].items():
+        setattr(v, name, value)
+
+    if not v.accessory_mode:
+        raise ValueError("only files processed in accessory mode (ACCESSORYMODE_MAF/MSF/MAFX) can be regenerated")
+
+    if device is not None:
+        v.palette3 = False
+        v.palette_plus = False
+        v.colors = 4
+        for keyword in devices[device]:
+            parameters.check_config_parameters(keyword, None)
+
+    previous_offset = v.splice_offset
+    for keyword, value in (options or {}).items():
+        parameters.check_config_parameters(keyword, value)
+
+    # the algorithm format depends on the Palette model
+    for definition in plan["material_definitions"]:
+        omega.algorithm_process_material_configuration(definition)
+
+    apply_splice_offset(previous_offset)
+
+
+def write_palette_file(output_file, job_name):
+    if v.palette3:
+        meta, palette = omega.header_generate_omega_palette3(None)
+        try:
+            thumbnail = base64.b64decode(v.p3_thumbnail_data)
+        except ValueError:
+            thumbnail = b""
+        fileio.write_mafx_file(output_file, meta, palette, thumbnail)
+    else:
+        header = omega.header_generate_omega(job_name)["header"]
+        fileio.write_maf_file(output_file, header)
+
+    gui.create_logitem("Generated {} ({} splices, {} pings)".format(output_file, len(v.splice_extruder_position),
+                                                                   len(v.ping_extruder_position)))
+
+
+def main(argv=None):
+    from p2pp.__main__ import parse_options, check_options
+
+    parser = argparse.ArgumentParser(prog="p2pp.sidecar",
+                                     description="P2PP - regenerate the Palette accessory mode file from a splice/ping plan")
+    parser.add_argument("sidecar", help="{} file saved with ;P2PP SIDECAR".format(SUFFIX))
+    parser.add_argument("--device", choices=sorted(devices), help="Palette model (default: the one of the plan)")
+    parser.add_argument("-p", "--parameter", action="append", default=[], metavar="KEYWORD[=VALUE]",
+                        help="P2PP parameter, e.g. PRINTERPROFILE=..., SPLICEOFFSET=..., P+PPM=..., can be repeated")
+    parser.add_argument("-o", "--output", help="output file (default: next to the plan, extension of the Palette model)")
+    args = parser.parse_args(argv)
+
+    options = parse_options(args.parameter)
+    check_options(parser, options)
+
+    gui.set_reporter(ConsoleReporter())
+    try:
+        plan = load_sidecar(args.sidecar)
+        with ProcessingContext():
+            v.version = plan["version"]
+            load_plan(plan, args.device, options)
+            output_file = args.output
+            if output_file is None:
+                if args.sidecar.endswith(SUFFIX):
+                    output_file = args.sidecar[:-len(SUFFIX)] + output_extension()
+                else:
+                    output_file = os.path.splitext(args.sidecar)[0] + output_extension()
+            write_palette_file(output_file, plan["job_name"])
+    except (IOError, OSError, ValueError, KeyError) as e:
+        print("p2pp.sidecar: error: {}".format(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ import p2pp.variables as v
 from p2pp.gcode import issue_code
 import p2pp.manualswap as swap
 import p2pp.gui as gui
+import p2pp.stats as stats
 
 
 # SECTION BB3D Helper Code
@@ -307,6 +308,7 @@ def create_sidewipe_blobster(length):
 # SECTION SideWipe - Generic
 
 
+@stats.generator("sidewipe")
 def create_side_wipe(length=0):
 
     if length != 0:
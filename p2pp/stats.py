@@ -0,0 +1,173 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# processing statistics, collected for every file:
+#   - time spent in every phase of p2pp_process_file (see PHASES)
+#   - input lines per line class (first pass classification)
+#   - lines generated by purgetower, sidewipe, pings and manualswap
+#   - filament extruded per layer
+#   - peak memory of the file (linux only) and of the process
+# report() returns them as a dict (json report of python -m p2pp --stats and the batch report),
+# ;P2PP STATS adds them as comments at the end of the output gcode
+
+import functools
+import sys
+import time
+
+import p2pp.toolchanges as toolchanges
+import p2pp.variables as v
+
+PHASES = ["read", "config", "pass1", "checks", "pass2", "header", "write", "zip", "upload"]
+
+
+# SECTION Timing
+
+class Phase(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        v.stats_phases[self.name] = v.stats_phases.get(self.name, 0.0) + time.perf_counter() - self.started
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+# SECTION Generated lines
+
+# lines issued so far, including the ones already flushed to the output (streaming mode)
+def lines_issued():
+    return v.stats_flushed_lines + len(v.processed_gcode)
+
+
+# counts the lines issued by the decorated function, when generators call each other the lines are
+# counted for the outermost one (e.g. the retracts of a side wipe are side wipe lines)
+def generator(module):
+    def decorate(function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            if v.stats_generator is not None:
+                return function(*args, **kwargs)
+            v.stats_generator = module
+            start = lines_issued()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                v.stats_generated[module] = v.stats_generated.get(module, 0) + lines_issued() - start
+                v.stats_generator = None
+        return counted
+    return decorate
+
+
+# SECTION Memory
+
+# the peak RSS of the process (ru_maxrss) never goes down, in the daemon and the batch workers every file after the
+# largest one would report the peak of the largest one.  On linux the peak (VmHWM) is reset when processing starts,
+# so the peak of every file is known, elsewhere only the peak of the process.
+# Resetting VmHWM resets ru_maxrss as well, the peak of the process before the reset is kept in _process_peak.
+
+_process_peak = 0
+
+
+def reset_peak_memory():
+    global _process_peak
+    _process_peak = max(_process_peak, process_peak_memory() or 0)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        v.stats_peak_reset = True
+    except (IOError, OSError):
+        v.stats_peak_reset = False
+
+
+# peak RSS since reset_peak_memory(), None when it could not be reset
+def peak_memory(state=v):
+    if not state.stats_peak_reset:
+        return None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def process_peak_memory():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on linux, bytes on macOS
+    if sys.platform == "darwin":
+        rss //= 1024
+    return max(rss, _process_peak)
+
+
+# SECTION Report
+
+
+def line_classes(state):
+    import p2pp.mcf as mcf
+    names = {getattr(mcf, name): name for name in dir(mcf) if name.startswith("CLS_")}
+
+    counts = {}
+    runs = state.class_runs
+    for idx, (first, line_class) in enumerate(runs):
+        last = runs[idx + 1][0] if idx + 1 < len(runs) else state.input_line_count
+        name = names.get(line_class, str(line_class))
+        counts[name] = counts.get(name, 0) + last - first
+    return counts
+
+
+# state is p2pp.variables or a ProcessingContext after processing
+def report(state=v):
+    return {"version": state.version,
+            "input_lines": state.input_line_count,
+            "output_lines": state.stats_output_lines,
+            "seconds": round(sum(state.stats_phases.values()), 4),
+            "phases": {name: round(state.stats_phases[name], 4) for name in PHASES if name in state.stats_phases},
+            "line_classes": line_classes(state),
+            "generated_lines": dict(state.stats_generated),
+            "toolchanges": toolchanges.toolchange_count(state),
+            "splices": len(state.splice_extruder_position),
+            "pings": len(state.ping_extruder_position),
+            "layer_extrusion": [round(length, 2) for length in state.layer_extrusion],
+            "peak_memory_kb": peak_memory(state),
+            "process_peak_memory_kb": process_peak_memory()}
+
+
+def comments(state=v):
+    stats = report(state)
+    lines = [";P2PP STATS version {}".format(stats["version"]),
+             ";P2PP STATS input_lines {}".format(stats["input_lines"]),
+             ";P2PP STATS output_lines {}".format(stats["output_lines"])]
+    for name, seconds in stats["phases"].items():
+        lines.append(";P2PP STATS phase {} {:.4f}s".format(name, seconds))
+    for name in sorted(stats["line_classes"]):
+        lines.append(";P2PP STATS lines {} {}".format(name, stats["line_classes"][name]))
+    for name in sorted(stats["generated_lines"]):
+        lines.append(";P2PP STATS generated {} {}".format(name, stats["generated_lines"][name]))
+    if stats["peak_memory_kb"] is not None:
+        lines.append(";P2PP STATS peak_memory {}kB".format(stats["peak_memory_kb"]))
+    if stats["process_peak_memory_kb"] is not None:
+        lines.append(";P2PP STATS process_peak_memory {}kB".format(stats["process_peak_memory_kb"]))
+    return lines
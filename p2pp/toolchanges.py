@@ -0,0 +1,195 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+from array import array
+from itertools import chain
+
+import p2pp.gcode as gcode
+import p2pp.gui as gui
+import p2pp.layers as layers
+import p2pp.variables as v
+from p2pp.reporters import WARNING_COLOR
+
+# SECTION Toolchange table
+
+# the first pass records the T commands (v.toolchange_lines) and the filament extruded by every run of extruding
+# moves (v.extrusion_lines, v.extrusion_values, v.extrusion_kinds).  A run ends at a travel move, a T command or a
+# change of the line class, so a run never spans lines of different classes.  Retracts and unretracts are recorded
+# on their own, the second pass limits the unretracts to the retraction.  Once the line classes are final,
+# build_table() turns them into v.toolchange_table, one row per toolchange:
+
+LINE = 0  # input line of the T command
+FROM_TOOL = 1  # -1 for the first tool
+TO_TOOL = 2
+LAYER = 3
+PURGE = 4  # filament purged in the toolchange (CP TOOLCHANGE WIPE) block
+EXTRUDED = 5  # filament extruded since the previous toolchange
+INTOWER = 6
+
+# v.extrusion_kinds
+EXTRUSION_RUN = 0
+RETRACT_MOVE = 1
+UNRETRACT_MOVE = 2
+
+
+def start_table():
+    v.toolchange_lines = []
+    v.extrusion_lines = array('q')
+    v.extrusion_values = array('d')
+    v.extrusion_kinds = array('b')
+    v.extrusion_open = False
+
+
+def add_toolchange(line, tool, intower):
+    v.toolchange_lines.append((line, tool, intower))
+    v.extrusion_open = False
+
+
+# code: parsed line with an E value
+def add_extrusion(line, code):
+    if code[gcode.RETRACT] or code[gcode.UNRETRACT]:
+        kind = RETRACT_MOVE if code[gcode.RETRACT] else UNRETRACT_MOVE
+        v.extrusion_open = False
+    elif v.extrusion_open:
+        v.extrusion_values[-1] += code[gcode.E]
+        return
+    else:
+        kind = EXTRUSION_RUN
+        v.extrusion_open = True
+
+    v.extrusion_lines.append(line)
+    v.extrusion_values.append(code[gcode.E])
+    v.extrusion_kinds.append(kind)
+
+
+def end_extrusion():
+    v.extrusion_open = False
+
+
+# dropped: the line classes of which the second pass removes the moves, they do not count for the splices
+# purge_class: the line class of the toolchange blocks
+def build_table(dropped, purge_class):
+    table = []
+    runs = v.class_runs
+    changes = v.toolchange_lines
+    run = 0
+    change = 0
+    tool = -1
+    extruded = 0.0
+    retraction = 0.0
+    row = None
+
+    # the end of the file closes the toolchanges after the last extruding move
+    for line, length, kind in chain(zip(v.extrusion_lines, v.extrusion_values, v.extrusion_kinds),
+                                    [(v.input_line_count, 0.0, EXTRUSION_RUN)]):
+        while change < len(changes) and changes[change][0] < line:
+            toolchange_line, new_tool, intower = changes[change]
+            change += 1
+            # a T command selecting the current tool is no toolchange
+            if new_tool != tool:
+                row = [toolchange_line, tool, new_tool, layers.layer_at(toolchange_line), 0.0, extruded, intower]
+                table.append(row)
+                tool = new_tool
+                extruded = 0.0
+
+        while run + 1 < len(runs) and runs[run + 1][0] <= line:
+            run += 1
+        line_class = runs[run][1]
+        if line_class in dropped:
+            continue
+
+        # as the second pass does: unretracts up to the retraction, the retraction left is undone before extruding
+        if kind == RETRACT_MOVE:
+            retraction += length
+        elif kind == UNRETRACT_MOVE:
+            length = min(-retraction, length)
+            retraction += length
+        elif retraction < -0.01 and length:
+            extruded -= retraction
+            retraction = 0.0
+
+        extruded += length
+        if line_class == purge_class and row is not None:
+            row[PURGE] += length
+
+    v.toolchange_table = table
+    v.toolchange_tail = extruded
+    # the runs are not needed anymore
+    v.extrusion_lines = None
+    v.extrusion_values = None
+    v.extrusion_kinds = None
+
+
+# the first row selects the first tool
+def toolchange_count(state):
+    return len([row for row in state.toolchange_table if row[FROM_TOOL] != -1])
+
+
+# SECTION Splice estimate
+
+# side wipes, blobs, FULLPURGEREDUCTION and TOWERDELTA change the purges while the second pass runs, the splices
+# are only estimated when the purges are printed as they are in the file
+def splices_known():
+    return not (v.side_wipe or v.full_purge_reduction or v.bigbrain3d_purge_enabled or v.blobster_purge_enabled or
+                v.max_tower_z_delta)
+
+
+# splices as the second pass will create them: [length, tool, layer]
+# the M221 extrusion multiplier is not taken into account
+def estimated_splices():
+    splices = []
+    location = v.firmwarepurge + v.splice_offset
+    previous = 0
+    for row in v.toolchange_table:
+        location += row[EXTRUDED]
+        if row[FROM_TOOL] != -1:
+            splices.append([location - previous, row[FROM_TOOL], row[LAYER]])
+            previous = location
+
+    if v.toolchange_table:
+        location += v.toolchange_tail + v.extra_runout_filament
+        location += max(0, v.minimaltotal_filament - (location - v.splice_offset))
+        splices.append([location - previous, v.toolchange_table[-1][TO_TOOL], layers.layer_count() - 1])
+    return splices
+
+
+# AUTOADDPURGE extends a short first splice in the second pass
+def short_splices(splices):
+    short = []
+    for idx, (length, tool, layer) in enumerate(splices):
+        if idx == 0:
+            if length < v.min_start_splice_length and not v.autoaddsplice:
+                short.append([length, tool, layer])
+        elif length < v.min_splice_length:
+            short.append([length, tool, layer])
+    return short
+
+
+# SECTION Checks
+
+# reports the toolchanges and the short splices before the second pass, only in the log: the second pass
+# places the splices and reports the short ones as warnings
+def check_plan():
+    if not v.toolchange_table:
+        return
+
+    purge = sum(row[PURGE] for row in v.toolchange_table)
+    if not splices_known():
+        gui.create_logitem("Toolchanges: {}   Purge: {:.2f}mm".format(toolchange_count(v), purge))
+        return
+
+    splices = estimated_splices()
+    gui.create_logitem("Toolchanges: {}   Purge: {:.2f}mm   Estimated splices: {}"
+                       .format(toolchange_count(v), purge, len(splices)))
+
+    short = short_splices(splices)
+    if short:
+        length, tool, layer = min(short)
+        gui.create_logitem("Estimated {} short splice(s), shortest {:.2f}mm at layer {} (input {})"
+                           .format(len(short), length, layer, tool + 1), WARNING_COLOR)
@@ -10,6 +10,8 @@ __email__ = 'P2PP@pandora.be'
 
 import re
 
+from p2pp.reporters import NullReporter
+
 #########################################
 # Variable default values
 #########################################
@@ -54,8 +56,11 @@ inputs_recalc=[0,0,0,0,0,0,0,0]
 
 default_splice_algorithm = [0, 0, 0]  # type string
 process_warnings = []  # type array of string
+reporter = NullReporter()  # logging and progress go here, see gui.py
+last_progress = 0.0  # time of the last progress update sent to the reporter
 splice_algorithm_table = []  # type array of string
 splice_algorithm_dictionary = {}  # type dictionary Str->Str
+material_definitions = []  # ;P2PP MATERIAL_ definitions as found in the file, see sidecar.py
 splice_list = []
 
 tower_delta = False
@@ -69,8 +74,34 @@ printer_profile_string = ''
 default_printerprofile = "50325050494e464f"
 # A unique ID linked to a printer configuration profile in the Palette 2 hardware.
 
-input_gcode = []
 processed_gcode = []  # final output array with Gcode
+output_writer = None  # when set, processed_gcode is flushed to this writer (see fileio.py)
+output_flush_lines = 10000
+output_files = []  # files written for this print, output file first (see cache.py)
+summary = []  # summary lines of the omega header
+sidecar = False  # write the splice/ping plan next to the output, see sidecar.py
+
+# processing statistics, see stats.py
+stats_comments = False  # add ;P2PP STATS comments at the end of the output
+stats_phases = {}  # phase name -> seconds
+stats_generated = {}  # module -> generated lines
+stats_generator = None  # module of the generator being counted
+stats_flushed_lines = 0  # lines flushed from processed_gcode to the output writer
+stats_output_lines = 0
+stats_peak_reset = False  # peak memory reset when processing started, see stats.peak_memory
+
+profile = False  # profile the processing with cProfile, see profiler.py
+profiler = None
+
+plan_only = False  # only compute the splices and pings, no output is written, see planonly.py
+
+# input is read in streaming fashion, see fileio.py
+# in streaming mode the second pass re-reads the input and the output body is buffered in a temporary file
+streaming_mode = False
+streaming_buffer = 1048576  # file buffer in bytes
+input_line_count = 0
+class_runs = []  # [first line, block class] for every run of lines with the same class
+intower_toggles = []  # line numbers at which the in-tower status of the lines toggles
 
 # These variables are used to build the splice information table (Omega-30 commands in GCode) that drives the Palette2.
 # spliceoffset allows for a correction of the position at which the transition occurs.
@@ -233,6 +264,27 @@ ignore_warnings = False
 purge_sequence_x = 0
 purge_sequence_y = 0
 
+# purge tower sequences (see purgetower.py)
+purge_solidlayer = []
+purge_emptylayer = []
+purge_filllayer = []
+purge_brimlayer = []
+current_purge_form = 1  # purgetower.PURGE_SOLID
+current_purge_index = 0
+sequence_length_solid = 0
+sequence_length_empty = 0
+sequence_length_brim = 0
+purge_last_posx = None
+purge_last_posy = None
+last_brim_x = None
+last_brim_y = None
+
+# preview simulation (see genpreview.py)
+preview_extrusions = {}
+preview_z = 0
+preview_prevx = 0
+preview_prevy = 0
+
 backpassed = False
 post_tower = False
 
@@ -312,7 +364,16 @@ regex_p2pp = re.compile("^;\s*P2PP\s+([^=]+)=?(.*)$")
 # conversion to absolute extruder:
 
 absolute_counter = -9999
-layer_end = []
+layer_starts = []  # first input line of every layer, see layers.py
+
+# toolchange table built during the first pass, see toolchanges.py
+toolchange_lines = []  # [input line, tool, in tower] of every T command
+extrusion_lines = None  # first input line of every run of extruding moves
+extrusion_values = None  # filament extruded by the run
+extrusion_kinds = None  # run of extruding moves, retract or unretract
+extrusion_open = False
+toolchange_table = []
+toolchange_tail = 0.0  # filament extruded after the last toolchange
 last_layer_processed = -1
 
 layer_toolchange_counter = 0
@@ -366,6 +427,16 @@ bb_maxx = -100000
 bb_maxy = -100000
 bb_maxz = -100000
 
+# moves collected for the bounding box and extrusion accounting, see accounting.py
+account_x = []
+account_y = []
+account_z = []
+account_e = []
+account_runs = []  # [first index in account_e, tool, layer] of every run of extrusions
+account_tool = None
+account_layer = None
+layer_extrusion = []  # filament extruded per layer (mm)
+
 # Palette 3 file uploading
 ############################
 
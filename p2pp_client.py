@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# thin client for the P2PP daemon (python -m p2pp.daemon), to be used as PrusaSlicer post processing script:
+#
+#     /path/to/python /path/to/p2pp_client.py [-p KEYWORD[=VALUE]]...
+#
+# PrusaSlicer appends the gcode file name.  Only the standard library is loaded, the file name and the SLIC3R_PP_*
+# environment are forwarded to the daemon.  When no daemon is running the file is processed in this process.
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+DEFAULT_PORT = 7321
+TOKEN_FILE = "daemon.token"
+
+
+# keep in sync with p2pp/daemon.py
+def private_directory():
+    if not hasattr(os, "getuid"):
+        directory = os.path.join(os.path.expanduser("~"), ".p2pp")
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.environ["XDG_RUNTIME_DIR"]
+
+    directory = os.path.join(tempfile.gettempdir(), "p2pp-{}".format(os.getuid()))
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    # the temp directory is shared, refuse a directory somebody else made or opened up
+    status = os.lstat(directory)
+    if not os.path.isdir(directory) or os.path.islink(directory) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise OSError("{} is not a private directory of the current user".format(directory))
+    return directory
+
+
+def default_address():
+    if "P2PP_DAEMON" in os.environ:
+        return os.environ["P2PP_DAEMON"]
+    if hasattr(socket, "AF_UNIX") and hasattr(os, "getuid"):
+        return os.path.join(private_directory(), "p2pp.sock")
+    return "127.0.0.1:{}".format(DEFAULT_PORT)
+
+
+def is_tcp(address):
+    return ":" in address and os.path.sep not in address
+
+
+def connect(address):
+    if is_tcp(address):
+        host, port = address.rsplit(":", 1)
+        return socket.create_connection((host, int(port)))
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(address)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+
+# the daemon only accepts TCP requests with the token it wrote at start-up
+def read_token():
+    try:
+        with open(os.path.join(private_directory(), TOKEN_FILE)) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def parse_options(parameters):
+    options = {}
+    for parameter in parameters:
+        keyword, _, value = parameter.partition("=")
+        options[keyword.strip().upper()] = value.strip() if value else None
+    return options
+
+
+def run_local(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from p2pp.__main__ import main
+    argv = [args.input]
+    if args.output:
+        argv.append(args.output)
+    for parameter in args.parameter:
+        argv += ["-p", parameter]
+    if args.no_cache:
+        argv.append("--no-cache")
+    return main(argv)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="p2pp_client", description="P2PP - send a file to the P2PP daemon")
+    parser.add_argument("input", help="gcode file generated by PrusaSlicer")
+    parser.add_argument("output", nargs="?", help="output file, by default the input file is overwritten")
+    parser.add_argument("-p", "--parameter", action="append", default=[], metavar="KEYWORD[=VALUE]",
+                        help="P2PP parameter, overrides the ;P2PP lines of the input file, can be repeated")
+    parser.add_argument("--address", help="daemon address (default: P2PP_DAEMON or the private unix socket of the daemon)")
+    parser.add_argument("--no-cache", action="store_true", help="process the file even when it was processed before with the same settings")
+    args = parser.parse_args()
+
+    # no daemon (or no usable socket directory): process the file here
+    try:
+        address = args.address or default_address()
+        connection = connect(address)
+    except (OSError, ValueError):
+        return run_local(args)
+
+    request = {"input": os.path.abspath(args.input),
+               "output": os.path.abspath(args.output) if args.output else None,
+               "options": parse_options(args.parameter),
+               "environment": {key: value for key, value in os.environ.items() if key.startswith("SLIC3R_PP_")},
+               "cache": not args.no_cache}
+    if is_tcp(address):
+        request["token"] = read_token()
+
+    code = 1
+    busy = False
+    with connection:
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for line in connection.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            if message["event"] == "log":
+                stream = sys.stderr if message["level"] == "warning" else sys.stdout
+                stream.write(message["text"] + "\n")
+            elif message["event"] == "result":
+                code = message["code"]
+                busy = message.get("busy", False)
+    # the daemon is processing another file
+    if busy:
+        return run_local(args)
+    return 0 if code == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
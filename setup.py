@@ -86,7 +86,7 @@ if sys.platform.startswith('linux'):
         description="P2PP - Palette 2 Post Processing tool for Prusa Slicer",
         author=__author__,
         author_email=__email__,
-        packages=find_packages(),
+        packages=find_packages(exclude=["benchmarks"]),
         package_data={
             'p2pp': ['*.ui'],
             '': ['version.py']
@@ -0,0 +1,62 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# python -m unittest discover tests  (from the root of the project)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import p2pp
+import p2pp.accounting as accounting
+import p2pp.gcode as gcode
+import p2pp.variables as v
+from benchmarks import gcodegen
+
+
+class AccountingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # a single input and a long first splice: AUTOADDPURGE adds its purge at the last toolchange
+    def test_autoaddpurge_single_input(self):
+        input_file = os.path.join(self.directory, "single.gcode")
+        gcodegen.generate_file(input_file, "normal", layers=10, colors=2, toolchanges=0)
+
+        context = p2pp.ProcessingContext()
+        result = p2pp.process(input_file, os.path.join(self.directory, "single.mcf.gcode"),
+                              {"AUTOADDPURGE": None, "MINSTARTSPLICE": "400"}, context=context)
+
+        self.assertEqual(result, 0)
+        self.assertGreater(context.total_material_extruded, 0)
+        self.assertAlmostEqual(sum(context.material_extruded_per_color), context.total_material_extruded, places=3)
+        self.assertAlmostEqual(sum(context.layer_extrusion), context.total_material_extruded - context.extra_runout_filament,
+                               places=3)
+
+    # moves without X (z hops) fill their own chunk
+    def test_bounding_box_z_only_moves(self):
+        with p2pp.ProcessingContext() as context:
+            for idx in range(accounting.CHUNK + 10):
+                code = gcode.create_command("G1 Z{:.3f}".format(0.2 + idx * 0.001))
+                gcode.update_bounding_box(code)
+            self.assertLess(len(v.account_z), accounting.CHUNK)
+            accounting.flush()
+
+        self.assertEqual(context.account_z, [])
+        self.assertAlmostEqual(context.bb_minz, 0.2, places=3)
+        self.assertAlmostEqual(context.bb_maxz, 0.2 + (accounting.CHUNK + 9) * 0.001, places=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
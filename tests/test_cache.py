@@ -0,0 +1,85 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# python -m unittest discover tests  (from the root of the project)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import p2pp
+import p2pp.cache as cache
+from benchmarks import gcodegen
+
+
+def read(filename):
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_directory = os.path.join(self.directory, "cache")
+        self.input_file = os.path.join(self.directory, "print.gcode")
+        self.environment = {"SLIC3R_PP_OUTPUT_NAME": os.path.join(self.directory, "print.mcf.gcode")}
+        # accessory mode writes the gcode and the .maf file
+        gcodegen.generate_file(self.input_file, "accessory", layers=10)
+        self.original = read(self.input_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # processes the file in place, as PrusaSlicer does, and returns the cache key
+    def process(self):
+        key = cache.cache_key(self.input_file, self.input_file, None, self.environment)
+        with p2pp.ProcessingContext():
+            result = cache.p2pp_process_file(self.input_file, None, environment=self.environment,
+                                             directory=self.cache_directory, max_size=1 << 30)
+        self.assertEqual(result, 0)
+        return key
+
+    def test_restore(self):
+        key = self.process()
+        processed = read(self.input_file)
+        with open(self.input_file, "wb") as f:
+            f.write(self.original)
+
+        self.assertIsNotNone(cache.restore(self.cache_directory, key, self.input_file))
+        self.assertEqual(read(self.input_file), processed)
+        self.assertEqual(sorted(name for name in os.listdir(self.directory) if name.startswith(".")), [])
+
+    # an incomplete entry must not touch the input, it is processed again
+    def test_restore_incomplete_entry(self):
+        key = self.process()
+        with open(self.input_file, "wb") as f:
+            f.write(self.original)
+        # the processed gcode is the first file, the .maf file is missing
+        os.remove(os.path.join(cache.entry_path(self.cache_directory, key), "1"))
+
+        self.assertIsNone(cache.restore(self.cache_directory, key, self.input_file))
+        self.assertEqual(read(self.input_file), self.original)
+
+    # the Palette 3 warnings on the host are replayed on a hit, only the checks on the host are part of the key
+    def test_key_host(self):
+        def key(host):
+            environment = dict(self.environment, SLIC3R_PP_HOST=host)
+            return cache.cache_key(self.input_file, self.input_file, None, environment)
+
+        self.assertEqual(key("File:print.mcfx"), key("File:other.mcfx"))
+        self.assertNotEqual(key("File:print.mcfx"), key("File:print.gcode"))
+        self.assertNotEqual(key("File:print.mcfx"), key("OctoPrint:print.mcfx"))
+        self.assertNotEqual(key("File:print.mcfx"), cache.cache_key(self.input_file, self.input_file, None,
+                                                                    self.environment))
+
+
+if __name__ == "__main__":
+    unittest.main()
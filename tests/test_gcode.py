@@ -0,0 +1,290 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# python -m unittest discover tests  (from the root of the project)
+
+import io
+import unittest
+
+import p2pp
+import p2pp.gcode as gcode
+import p2pp.variables as v
+from benchmarks import gcodegen
+
+
+# SECTION Reference implementation
+
+# the parser as it was before the parameter_index lookup, ORIGINAL added
+def reference_command(gcode_line, is_comment=False, userclass=0, original=False):
+
+    return_value = [None, None, None, None, None, None, None, None, "", 0, False, False, False, userclass, "",
+                    gcode_line if original else None]
+
+    if is_comment:
+        return_value[gcode.COMMENT] = gcode_line
+    else:
+
+        comsplit = gcode_line.split(";", 1)
+        if len(comsplit) == 2:
+            return_value[gcode.COMMENT] = ";" + comsplit[1]
+
+        fields = comsplit[0].strip().split(" ")
+
+        if len(fields[0]) > 0:
+
+            return_value[gcode.COMMAND] = fields[0]
+
+            param_coefficient = 0
+            for i in range(1, len(fields)):
+                param = fields[i]
+
+                try:
+                    idx = gcode.parmidx[ord(param[0]) - 0x41]
+                    if idx >= 0:
+                        val = float(param[1:])
+                        param_coefficient += 2 ** idx
+                        return_value[idx] = val
+                    else:
+                        return_value[gcode.OTHER] = return_value[gcode.OTHER] + " " + param
+                except (IndexError, ValueError):
+                    return_value[gcode.OTHER] = return_value[gcode.OTHER] + " " + param
+
+            if v.replace_G4P0:
+                if return_value[gcode.COMMAND] == "G4" and return_value[gcode.P] == 0:
+                    return reference_command("M400", False, userclass)
+
+            check = (param_coefficient & 31)
+            if check and return_value[gcode.COMMAND] == "G1":
+                return_value[gcode.MOVEMENT] = check
+                if param_coefficient & 8:
+                    if return_value[gcode.E] < 0:
+                        return_value[gcode.RETRACT] = True
+                    else:
+                        return_value[gcode.UNRETRACT] = (return_value[gcode.MOVEMENT] & 7) == 0    # no XYZ
+                        return_value[gcode.EXTRUDE] = True
+
+    return return_value
+
+
+# the serializer as it was before the format templates, without the bounding box (see test_accounting)
+def reference_commandstring(gcode_tupple):
+    if gcode_tupple[gcode.COMMAND]:
+        p = gcode_tupple[gcode.COMMAND]
+        if gcode_tupple[gcode.MOVEMENT]:
+            if gcode_tupple[gcode.X] is not None:
+                p = p + " X{:0.3f}".format(gcode_tupple[gcode.X])
+            if gcode_tupple[gcode.Y] is not None:
+                p = p + " Y{:0.3f}".format(gcode_tupple[gcode.Y])
+            if gcode_tupple[gcode.Z] is not None:
+                p = p + " Z{:0.3f}".format(gcode_tupple[gcode.Z])
+        else:
+            if gcode_tupple[gcode.X] is not None:
+                p = p + " X{}".format(gcode_tupple[gcode.X])
+            if gcode_tupple[gcode.Y] is not None:
+                p = p + " Y{}".format(gcode_tupple[gcode.Y])
+            if gcode_tupple[gcode.Z] is not None:
+                p = p + " Z{}".format(gcode_tupple[gcode.Z])
+
+        if gcode_tupple[gcode.E] is not None:
+            p = p + " E{:0.5f}".format(gcode_tupple[gcode.E])
+        if gcode_tupple[gcode.F] is not None:
+            p = p + " F{}".format(int(gcode_tupple[gcode.F]))
+        if gcode_tupple[gcode.S] is not None:
+            tmpv = float(gcode_tupple[gcode.S])
+            if tmpv == int(tmpv):
+                p = p + " S{}".format(int(gcode_tupple[gcode.S]))
+            else:
+                p = p + " S{}".format(float(gcode_tupple[gcode.S]))
+        if gcode_tupple[gcode.P] is not None:
+            p = p + " P{}".format(int(gcode_tupple[gcode.P]))
+        p = p + gcode_tupple[gcode.OTHER]
+        if gcode_tupple[gcode.COMMENT] != "":
+            p = p + " " + gcode_tupple[gcode.COMMENT]
+    else:
+        p = gcode_tupple[gcode.COMMENT]
+
+    return p
+
+
+# SECTION Corpus
+
+PARSER_CORPUS = [
+    # moves, extrusions, retracts
+    "G1 X10.5 Y20.25 E0.12345 F1800",
+    "G1 X10 Y20 Z0.2",
+    "G1 Z0.6 F9000",
+    "G1 E-0.8 F2100",
+    "G1 E0.8 F2100",
+    "G1 E0",
+    "G1 F1200",
+    "G0 X1 Y2",
+    "G1 X1.5e2 Y-3",
+    # + sign handling
+    "G1 E+0.8",
+    "G1 X10 +0.5",
+    "G1 X10 >5",
+    "G1 X10 E+",
+    # empty parameters
+    "G1 X",
+    "G1 X Y10",
+    "G1 X10 E",
+    "M104 S",
+    # lowercase letters and non-numeric values
+    "g1 x10 y20",
+    "G1 x10 Y20 e0.5",
+    "M117 Printing layer 1",
+    "M900 Kabc",
+    "G1 Xnan Y10",
+    "G1 XABC",
+    # inline comments
+    "G1 X10 Y10 ; move",
+    "G1 X10;no space",
+    ";TYPE:External perimeter",
+    "; comment ; with ; semicolons",
+    "G1 E0.5 ;",
+    "M400;",
+    # tabs and repeated spaces
+    "G1\tX10 Y10",
+    "G1 X10\tY10 E1",
+    "G1  X10   Y20",
+    "  G1 X10 Y20  ",
+    "G1 X10 \tE1",
+    "\tG1 X1",
+    # commands without parameters
+    "T0",
+    "T1 ; tool",
+    "M400",
+    "M83",
+    "G90",
+    # S and P
+    "M104 S215",
+    "M106 S127.5",
+    "G4 P0",
+    "G4 P0.0",
+    "G4 P500",
+    "G4 S1",
+    "M900 K0.04 S1 P2",
+    # other characters in front of the parameters
+    "G1 'X10 (Y2 @3 &4 $5",
+    "M117 été",
+    # empty and whitespace only lines
+    "",
+    " ",
+    "\t",
+]
+
+
+def generated_lines():
+    lines = []
+    for mode in ["normal", "accessory", "palette3", "sidewipe"]:
+        out = io.StringIO()
+        gcodegen.generate(out, mode=mode, layers=3, colors=4, toolchanges=2)
+        lines.extend(out.getvalue().splitlines())
+    return lines
+
+
+# X Y Z E F S P values, rounding on the last decimal, negative zero, integers and exponents
+SERIALIZER_VALUES = [
+    [12.34567, -0.0004, 0.2, 1.234565, 1800.9, 127.5, 500.0],
+    [0.0, 250.0005, 10.0, -0.8, 9000.0, 215.0, 0.5],
+    [10, 20, 1, 1, 1200, 0, 2],
+    [1e-07, 123456.78951, -1.5, 0.000005, 0.4, 0.25, -0.5],
+    [-0.0, 0.0015, 0.0025, -0.000005, 60.0, 1e-05, 1e3],
+]
+
+# OTHER, COMMENT
+SERIALIZER_TAILS = [
+    ["", ""],
+    [" K0.04", ""],
+    ["", "; note"],
+    [" T1 Kx", ";"],
+]
+
+
+def serializer_table():
+    table = []
+    for values in SERIALIZER_VALUES:
+        for mask in range(128):
+            for movement in [0, mask & 31 or 1]:
+                for other, comment in SERIALIZER_TAILS:
+                    code = gcode.create_command("G1")
+                    for idx in range(7):
+                        if mask & gcode.parameter_bit[idx]:
+                            code[idx] = values[idx]
+                    code[gcode.MOVEMENT] = movement
+                    code[gcode.OTHER] = other
+                    code[gcode.COMMENT] = comment
+                    table.append(code)
+    return table
+
+
+# SECTION Tests
+
+class CreateCommandTest(unittest.TestCase):
+
+    # compared as text, nan values are not equal to themselves
+    def assertParsedAs(self, line, **kwargs):
+        self.assertEqual(repr(gcode.create_command(line, **kwargs)), repr(reference_command(line, **kwargs)),
+                         repr(line))
+
+    def check_corpus(self, lines):
+        for line in lines:
+            self.assertParsedAs(line)
+            self.assertParsedAs(line, original=True)
+            self.assertParsedAs(line, userclass=3)
+            self.assertParsedAs(line, is_comment=True)
+
+    def test_corpus(self):
+        with p2pp.ProcessingContext():
+            self.check_corpus(PARSER_CORPUS)
+
+    def test_corpus_replace_g4p0(self):
+        with p2pp.ProcessingContext():
+            v.replace_G4P0 = True
+            self.check_corpus(PARSER_CORPUS)
+
+    def test_generated_files(self):
+        with p2pp.ProcessingContext():
+            self.check_corpus(generated_lines())
+
+
+class CreateCommandStringTest(unittest.TestCase):
+
+    def assertWrittenAs(self, code):
+        self.assertEqual(gcode.create_commandstring(code), reference_commandstring(code), repr(code))
+
+    # every presence mask, moves and other commands, with and without OTHER and a comment
+    def test_table(self):
+        with p2pp.ProcessingContext():
+            for code in serializer_table():
+                self.assertWrittenAs(code)
+
+    def test_s_p_only(self):
+        with p2pp.ProcessingContext():
+            for line in ["M104 S215", "M106 S127.5", "G4 P500", "M900 S1 P2 ; pressure", "G4 P0.0"]:
+                self.assertWrittenAs(gcode.create_command(line))
+
+    def test_comment_only(self):
+        with p2pp.ProcessingContext():
+            for line in [";TYPE:Wipe tower", "; comment ; with ; semicolons", ";", ""]:
+                self.assertWrittenAs(gcode.create_command(line))
+                self.assertWrittenAs(gcode.create_command(line, is_comment=True))
+            code = gcode.create_command("G1 X10 Y10 E1 ; moved")
+            gcode.move_to_comment(code, "removed")
+            self.assertEqual(gcode.create_commandstring(code), "; [removed] - G1 X10.000 Y10.000 E1.00000")
+
+    # lines of generated files, parsed and written again
+    def test_generated_files(self):
+        with p2pp.ProcessingContext():
+            for line in generated_lines():
+                self.assertWrittenAs(gcode.create_command(line))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+__author__ = 'Tom Van den Eede'
+__copyright__ = 'Copyright 2018-2022, Palette2 Splicer Post Processing Project'
+__credits__ = ['Tom Van den Eede',
+               'Tim Brookman'
+               ]
+__license__ = 'GPLv3'
+__maintainer__ = 'Tom Van den Eede'
+__email__ = 'P2PP@pandora.be'
+
+# python -m unittest discover tests  (from the root of the project)
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import p2pp
+import p2pp.toolchanges as toolchanges
+from benchmarks import gcodegen
+
+
+class ToolchangesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    # processes a generated file, returns the context and the splices estimated before the second pass
+    def process(self, mode, options=None):
+        input_file = os.path.join(self.directory, mode + ".gcode")
+        # some splices below and some above the minimal splice length
+        gcodegen.generate_file(input_file, mode, layers=12, colors=3, toolchanges=1, size=60)
+
+        context = p2pp.ProcessingContext()
+        result = p2pp.process(input_file, os.path.join(self.directory, mode + ".mcf.gcode"), options, context=context)
+        self.assertEqual(result, 0)
+        with context:
+            return context, toolchanges.splices_known(), toolchanges.estimated_splices()
+
+    # the estimate is only reported when it is the splices of the second pass
+    def test_estimate_matches_second_pass(self):
+        for mode in sorted(gcodegen.MODES):
+            context, known, splices = self.process(mode)
+
+            self.assertEqual(toolchanges.toolchange_count(context), len(context.splice_length) - 1, mode)
+            self.assertEqual(len(splices), len(context.splice_length), mode)
+            self.assertEqual(known, mode in ["normal", "accessory", "palette3"], mode)
+            if not known:
+                continue
+
+            for (length, tool, _), splice_length, splice_tool in zip(splices, context.splice_length,
+                                                                     context.splice_used_tool):
+                self.assertAlmostEqual(length, splice_length, places=3, msg=mode)
+                self.assertEqual(tool, splice_tool, mode)
+
+            with context:
+                short = toolchanges.short_splices(splices)
+            self.assertGreater(len(short), 0, mode)
+            self.assertLess(len(short), len(splices), mode)
+            self.assertEqual(len(short), len([warning for warning in context.process_warnings if "SHORT" in warning]),
+                             mode)
+
+    # AUTOADDPURGE extends the first splice
+    def test_short_first_splice_autoaddpurge(self):
+        context, _, splices = self.process("normal", {"AUTOADDPURGE": None})
+        with context:
+            short = toolchanges.short_splices(splices)
+        self.assertLess(splices[0][0], context.min_start_splice_length)
+        self.assertNotIn(splices[0], short)
+
+
+if __name__ == "__main__":
+    unittest.main()